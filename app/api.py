@@ -1,7 +1,25 @@
 from __future__ import annotations
-from dataclasses import asdict
-from app.engine.session import Session
-from app.storage.save import load_save, write_save, delete_save, do_has_save
+from time import perf_counter_ns
+from typing import TYPE_CHECKING
+
+# движок и сохранения импортируются при первом вызове из JS, а не при
+# импорте app.api: окно показывается раньше (см. main.py, preload)
+if TYPE_CHECKING:
+    from app.engine.output import OutputStream
+    from app.engine.session import Session
+
+
+def preload() -> None:
+    """
+    Импортировать движок и прочитать уроки заранее — в фоне, пока
+    пользователь смотрит на стартовый экран.
+    """
+    from app.engine.lesson_loader import default_repository
+    import app.engine.session  # noqa: F401
+    import app.engine.output  # noqa: F401
+    import app.storage.save  # noqa: F401
+
+    default_repository().index()
 
 
 class AppAPI:
@@ -10,66 +28,270 @@ class AppAPI:
     (pywebview автоматически связывает методы).
     """
 
-    def __init__(self) -> None:
-        self.session = None
+    def __init__(self, user: str | None = None) -> None:
+        self.session: Session | None = None
+        # вывод последней команды, который JS ещё дочитывает (read_output)
+        self._output: OutputStream | None = None
+        # в серверном режиме у каждого ученика свои сохранения (см. app/server.py)
+        self.user = user
+
+    def _key(self, lesson_id: str) -> str:
+        """Имя сохранения урока: lesson_id или <user>__<lesson_id>."""
+        return f"{self.user}__{lesson_id}" if self.user else lesson_id
 
     def get_task(self) -> dict:
         if self.session is None:
+            from app.engine.session import Session
+
             self.session = Session(lesson_id="01_paths")
         task = self.session.current_task()
         return {
-            "task": asdict(task),
+            "task": {
+                "id": task.id,
+                "title": task.title,
+                "prompt": task.prompt,
+                "rule": task.rule,
+                "hint": task.hint,
+                "success_explain": task.success_explain,
+                # для проверок без Python (ui/js/precheck.js)
+                "check": task.checker.to_client(),
+            },
             "cwd": self.session.cwd,
             "progress": self.session.progress_dict(),
         }
 
-    def submit_command(self, command: str) -> dict:
+    def _record_attempts(self, reports: list[dict]) -> None:
+        for r in reports:
+            self.session.record_attempt(str(r.get("command", "")), str(r.get("code", "")))
+
+    def report_attempts(self, reports: list[dict]) -> dict:
+        """
+        Команды, которые UI отклонил сам, не вызывая submit_command
+        (ошибка разбора, пустая, запрещённая или не та команда):
+        [{command, code}, ...] пачкой — одна запись журнала на пачку.
+        """
+        from app.storage.save import append_save
+
+        self._record_attempts(reports)
+        append_save(self._key(self.session.lesson_id), self.session.take_delta(), self._snapshot)
+        return {"progress": self.session.progress_dict()}
+
+    def submit_command(self, command: str, reports: list[dict] | None = None) -> dict:
         """
         Принять команду от пользователя, проверить её, вернуть:
-        - строки для вывода в "терминал"
-        - фидбек
-        - возможно следующее задание
+        - output: первый кусок вывода {handle, lines, done, pager};
+          остальное JS забирает через read_output(handle)
+        - terminal_lines: фидбек (печатается после вывода)
+        - фидбек и, возможно, следующее задание
+        reports — ещё не отправленные попытки, отклонённые UI
+        (см. report_attempts): учитываются до этой команды.
         """
+        from app.engine import metrics
+        from app.engine.output import OutputStream
+        from app.storage.save import append_save
+
+        if reports:
+            self._record_attempts(reports)
         result = self.session.submit(command)
-        write_save(self.session.lesson_id, self.session.to_dict())
+        m = metrics.ACTIVE
+        t0 = perf_counter_ns() if m else 0
+        # в журнал уходит только дельта этого submit, а не всё дерево VFS
+        append_save(self._key(self.session.lesson_id), self.session.take_delta(), self._snapshot)
+        if m:
+            m.observe("save", t0)
+
+        # недочитанный вывод прошлой команды больше не нужен
+        if self._output is not None:
+            self._output.close()
+        t0 = perf_counter_ns() if m else 0
+        self._output = OutputStream(result.pop("stdout"), pager=result.pop("pager"))
+        result["output"] = self._output.chunk_dict()
+        if m:
+            m.observe("output", t0)
+            m.flush()
         return result
 
+    def get_metrics(self) -> dict:
+        """
+        Счётчики по командам и кодам ответа, гистограммы времени этапов
+        submit. {"enabled": False}, если метрики не включены.
+        """
+        from app.engine import metrics
+
+        return metrics.snapshot()
+
+    def read_output(self, handle: str, max_lines: int = 1000) -> dict:
+        """
+        Следующий кусок вывода. JS вызывает это, когда xterm дорисовал
+        предыдущий (backpressure), так что в памяти — не больше куска.
+        """
+        out = self._output
+        if out is None or out.handle != handle:
+            return {"handle": handle, "lines": [], "done": True, "partial": False, "pager": False}
+        return out.chunk_dict(max(1, int(max_lines)))
+
+    def close_output(self, handle: str) -> dict:
+        """Ctrl+C или q в пейджере: остаток вывода не вычисляется."""
+        out = self._output
+        if out is not None and out.handle == handle:
+            out.close()
+            self._output = None
+        return {"ok": True}
+
+    def _snapshot(self) -> dict:
+        # полный снапшот для save.py: VFS в компактном бинарном формате
+        return self.session.to_dict(binary_vfs=True)
+
+    def suspend(self) -> str | None:
+        """
+        Выгрузить сессию из памяти: полный снапшот в сохранение, журнал
+        закрыт. Возвращает урок, который потом поднимет continue_game().
+        """
+        from app.storage.save import write_save
+
+        if self.session is None:
+            return None
+        lesson_id = self.session.lesson_id
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+        write_save(self._key(lesson_id), self._snapshot())
+        self.session = None
+        return lesson_id
+
+    def _rewind(self, done: bool) -> dict:
+        from app.storage.save import write_save
+
+        # восстановление не ложится в журнал дельт — пишем полный снапшот
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+        if done:
+            write_save(self._key(self.session.lesson_id), self._snapshot())
+        return {"ok": done, **self.get_task()}
+
+    def undo(self) -> dict:
+        """
+        Отменить последнюю команду: VFS, cwd и задание — как были до неё.
+        ok=False, если отменять нечего.
+        """
+        return self._rewind(self.session.undo())
+
+    def redo(self) -> dict:
+        """Повторить отменённую команду (до следующей новой команды)."""
+        return self._rewind(self.session.redo())
+
+    def restart_task(self) -> dict:
+        """Начать текущее задание заново, не трогая прошлые; отменяется через undo."""
+        self.session.restart_task()
+        return self._rewind(True)
+
+    def complete(self, line: str, cursor: int | None = None) -> dict:
+        """
+        Tab в терминале: {insert, candidates, total}. insert дописывается
+        в позицию курсора; если дописать нечего, а вариантов несколько —
+        JS печатает candidates (не больше complete.MAX_CANDIDATES).
+        """
+        pos = len(line) if cursor is None else max(0, min(int(cursor), len(line)))
+        return self.session.complete(line, pos).to_dict()
+
+    def history_page(self, before: int | None = None, limit: int = 100) -> dict:
+        """
+        Страница истории команд перед seq before (None — самые новые):
+        {start: seq первой, items: команды от старых к новым, first: seq
+        самой старой в истории}. UI подгружает её, листая стрелкой вверх.
+        """
+        h = self.session.history
+        start, items = h.page(before, max(1, min(int(limit), 1000)))
+        return {"start": start, "items": items, "first": h.first}
+
+    def history_search(self, query: str, before: int | None = None) -> dict:
+        """
+        Ctrl-R: самая новая команда с подстрокой query и seq < before.
+        match = {seq, command} или None.
+        """
+        found = self.session.history.search(query, before)
+        return {"match": None if found is None else {"seq": found[0], "command": found[1]}}
+
+    def shell_info(self) -> dict:
+        """
+        Для подсветки строки ввода (ui/js/highlight.js): у каких команд
+        какие аргументы — пути к существующим файлам (shell.ARG_SPECS).
+        От урока не зависит, UI берёт один раз.
+        """
+        from app.engine.shell import ARG_SPECS
+
+        return {
+            "commands": {
+                name: {"reads": spec.reads, "value_flags": list(spec.value_flags)}
+                for name, spec in ARG_SPECS.items()
+            }
+        }
+
+    def path_kinds(self, paths: list[str]) -> dict:
+        """
+        Пути из строки ввода -> "dir" / "file" / None (нет такого) в VFS
+        сессии относительно текущего cwd. UI кэширует ответ до следующей
+        команды и спрашивает только новые пути.
+        """
+        return {"kinds": self.session.path_kinds([str(p) for p in paths[:200]])}
+
     def get_hint(self) -> dict:
         """Вернуть подсказку по текущему заданию."""
         hint = self.session.hint()
         return {"hint": hint}
 
     def reset_progress(self, lesson_id: str = "01_paths") -> dict:
-        delete_save(lesson_id)
+        from app.engine.session import Session
+        from app.storage.save import delete_save, write_save
+
+        delete_save(self._key(lesson_id))
         self.session = Session(lesson_id=lesson_id)
-        write_save(lesson_id, self.session.to_dict())
+        write_save(self._key(lesson_id), self._snapshot())
         return self.get_task()
 
     def start_new(self, lesson_id: str) -> dict:
-        delete_save(lesson_id)
+        from app.engine.session import Session
+        from app.storage.save import delete_save, write_save
+
+        delete_save(self._key(lesson_id))
         self.session = Session(lesson_id=lesson_id)
-        write_save(lesson_id, self.session.to_dict())
+        write_save(self._key(lesson_id), self._snapshot())
         return self.get_task()
 
     def continue_game(self, lesson_id: str) -> dict:
-        saved = load_save(lesson_id)
+        from app.engine.session import Session
+        from app.storage.save import load_save, write_save
+
+        saved = load_save(self._key(lesson_id))
         if saved:
             self.session = Session(lesson_id=lesson_id)
             self.session.from_dict(saved)
         else:
             # если сохранения нет — начинаем заново этот урок
             self.session = Session(lesson_id=lesson_id)
-            write_save(lesson_id, self.session.to_dict())
+            write_save(self._key(lesson_id), self._snapshot())
         return self.get_task()
 
     def has_save(self, lesson_id: str) -> dict:
-        return {"has_save": do_has_save(lesson_id)}
+        from app.storage.save import do_has_save
+
+        return {"has_save": do_has_save(self._key(lesson_id))}
 
     def list_lessons(self) -> dict:
-        # пока простой список, позже можно читать из папки
+        """
+        Уроки для стартового экрана; у сохранённых — has_save и progress
+        {task_index, correct, attempts, updated}: все сохранения одним
+        запросом (save.saved_progress), без has_save на каждый урок.
+        """
+        from app.engine.lesson_loader import default_repository
+        from app.storage.save import saved_progress
+
+        progress = saved_progress(self.user)
         return {
             "lessons": [
-                {"id": "01_paths", "title": "01 — Пути и навигация"},
-                {"id": "02_files", "title": "02 — Файлы и папки"},
+                {"id": info.id, "title": info.title, "task_count": info.task_count,
+                 "has_save": info.id in progress, "progress": progress.get(info.id)}
+                for info in default_repository().index()
             ]
         }
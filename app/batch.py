@@ -0,0 +1,208 @@
+"""
+Прогон записанных сессий через уроки без окна pywebview.
+
+Запуск из корня репозитория:
+    python -m app.batch transcripts/*.txt
+    python -m app.batch sessions.jsonl --jobs 8 --json > report.jsonl
+    python -m app.batch fixes.txt --lesson 02_files --lessons-dir /tmp/lessons
+
+Форматы файлов:
+- *.txt   — одна команда на строку; "# lesson: <id>" задаёт урок,
+            остальные строки с # — комментарии
+- *.json  — {"lesson_id": .., "commands": [..]} или список таких объектов
+- *.jsonl — по такому объекту на строку (тысячи сессий в одном файле)
+
+На каждый шаг печатается ok/код/прогресс, в конце — сводка и скорость.
+Код выхода 1, если хоть одна сессия упала с исключением.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from app.engine.lesson_loader import LessonRepository, default_repository
+from app.engine.session import Session
+
+
+@dataclass(frozen=True)
+class Transcript:
+    name: str
+    lesson_id: str
+    commands: tuple[str, ...]
+
+
+@dataclass
+class Result:
+    name: str
+    lesson_id: str
+    steps: list[dict[str, Any]] = field(default_factory=list)
+    completed: bool = False
+    crash: str | None = None
+
+
+# ---------- чтение транскриптов ----------
+def _from_obj(obj: Any, name: str, default_lesson: str) -> Transcript:
+    if not isinstance(obj, dict) or not isinstance(obj.get("commands"), list):
+        raise ValueError(f"{name}: expected an object with a \"commands\" list")
+    return Transcript(
+        name=str(obj.get("id", name)),
+        lesson_id=str(obj.get("lesson_id", default_lesson)),
+        commands=tuple(str(c) for c in obj["commands"]),
+    )
+
+
+def read_transcripts(path: str, default_lesson: str) -> Iterator[Transcript]:
+    base = os.path.basename(path)
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for n, line in enumerate(f, 1):
+                if line.strip():
+                    yield _from_obj(json.loads(line), f"{base}:{n}", default_lesson)
+            return
+        if path.endswith(".json"):
+            data = json.load(f)
+            items = data if isinstance(data, list) else [data]
+            for n, obj in enumerate(items, 1):
+                yield _from_obj(obj, base if len(items) == 1 else f"{base}#{n}", default_lesson)
+            return
+
+        lesson_id = default_lesson
+        commands: list[str] = []
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("#"):
+                key, _, value = line[1:].partition(":")
+                if key.strip() == "lesson" and value.strip():
+                    lesson_id = value.strip()
+                continue
+            commands.append(line)
+        yield Transcript(base, lesson_id, tuple(commands))
+
+
+# ---------- прогон ----------
+_repo: LessonRepository | None = None
+
+
+def _init_worker(lessons_dir: str | None) -> None:
+    global _repo
+    _repo = LessonRepository(lessons_dir) if lessons_dir else default_repository()
+
+
+def replay(t: Transcript) -> Result:
+    """
+    Прогнать одну сессию с чистого урока. Исключение внутри движка
+    не роняет прогон: записывается в crash, сессия на этом заканчивается.
+    """
+    res = Result(t.name, t.lesson_id)
+    try:
+        session = Session(t.lesson_id, repo=_repo)
+    except Exception as e:  # урока нет или он не компилируется
+        res.crash = f"{type(e).__name__}: {e}"
+        return res
+
+    for i, cmd in enumerate(t.commands, 1):
+        task_id = session.current_task().id
+        on_last = session.progress_dict()["index"] == session.progress_dict()["total"]
+        try:
+            r = session.submit(cmd)
+            out_lines = sum(1 for _ in r["stdout"])  # вывод тоже вычисляем
+        except Exception:
+            res.crash = f"step {i} ({cmd!r}): " + traceback.format_exc(limit=-3).strip()
+            break
+        p = r["progress"]
+        res.steps.append({
+            "step": i,
+            "cmd": cmd,
+            "task": task_id,
+            "ok": r["ok"],
+            "code": r["feedback"]["code"],
+            "index": p["index"],
+            "total": p["total"],
+            "correct": p["correct"],
+            "stdout_lines": out_lines,
+        })
+        if r["ok"] and on_last:
+            res.completed = True
+    return res
+
+
+def _report_text(res: Result, out) -> None:
+    status = "CRASH" if res.crash else ("done" if res.completed else "open")
+    print(f"== {res.name} [{res.lesson_id}] {status}", file=out)
+    for s in res.steps:
+        mark = "ok " if s["ok"] else "-- "
+        print(f"  {s['step']:>4} {mark}{s['code']:<20} {s['task']:<6} "
+              f"{s['index']}/{s['total']} correct={s['correct']}  $ {s['cmd']}", file=out)
+    if res.crash:
+        print("  " + res.crash.replace("\n", "\n  "), file=out)
+
+
+def _report_json(res: Result, out) -> None:
+    print(json.dumps({
+        "transcript": res.name,
+        "lesson_id": res.lesson_id,
+        "completed": res.completed,
+        "crash": res.crash,
+        "steps": res.steps,
+    }, ensure_ascii=False), file=out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.batch", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("files", nargs="+", help="файлы транскриптов (.txt, .json, .jsonl)")
+    ap.add_argument("--lesson", default="01_paths", help="урок для транскриптов без lesson_id")
+    ap.add_argument("--lessons-dir", default=None, help="каталог уроков вместо app/content/lessons")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="число процессов (1 — без пула)")
+    ap.add_argument("--json", action="store_true", help="JSON-строка на транскрипт вместо текста")
+    ap.add_argument("--quiet", action="store_true", help="только сводка")
+    ns = ap.parse_args(argv)
+
+    transcripts = [t for path in ns.files for t in read_transcripts(path, ns.lesson)]
+    report = _report_json if ns.json else _report_text
+    # сводка — в stderr, чтобы --json > file давал чистый JSONL
+    summary_out = sys.stderr if ns.json else sys.stdout
+
+    codes: Counter[str] = Counter()
+    steps = completed = crashed = 0
+    t0 = time.perf_counter()
+
+    if ns.jobs <= 1:
+        _init_worker(ns.lessons_dir)
+        results = map(replay, transcripts)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=ns.jobs, initializer=_init_worker, initargs=(ns.lessons_dir,))
+        results = pool.map(replay, transcripts, chunksize=max(1, len(transcripts) // (ns.jobs * 8)))
+
+    try:
+        for res in results:
+            if not ns.quiet:
+                report(res, sys.stdout)
+            steps += len(res.steps)
+            codes.update(s["code"] for s in res.steps)
+            completed += res.completed
+            crashed += res.crash is not None
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    dt = time.perf_counter() - t0
+    print(f"\n{len(transcripts)} transcripts, {steps} steps in {dt:.2f} s "
+          f"({len(transcripts) / dt:.0f} transcripts/s, {steps / dt:.0f} steps/s, jobs={ns.jobs})", file=summary_out)
+    print(f"completed: {completed}, open: {len(transcripts) - completed - crashed}, crashed: {crashed}", file=summary_out)
+    print("codes: " + ", ".join(f"{c}={n}" for c, n in codes.most_common()), file=summary_out)
+    return 1 if crashed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
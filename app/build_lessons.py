@@ -0,0 +1,37 @@
+"""
+Сборка бандла уроков: все app/content/lessons/*.json, скомпилированные
+в один файл app/content/lessons.bundle (marshal). Шаг упаковки
+приложения: с бандлом старт не разбирает JSON и не обходит каталог
+уроков (см. LessonRepository).
+
+Запуск из корня репозитория:
+    python -m app.build_lessons
+    python -m app.build_lessons --lessons-dir /tmp/lessons --out /tmp/lessons.bundle
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+from app.engine.lesson_loader import BUNDLE_PATH, LESSONS_DIR, build_bundle
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.build_lessons", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--lessons-dir", default=LESSONS_DIR, help="каталог уроков")
+    ap.add_argument("--out", default=BUNDLE_PATH, help="куда записать бандл")
+    ns = ap.parse_args(argv)
+
+    try:
+        n = build_bundle(ns.lessons_dir, ns.out)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{n} lesson(s) -> {ns.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
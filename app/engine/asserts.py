@@ -1,7 +1,15 @@
 from __future__ import annotations
 
 import posixpath
-from app.engine.vfs import VFS
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, ClassVar
+
+from app.engine.filedata import FileData
+from app.engine.vfs import VFS, AnyNode, FrozenNode, node_digest
+
+# сколько расхождений с ожидаемым деревом показывать в "Осталось:"
+MAX_TREE_PROBLEMS = 10
 
 
 def _abs(path: str, cwd: str) -> str:
@@ -10,66 +18,283 @@ def _abs(path: str, cwd: str) -> str:
     return posixpath.normpath(path)
 
 
-def check_asserts(assert_list, *, cwd, vfs: VFS, last_cmd: str, last_args: list[str]):
-    problems: list[str] = []
+class AssertContext:
+    """
+    Состояние после команды, общее для всех assert'ов одного submit.
+    Разрешение путей и stat кэшируются: несколько assert'ов на один путь
+    ходят в VFS один раз.
+    """
+
+    __slots__ = ("cwd", "vfs", "last_cmd", "last_args", "_abs", "_stat")
+
+    def __init__(self, *, cwd: str, vfs: VFS, last_cmd: str, last_args: list[str]) -> None:
+        self.cwd = cwd
+        self.vfs = vfs
+        self.last_cmd = last_cmd
+        self.last_args = last_args
+        self._abs: dict[str, str] = {}
+        self._stat: dict[str, str | None] = {}
+
+    def abs(self, path: str) -> str:
+        p = self._abs.get(path)
+        if p is None:
+            p = self._abs[path] = _abs(path, self.cwd)
+        return p
+
+    def stat(self, path: str) -> str | None:
+        """kind ("dir" | "file") по пути относительно cwd или None."""
+        p = self.abs(path)
+        try:
+            return self._stat[p]
+        except KeyError:
+            kind = self._stat[p] = self.vfs.stat(p)
+            return kind
+
+
+class Assert(ABC):
+    """
+    Скомпилированный assert. compile() проверяет поля один раз при загрузке
+    урока (ValueError), check() на горячем пути только проверяет состояние
+    и возвращает текст проблемы или None.
+    """
+
+    type: ClassVar[str]
+
+    @classmethod
+    @abstractmethod
+    def compile(cls, raw: dict[str, Any]) -> "Assert":
+        ...
+
+    @abstractmethod
+    def check(self, ctx: AssertContext) -> str | None:
+        ...
+
+
+ASSERTS: dict[str, type[Assert]] = {}
+
+
+def register(type_name: str) -> Callable[[type[Assert]], type[Assert]]:
+    def deco(cls: type[Assert]) -> type[Assert]:
+        if type_name in ASSERTS:
+            raise ValueError(f"Assert type already registered: {type_name}")
+        # забытый compile/check — ошибка при импорте, а не на submit ученика
+        if cls.__abstractmethods__:
+            raise ValueError(f"Assert type {type_name} does not implement: {', '.join(sorted(cls.__abstractmethods__))}")
+        cls.type = type_name
+        ASSERTS[type_name] = cls
+        return cls
+    return deco
+
+
+def _field(raw: dict[str, Any], key: str, type_name: str) -> str:
+    v = raw.get(key)
+    if not isinstance(v, str):
+        raise ValueError(f"{type_name} без {key}")
+    return v
+
+
+@register("exists_dir")
+@dataclass(frozen=True)
+class ExistsDir(Assert):
+    path: str
+
+    @classmethod
+    def compile(cls, raw: dict[str, Any]) -> Assert:
+        return cls(_field(raw, "path", "exists_dir"))
+
+    def check(self, ctx: AssertContext) -> str | None:
+        if ctx.stat(self.path) != "dir":
+            return f"Создай директорию: {ctx.abs(self.path)}"
+        return None
+
+
+@register("exists_file")
+@dataclass(frozen=True)
+class ExistsFile(Assert):
+    path: str
+
+    @classmethod
+    def compile(cls, raw: dict[str, Any]) -> Assert:
+        return cls(_field(raw, "path", "exists_file"))
+
+    def check(self, ctx: AssertContext) -> str | None:
+        if ctx.stat(self.path) != "file":
+            return f"Создай файл: {ctx.abs(self.path)}"
+        return None
+
+
+@register("cwd_is")
+@dataclass(frozen=True)
+class CwdIs(Assert):
+    value: str
+    normalized: str
+
+    @classmethod
+    def compile(cls, raw: dict[str, Any]) -> Assert:
+        value = _field(raw, "value", "cwd_is")
+        return cls(value, posixpath.normpath(value))
+
+    def check(self, ctx: AssertContext) -> str | None:
+        if posixpath.normpath(ctx.cwd) != self.normalized:
+            return f"Перейди в: {self.value}"
+        return None
+
 
+@register("last_cmd_is")
+@dataclass(frozen=True)
+class LastCmdIs(Assert):
+    value: str
+
+    @classmethod
+    def compile(cls, raw: dict[str, Any]) -> Assert:
+        return cls(_field(raw, "value", "last_cmd_is"))
+
+    def check(self, ctx: AssertContext) -> str | None:
+        if ctx.last_cmd != self.value:
+            return f"Используй команду: {self.value}"
+        return None
+
+
+@register("has_flag")
+@dataclass(frozen=True)
+class HasFlag(Assert):
+    value: str
+
+    @classmethod
+    def compile(cls, raw: dict[str, Any]) -> Assert:
+        return cls(_field(raw, "value", "has_flag"))
+
+    def check(self, ctx: AssertContext) -> str | None:
+        if self.value not in ctx.last_args:
+            return f"Добавь флаг {self.value}"
+        return None
+
+
+def _layout(raw: Any, name: str, type_name: str) -> FrozenNode:
+    """Ожидаемое дерево из урока: объект — директория, строка — файл с этим текстом."""
+    if isinstance(raw, str):
+        return FrozenNode(name, "file", None, FileData.from_text(raw))
+    if not isinstance(raw, dict):
+        raise ValueError(f"{type_name}: в tree ожидаются объекты (директории) и строки (файлы)")
+    children: dict[str, FrozenNode] = {}
+    for k, v in raw.items():
+        if not k or "/" in k or k in (".", ".."):
+            raise ValueError(f"{type_name}: некорректное имя в tree: {k!r}")
+        children[k] = _layout(v, k, type_name)
+    return FrozenNode(name, "dir", children)
+
+
+def _diff(actual: AnyNode, expected: FrozenNode, path: str, exact: bool, out: list[str]) -> None:
+    """
+    Расхождения actual с expected. Поддеревья с равными Merkle-хэшами
+    пропускаются: обходятся только отличающиеся ветки.
+    """
+    children = actual.children or {}
+    for name in expected.sorted_names():
+        e = expected.children[name]
+        a = children.get(name)
+        p = posixpath.join(path, name)
+        if a is None:
+            out.append(f"Создай {'директорию' if e.kind == 'dir' else 'файл'}: {p}")
+        elif a.kind != e.kind:
+            out.append(f"{p} должен быть {'директорией' if e.kind == 'dir' else 'файлом'}")
+        elif node_digest(a) == node_digest(e):
+            continue
+        elif e.kind == "file":
+            out.append(f"Исправь содержимое файла: {p}")
+        else:
+            _diff(a, e, p, exact, out)
+    if exact:
+        out.extend(f"Удали лишнее: {posixpath.join(path, name)}"
+                   for name in actual.sorted_names() if name not in expected.children)
+
+
+class TreeAssert(Assert):
+    """
+    Поддерево path против ожидаемого дерева из урока (tree). Сначала
+    сравниваются Merkle-хэши корней — совпали, дальше не смотрим.
+    """
+
+    exact: ClassVar[bool]
+
+    @classmethod
+    def compile(cls, raw: dict[str, Any]) -> Assert:
+        path = _field(raw, "path", cls.type)
+        if not isinstance(raw.get("tree"), dict):
+            raise ValueError(f"{cls.type} без tree")
+        tree = _layout(raw["tree"], "", cls.type)
+        node_digest(tree)  # хэши ожидаемого дерева — один раз при загрузке урока
+        return cls(path, tree)
+
+    def check(self, ctx: AssertContext) -> str | None:
+        node = ctx.vfs.lookup(ctx.abs(self.path))
+        if node is None or node.kind != "dir":
+            return f"Создай директорию: {ctx.abs(self.path)}"
+        if node_digest(node) == node_digest(self.tree):
+            return None
+        out: list[str] = []
+        _diff(node, self.tree, ctx.abs(self.path), self.exact, out)
+        if not out:  # subtree_matches: отличаются только лишние имена
+            return None
+        if len(out) > MAX_TREE_PROBLEMS:
+            out[MAX_TREE_PROBLEMS:] = [f"... и ещё {len(out) - MAX_TREE_PROBLEMS}"]
+        return "\n- ".join(out)
+
+
+@register("tree_equals")
+@dataclass(frozen=True)
+class TreeEquals(TreeAssert):
+    """Поддерево — ровно tree: лишние файлы и директории тоже ошибка."""
+
+    exact = True
+    path: str
+    tree: FrozenNode
+
+
+@register("subtree_matches")
+@dataclass(frozen=True)
+class SubtreeMatches(TreeAssert):
+    """Всё из tree есть в поддереве; остальное не проверяется."""
+
+    exact = False
+    path: str
+    tree: FrozenNode
+
+
+def compile_asserts(assert_list: Any) -> tuple[Assert, ...]:
+    """
+    Собрать assert'ы задания; любая ошибка в описании — ValueError.
+    """
     if not isinstance(assert_list, list):
-        return False, "Ошибка задания: assert должен быть списком."
+        raise ValueError("Ошибка задания: assert должен быть списком.")
 
+    out: list[Assert] = []
     for a in assert_list:
         if not isinstance(a, dict):
-            problems.append("Некорректный assert.")
-            continue
-
+            raise ValueError("Некорректный assert.")
         t = a.get("type")
         if not isinstance(t, str):
-            problems.append("Некорректный assert (нет type).")
-            continue
+            raise ValueError("Некорректный assert (нет type).")
+        cls = ASSERTS.get(t)
+        if cls is None:
+            raise ValueError(f"Неизвестный assert.type: {t}")
+        out.append(cls.compile(a))
+    return tuple(out)
 
-        if t == "exists_dir":
-            path = a.get("path")
-            if not isinstance(path, str):
-                problems.append("exists_dir без path")
-                continue
-            p = _abs(path, cwd)
-            if not vfs.exists(p) or not vfs.is_dir(p):
-                problems.append(f"Создай директорию: {p}")
-
-        elif t == "exists_file":
-            path = a.get("path")
-            if not isinstance(path, str):
-                problems.append("exists_file без path")
-                continue
-            p = _abs(path, cwd)
-            if not vfs.exists(p) or not vfs.is_file(p):
-                problems.append(f"Создай файл: {p}")
-
-        elif t == "cwd_is":
-            expected = a.get("value")
-            if not isinstance(expected, str):
-                problems.append("cwd_is без value")
-                continue
-            if posixpath.normpath(cwd) != posixpath.normpath(expected):
-                problems.append(f"Перейди в: {expected}")
-
-        elif t == "last_cmd_is":
-            expected = a.get("value")
-            if not isinstance(expected, str):
-                problems.append("last_cmd_is без value")
-                continue
-            if last_cmd != expected:
-                problems.append(f"Используй команду: {expected}")
-
-        elif t == "has_flag":
-            flag = a.get("value")
-            if not isinstance(flag, str):
-                problems.append("has_flag без value")
-                continue
-            if flag not in last_args:
-                problems.append(f"Добавь флаг {flag}")
 
-        else:
-            problems.append(f"Неизвестный assert.type: {t}")
+def check_asserts(assert_list, *, cwd, vfs: VFS, last_cmd: str, last_args: list[str]):
+    """
+    assert_list — результат compile_asserts(); сырой список из JSON
+    тоже принимается и компилируется на месте.
+    """
+    if not isinstance(assert_list, tuple):
+        try:
+            assert_list = compile_asserts(assert_list)
+        except ValueError as e:
+            return False, str(e)
+
+    ctx = AssertContext(cwd=cwd, vfs=vfs, last_cmd=last_cmd, last_args=last_args)
+    problems = [p for p in (a.check(ctx) for a in assert_list) if p is not None]
 
     if problems:
         return False, "Осталось:\n- " + "\n- ".join(problems)
@@ -1,18 +1,96 @@
 from __future__ import annotations
 
-import shlex
+from dataclasses import dataclass
+from time import perf_counter_ns
 from typing import Any
 
-from app.engine.shell import exec_command
-from app.engine.asserts import check_asserts
+from app.engine import metrics
+from app.engine.parser import CommandLine, ParseError, parse
+from app.engine.shell import run_line
+from app.engine.asserts import Assert, check_asserts, compile_asserts
 from app.engine.vfs import VFS
 
+# ответы, которые зависят только от строки и rule задания (не от VFS):
+# их UI может дать сам по CompiledRule.to_client(), см. ui/js/precheck.js
+STATIC_CODES = frozenset({"ERR_PARSE", "ERR_EMPTY", "ERR_CMD_NOT_ALLOWED", "ERR_WRONG_CMD"})
+
+_MSG_PARSE = "Не получилось разобрать команду: {error}"
+_MSG_EMPTY = "Пустая команда."
+_MSG_NOT_ALLOWED = "В этом задании нельзя использовать '{cmd}'. Разрешено: {allowed}"
+_MSG_WRONG_CMD = "Здесь ожидается команда '{expected}'."
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """
+    rule задания, проверенный и подготовленный один раз при загрузке урока.
+    """
+    kind: str
+    allowed: frozenset[str]          # в нижнем регистре, для проверки
+    allowed_display: str             # как в уроке, для сообщения об ошибке
+    expected_cmd: str | None         # в нижнем регистре
+    expected_display: str | None
+    asserts: tuple[Assert, ...]
+
+    def to_client(self) -> dict[str, Any]:
+        """
+        Статическая часть проверки для UI: разрешённые и ожидаемая команды
+        и готовые тексты ошибок ({cmd} и {error} подставляет JS).
+        """
+        return {
+            "allowed": sorted(self.allowed),
+            "expected": self.expected_cmd,
+            "messages": {
+                "parse": _MSG_PARSE,
+                "empty": _MSG_EMPTY,
+                "not_allowed": _MSG_NOT_ALLOWED.replace("{allowed}", self.allowed_display),
+                "wrong_cmd": _MSG_WRONG_CMD.format(expected=self.expected_display) if self.expected_cmd else None,
+            },
+        }
+
+
+def compile_rule(rule: Any) -> CompiledRule:
+    """
+    Проверить rule из JSON урока. Ошибки — ValueError при загрузке,
+    а не ERR_BAD_RULE на каждом submit.
+    """
+    if not isinstance(rule, dict):
+        raise ValueError("Ошибка задания: rule должен быть объектом.")
 
-def _parse(user_input: str) -> list[str] | None:
+    kind = rule.get("kind")
+    if kind != "goal":
+        raise ValueError("Неизвестный тип задания (rule.kind). Ожидался 'goal'.")
+
+    allowed = rule.get("allowed_cmds", [])
+    if not isinstance(allowed, list) or not all(isinstance(x, str) for x in allowed):
+        raise ValueError("Ошибка задания: allowed_cmds должен быть списком строк.")
+
+    expected_cmd = rule.get("expected_cmd")
+    if expected_cmd is not None and not isinstance(expected_cmd, str):
+        raise ValueError("Ошибка задания: expected_cmd должен быть строкой.")
+    if isinstance(expected_cmd, str) and not expected_cmd.strip():
+        expected_cmd = None
+
+    return CompiledRule(
+        kind=kind,
+        allowed=frozenset(x.lower() for x in allowed),
+        allowed_display=", ".join(allowed),
+        expected_cmd=expected_cmd.strip().lower() if expected_cmd else None,
+        expected_display=expected_cmd,
+        asserts=compile_asserts(rule.get("assert", [])),
+    )
+
+
+def _parse(user_input: str) -> CommandLine | ParseError:
+    """
+    CommandLine или синтаксическая ошибка (pos — в user_input, как его ввели).
+    """
+    line = user_input.strip()
     try:
-        return shlex.split(user_input.strip())
-    except ValueError:
-        return None
+        return parse(line)
+    except ParseError as e:
+        e.pos += len(user_input) - len(user_input.lstrip())
+        return e
 
 
 def _err(code: str, msg: str) -> tuple[bool, dict[str, Any], dict[str, Any]]:
@@ -23,57 +101,61 @@ def _ok(msg: str, effects: dict[str, Any] | None = None) -> tuple[bool, dict[str
     return True, {"code": "OK", "message": msg}, (effects or {})
 
 
-def check_command(*, user_input: str, rule: dict[str, Any], cwd: str, home: str, vfs: VFS) -> tuple[bool, dict[str, Any], dict[str, Any]]:
-    tokens = _parse(user_input)
-    if tokens is None:
-        return _err("ERR_PARSE", "Не получилось разобрать команду (проверь кавычки).")
-    if len(tokens) == 0:
-        return _err("ERR_EMPTY", "Пустая команда.")
-
-    cmd = tokens[0].lower()
-    args = tokens[1:]
-
-    kind = rule.get("kind")
-    if kind != "goal":
-        return _err("ERR_UNKNOWN_KIND", "Неизвестный тип задания (rule.kind). Ожидался 'goal'.")
-
-    allowed = rule.get("allowed_cmds", [])
-    if not isinstance(allowed, list) or not all(isinstance(x, str) for x in allowed):
-        return _err("ERR_BAD_RULE", "Ошибка задания: allowed_cmds должен быть списком строк.")
-
-    allowed_lc = [x.lower() for x in allowed]
-    if cmd not in allowed_lc:
-        return _err("ERR_CMD_NOT_ALLOWED", f"В этом задании нельзя использовать '{cmd}'. Разрешено: {', '.join(allowed)}")
-
-    expected_cmd = rule.get("expected_cmd")
-    if isinstance(expected_cmd, str) and expected_cmd.strip():
-        if cmd != expected_cmd.strip().lower():
-            return _err("ERR_WRONG_CMD", f"Здесь ожидается команда '{expected_cmd}'.")
-
-    # выполняем команду
-    r = exec_command(cmd=cmd, args=args, cwd=cwd, home=home, vfs=vfs)
-    if not r.ok:
-        return _err(r.code, r.message)
+def check_command(*, user_input: str, rule: CompiledRule | dict[str, Any], cwd: str, home: str, vfs: VFS) -> tuple[bool, dict[str, Any], dict[str, Any]]:
+    if not isinstance(rule, CompiledRule):
+        try:
+            rule = compile_rule(rule)
+        except ValueError as e:
+            return _err("ERR_BAD_RULE", str(e))
+
+    m = metrics.ACTIVE
+    t0 = perf_counter_ns() if m else 0
+    line = _parse(user_input)
+    if m:
+        m.observe("parse", t0)
+    if isinstance(line, ParseError):
+        return False, {"code": "ERR_PARSE", "message": _MSG_PARSE.format(error=line), "pos": line.pos}, {}
+    if not line.items:
+        return _err("ERR_EMPTY", _MSG_EMPTY)
+
+    # каждая команда строки (в т.ч. внутри конвейера) должна быть разрешена
+    cmds = [c.argv[0].lower() for c in line.commands()]
+    if m:
+        m.count(cmds)
+    for cmd in cmds:
+        if cmd not in rule.allowed:
+            return _err("ERR_CMD_NOT_ALLOWED", _MSG_NOT_ALLOWED.format(cmd=cmd, allowed=rule.allowed_display))
+
+    if rule.expected_cmd is not None and rule.expected_cmd not in cmds:
+        return _err("ERR_WRONG_CMD", _MSG_WRONG_CMD.format(expected=rule.expected_display))
+
+    # выполняем строку
+    t0 = perf_counter_ns() if m else 0
+    r = run_line(line, cwd=cwd, home=home, vfs=vfs)
+    if m:
+        m.observe("exec", t0)
 
     effects = dict(r.effects)
-    if r.stdout_lines:
-        effects["stdout_lines"] = r.stdout_lines
+    # stdout остаётся ленивым: читает его уже UI, кусками (см. output.py)
+    effects["stdout"] = r.stdout()
 
-    asserts = rule.get("assert", [])
-    if not isinstance(asserts, list):
-        return _err("ERR_BAD_RULE", "Ошибка задания: assert должен быть списком.")
+    if not r.ok:
+        return False, {"code": r.code, "message": r.message}, effects
 
     # если cd меняет cwd — asserts должны проверяться в новом cwd
     new_cwd = effects.get("set_cwd", cwd)
     last_cmd = effects.get("last_cmd", "")
 
+    t0 = perf_counter_ns() if m else 0
     ok_goal, msg_goal = check_asserts(
-        asserts,
+        rule.asserts,
         cwd=new_cwd,
         vfs=vfs,
         last_cmd=last_cmd,
         last_args=effects.get("last_args", []),
     )
+    if m:
+        m.observe("asserts", t0)
 
     if ok_goal:
         return _ok("Цель достигнута.", effects)
@@ -0,0 +1,203 @@
+"""
+Дополнение по Tab: имена команд задания и пути VFS.
+
+Слово под курсором разбирается как в parser.tokenize (кавычки, \\,
+операторы): первое слово команды дополняется из разрешённых в задании
+команд, остальные и цели > / >> — путями. Путь — как в командах:
+~, .., абсолютные и относительные через normalize_path.
+
+Имена ищутся в отсортированном списке детей директории
+(Node.sorted_names: строится один раз и дальше поддерживается
+инкрементально при add_child/remove_child) двумя bisect по префиксу,
+общий префикс всех вариантов — общий префикс первого и последнего.
+Так нажатие Tab стоит O(log n + показанные варианты), а не сортировку
+или обход директории.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any, Sequence
+
+from app.engine.normalize import normalize_path
+from app.engine.parser import OPERATORS
+from app.engine.vfs import VFS
+
+# сколько вариантов отдавать для показа (остальные — только числом)
+MAX_CANDIDATES = 100
+
+# вне кавычек эти символы в дописанном имени экранируются \
+_SPECIAL = frozenset(" \t\\'\"|;&><*?[]{}$`#")
+_GLOB = frozenset("*?[")
+
+
+@dataclass(frozen=True)
+class Completion:
+    # что дописать в позицию курсора ("" — дописать нечего)
+    insert: str = ""
+    # варианты для показа, если их несколько и общий префикс уже набран;
+    # директории — с "/" на конце
+    candidates: tuple[str, ...] = ()
+    # сколько всего вариантов (candidates могут быть обрезаны)
+    total: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"insert": self.insert, "candidates": list(self.candidates), "total": self.total}
+
+
+@dataclass(frozen=True)
+class _Word:
+    text: str              # слово без кавычек и \
+    quote: str | None      # открытая кавычка в позиции курсора
+    command: bool          # позиция имени команды
+    magic: bool            # незакавыченный *, ? или [ — это шаблон, не дополняем
+
+
+def _current_word(line: str) -> _Word:
+    """Последнее (недописанное) слово строки — как его увидит tokenize."""
+    buf: list[str] = []
+    words = 0             # слов в текущей простой команде
+    redirect = False      # следующее слово — цель > / >>
+    in_word = magic = False
+    quote: str | None = None
+    i, n = 0, len(line)
+
+    def end_word() -> None:
+        nonlocal words, redirect, in_word, magic
+        if in_word:
+            if redirect:
+                redirect = False
+            else:
+                words += 1
+            buf.clear()
+            in_word = magic = False
+
+    while i < n:
+        c = line[i]
+        if quote == "'":
+            if c == "'":
+                quote = None
+            else:
+                buf.append(c)
+        elif quote == '"':
+            if c == '"':
+                quote = None
+            elif c == "\\" and i + 1 < n and line[i + 1] in '\\"$`':
+                i += 1
+                buf.append(line[i])
+            else:
+                buf.append(c)
+        elif c in " \t\r\n":
+            end_word()
+        elif c in "'\"":
+            quote = c
+            in_word = True
+        elif c == "\\":
+            if i + 1 < n:
+                i += 1
+                buf.append(line[i])
+            in_word = True
+        elif c in "|&;<>":
+            # ||, & и < parser не примет, но и для дополнения это граница команды
+            end_word()
+            op = "||" if line.startswith("||", i) else next((o for o in OPERATORS if line.startswith(o, i)), c)
+            if op in (">", ">>"):
+                redirect = True
+            else:
+                words = 0
+                redirect = False
+            i += len(op)
+            continue
+        else:
+            buf.append(c)
+            in_word = True
+            magic = magic or c in _GLOB
+        i += 1
+
+    text = "".join(buf) if in_word or quote else ""
+    return _Word(text=text, quote=quote, command=words == 0 and not redirect, magic=magic)
+
+
+def _escape(text: str, quote: str | None) -> str:
+    if quote == "'":
+        return text
+    if quote == '"':
+        return "".join("\\" + c if c in '"\\$`' else c for c in text)
+    return "".join("\\" + c if c in _SPECIAL else c for c in text)
+
+
+def _common(a: str, b: str) -> str:
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return a[:i]
+
+
+def _prefix_ranges(names: Sequence[str], prefix: str) -> list[tuple[int, int]]:
+    """
+    Непустые диапазоны отсортированного names, имена в которых начинаются
+    с prefix. Скрытые (с ".") — только если prefix сам с "." начинается.
+    """
+    lo = bisect_left(names, prefix)
+    if prefix:
+        hi = bisect_left(names, prefix[:-1] + chr(ord(prefix[-1]) + 1), lo)
+        ranges = [(lo, hi)]
+    else:
+        # "." < "/" < всех прочих печатных после него: скрытые — один блок
+        d0 = bisect_left(names, ".")
+        d1 = bisect_left(names, "/", d0)
+        ranges = [(lo, d0), (d1, len(names))]
+    return [(a, b) for a, b in ranges if a < b]
+
+
+def _finish(prefix: str, names: Sequence[str], ranges: list[tuple[int, int]], quote: str | None,
+            is_dir) -> Completion:
+    total = sum(b - a for a, b in ranges)
+    if total == 0:
+        return Completion()
+    first, last = names[ranges[0][0]], names[ranges[-1][1] - 1]
+    if total == 1:
+        tail = "/" if is_dir(first) else (quote or "") + " "
+        return Completion(insert=_escape(first[len(prefix):], quote) + tail, total=1)
+    common = _common(first, last)
+    if len(common) > len(prefix):
+        return Completion(insert=_escape(common[len(prefix):], quote), total=total)
+    shown: list[str] = []
+    for a, b in ranges:
+        for j in range(a, min(b, a + MAX_CANDIDATES - len(shown))):
+            shown.append(names[j] + "/" if is_dir(names[j]) else names[j])
+    return Completion(candidates=tuple(shown), total=total)
+
+
+def complete(line: str, cursor: int, *, commands: Sequence[str], vfs: VFS, cwd: str, home: str) -> Completion:
+    """
+    Дополнить line в позиции cursor. commands — отсортированные имена
+    команд, разрешённых в задании.
+    """
+    w = _current_word(line[:max(0, min(cursor, len(line)))])
+    if w.magic:
+        return Completion()
+
+    if w.command and "/" not in w.text:
+        return _finish(w.text, commands, _prefix_ranges(commands, w.text), w.quote, lambda _: False)
+
+    text = w.text
+    if text in ("~", ".."):
+        # как bash: ~ и .. — директории, дописываем "/"
+        return Completion(insert="/", total=1)
+    slash = text.rfind("/")
+    if slash >= 0:
+        dir_path = normalize_path(text[:slash + 1], cwd=cwd, home=home)
+        base = text[slash + 1:]
+    else:
+        dir_path, base = cwd, text
+
+    node = vfs.lookup(dir_path)
+    if node is None or node.kind != "dir":
+        return Completion()
+    children = node.children or {}
+    names = node.sorted_names()
+    return _finish(base, names, _prefix_ranges(names, base), w.quote,
+                   lambda name: children[name].kind == "dir")
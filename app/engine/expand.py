@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import fnmatch
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+from app.engine.normalize import normalize_path
+from app.engine.vfs import VFS, Node
+
+_MAGIC = re.compile(r"[*?\[]")
+
+
+def has_magic(word: str) -> bool:
+    return _MAGIC.search(word) is not None
+
+
+# ---------- фигурные скобки ----------
+def _find_brace(word: str) -> tuple[int, int, Iterable[str]] | None:
+    """
+    Первая раскрываемая пара {...}: (start, end, варианты) или None.
+    Вложенные скобки учитываются: {a,{b,c}}. Варианты {a..b} порождаются
+    лениво — их число ограничивает MAX_WORDS в brace_expand.
+    """
+    i = 0
+    n = len(word)
+    while i < n:
+        if word[i] != "{":
+            i += 1
+            continue
+        depth = 0
+        parts: list[str] = []
+        last = i + 1
+        for j in range(i, n):
+            c = word[j]
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    parts.append(word[last:j])
+                    if len(parts) > 1:
+                        return i, j, parts
+                    seq = _sequence(parts[0])
+                    if seq is not None:
+                        return i, j, seq
+                    break
+            elif c == "," and depth == 1:
+                parts.append(word[last:j])
+                last = j + 1
+        i += 1
+    return None
+
+
+_SEQ = re.compile(r"^(-?\d+)\.\.(-?\d+)$|^([A-Za-z])\.\.([A-Za-z])$")
+
+# слов в команде после раскрытия — всего, по всем аргументам: {1..3000}{1..3000}
+# из 20 символов дал бы 9 млн, а сервер класса однопоточный (app/server.py)
+MAX_WORDS = 10_000
+
+
+_MSG_TOO_MANY = f"Слишком много слов после раскрытия {{...}} и шаблонов: больше {MAX_WORDS}."
+
+
+class ExpansionError(ValueError):
+    """Раскрытие дало больше MAX_WORDS слов."""
+
+
+def _sequence(body: str) -> Iterator[str] | None:
+    m = _SEQ.match(body)
+    if m is None:
+        return None
+    if m.group(1) is not None:
+        a, b = int(m.group(1)), int(m.group(2))
+        step = 1 if b >= a else -1
+        width = max(len(m.group(1)), len(m.group(2))) if m.group(1).startswith("0") or m.group(2).startswith("0") else 0
+        return (str(x).zfill(width) for x in range(a, b + step, step))
+    a, b = ord(m.group(3)), ord(m.group(4))
+    step = 1 if b >= a else -1
+    return (chr(x) for x in range(a, b + step, step))
+
+
+def _brace_words(word: str) -> Iterator[str]:
+    found = _find_brace(word)
+    if found is None:
+        yield word
+        return
+    start, end, options = found
+    head, tail = word[:start], word[end + 1:]
+    for opt in options:
+        yield from _brace_words(head + opt + tail)
+
+
+def brace_expand(word: str, limit: int = MAX_WORDS) -> list[str]:
+    """
+    a{1..3}.txt -> a1.txt a2.txt a3.txt, {src,test}/x -> src/x test/x.
+    Слово без раскрываемых скобок возвращается как есть. Слова считаются
+    по мере порождения: больше limit — ExpansionError, всё
+    декартово произведение не строится.
+    """
+    out: list[str] = []
+    for w in _brace_words(word):
+        if len(out) >= limit:
+            raise ExpansionError(_MSG_TOO_MANY)
+        out.append(w)
+    return out
+
+
+# ---------- glob ----------
+@dataclass(frozen=True)
+class Glob:
+    """
+    Скомпилированный шаблон пути.
+    prefix — литеральная голова как написана ("", "/usr/", "../", "~/"),
+    segments — по сегменту пути: ("lit", имя) | ("re", match) | ("**", None).
+    """
+    prefix: str
+    segments: tuple[tuple[str, object], ...]
+    dirs_only: bool
+
+
+def _dot_ok(segment: str) -> bool:
+    # скрытые имена (.x) подходят, только если сегмент шаблона сам начинается с точки
+    return segment.startswith(".")
+
+
+@lru_cache(maxsize=512)
+def compile_glob(pattern: str) -> Glob:
+    dirs_only = pattern.endswith("/")
+    parts = pattern.rstrip("/").split("/")
+    head: list[str] = []
+    while parts and not has_magic(parts[0]):
+        head.append(parts.pop(0))
+    if not parts:  # магии нет совсем — последнюю часть оставляем сегментом
+        parts = [head.pop()]
+
+    segments: list[tuple[str, object]] = []
+    for p in parts:
+        if p == "":
+            continue
+        if p == "**":
+            if not segments or segments[-1][0] != "**":
+                segments.append(("**", None))
+        elif has_magic(p):
+            segments.append(("re", (re.compile(fnmatch.translate(p)).match, _dot_ok(p))))
+        else:
+            segments.append(("lit", p))
+
+    prefix = "/".join(head) + "/" if head else ""
+    return Glob(prefix=prefix, segments=tuple(segments), dirs_only=dirs_only)
+
+
+def glob(pattern: str, *, cwd: str, home: str, vfs: VFS) -> list[str]:
+    """
+    Пути VFS, подходящие под шаблон (*, ?, [...], **), в порядке обхода
+    по отсортированным именам. Обходятся только директории, чей префикс
+    ещё может совпасть: литеральный сегмент — прямой поиск ребёнка,
+    шаблонный — фильтр детей одной директории, ** — спуск по поддереву.
+    """
+    g = compile_glob(pattern)
+    base = vfs.lookup(normalize_path(g.prefix or ".", cwd=cwd, home=home))
+    if base is None or base.kind != "dir":
+        return []
+
+    prefix = home + g.prefix[1:] if g.prefix.startswith("~") else g.prefix
+    segs = g.segments
+    last = len(segs)
+    out: list[str] = []
+
+    def emit(node: Node, rel: str) -> None:
+        if not g.dirs_only:
+            out.append(prefix + rel)
+        elif node.kind == "dir":
+            out.append(prefix + rel + "/")
+
+    def join(rel: str, name: str) -> str:
+        return name if not rel else rel + "/" + name
+
+    def everything(node: Node, rel: str) -> None:
+        # хвостовой ** — все потомки (файлы и папки), кроме скрытых
+        ch = node.children or {}
+        for name in node.sorted_names():
+            if name.startswith("."):
+                continue
+            c = ch[name]
+            emit(c, join(rel, name))
+            if c.kind == "dir":
+                everything(c, join(rel, name))
+
+    def walk(node: Node, rel: str, i: int) -> None:
+        if i == last:
+            emit(node, rel)
+            return
+        if node.kind != "dir":
+            return
+        ch = node.children or {}
+        kind, val = segs[i]
+        if kind == "lit":
+            c = ch.get(val)
+            if c is not None:
+                walk(c, join(rel, val), i + 1)
+        elif kind == "re":
+            match, dot_ok = val
+            for name in node.sorted_names():
+                if (dot_ok or not name.startswith(".")) and match(name):
+                    walk(ch[name], join(rel, name), i + 1)
+        elif i + 1 == last:
+            everything(node, rel)
+        else:
+            walk(node, rel, i + 1)  # ** = ноль директорий
+            for name in node.sorted_names():
+                c = ch[name]
+                if c.kind == "dir" and not name.startswith("."):
+                    walk(c, join(rel, name), i)
+
+    walk(base, "", 0)
+    return list(dict.fromkeys(out))
+
+
+def expand_argv(argv: tuple[str, ...], quoted: tuple[bool, ...], *, cwd: str, home: str, vfs: VFS) -> list[str]:
+    """
+    Раскрытие аргументов между разбором строки и выполнением команды:
+    сначала {...}, потом шаблоны путей. Имя команды и слова в кавычках
+    не трогаем; шаблон без совпадений остаётся как есть (как в bash).
+    Больше MAX_WORDS слов на всю команду — ExpansionError.
+    """
+    out = [argv[0]]
+    for word, q in zip(argv[1:], quoted[1:] or (False,) * (len(argv) - 1)):
+        if q:
+            out.append(word)
+            continue
+        for w in brace_expand(word, MAX_WORDS + 1 - len(out)):
+            if has_magic(w):
+                matches = glob(w, cwd=cwd, home=home, vfs=vfs)
+                out.extend(matches if matches else [w])
+            else:
+                out.append(w)
+            if len(out) > MAX_WORDS + 1:
+                raise ExpansionError(_MSG_TOO_MANY)
+    return out
@@ -0,0 +1,283 @@
+"""
+Содержимое файлов VFS.
+
+FileData — неизменяемая последовательность частей:
+- bytes       — данные прямо в узле (echo > f, небольшие файлы урока)
+- AssetSlice  — кусок файла-ассета урока (app/content/assets/...): на диске
+                лежит один раз, читается через mmap, в сохранения попадает
+                только ссылка (имя, смещение, длина)
+
+Запись создаёт новый FileData, а >> дописывает часть в конец, не копируя
+старое содержимое. Поэтому ленивый вывод может держать ссылку на FileData:
+следующие команды строки её не изменят.
+
+Чтение — только кусками по CHUNK байт (chunks / rchunks), целиком файл
+в память не поднимается.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import mmap
+import os
+import posixpath
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Iterable, Iterator, Union
+
+# filedata.py лежит в app/engine/, ассеты уроков — в app/content/assets/
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content", "assets")
+
+# размер куска при чтении и максимальный размер одной inline-части
+CHUNK = 64 * 1024
+
+
+@dataclass(frozen=True)
+class AssetSlice:
+    name: str  # путь внутри ASSETS_DIR, через "/"
+    off: int
+    size: int
+
+
+Part = Union[bytes, AssetSlice]
+
+# открытые ассеты: имя -> mmap (или b"" для пустого файла); общие для всех сессий
+_assets: dict[str, Any] = {}
+
+
+def asset_path(name: str) -> str:
+    """
+    Путь к ассету на диске; имена вида ../x и /x — ValueError.
+    """
+    norm = posixpath.normpath(name)
+    if norm.startswith(("/", "../")) or norm in (".", ".."):
+        raise ValueError(f"Bad asset name: {name}")
+    return os.path.join(ASSETS_DIR, *norm.split("/"))
+
+
+def _asset_buf(name: str) -> Any:
+    buf = _assets.get(name)
+    if buf is None:
+        with open(asset_path(name), "rb") as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # пустой файл не отображается
+                buf = b""
+        _assets[name] = buf
+    return buf
+
+
+def close_assets() -> None:
+    """
+    Закрыть отображённые ассеты (например, перед заменой файлов на диске).
+    Следующее чтение откроет их заново.
+    """
+    for buf in _assets.values():
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+    _assets.clear()
+
+
+def _part_len(p: Part) -> int:
+    return len(p) if isinstance(p, bytes) else p.size
+
+
+def _part_bytes(p: Part, a: int, b: int) -> bytes:
+    """Байты [a, b) части."""
+    if isinstance(p, bytes):
+        return p[a:b]
+    buf = _asset_buf(p.name)
+    return bytes(buf[p.off + a:p.off + min(b, p.size)])
+
+
+@dataclass(frozen=True)
+class FileData:
+    parts: tuple[Part, ...] = ()
+    size: int = 0
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "FileData":
+        return cls((bytes(data),), len(data)) if data else EMPTY
+
+    @classmethod
+    def from_text(cls, text: str) -> "FileData":
+        return cls.from_bytes(text.encode("utf-8"))
+
+    @classmethod
+    def from_asset(cls, name: str) -> "FileData":
+        size = os.stat(asset_path(name)).st_size
+        return cls((AssetSlice(name, 0, size),), size) if size else EMPTY
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[str]) -> "FileData":
+        """
+        Вывод команды -> содержимое файла (каждая строка с \\n).
+        Копится кусками по CHUNK, без одного гигантского join.
+        """
+        parts: list[bytes] = []
+        buf: list[bytes] = []
+        n = 0
+        for line in lines:
+            b = line.encode("utf-8") + b"\n"
+            buf.append(b)
+            n += len(b)
+            if n >= CHUNK:
+                parts.append(b"".join(buf))
+                buf.clear()
+                n = 0
+        if buf:
+            parts.append(b"".join(buf))
+        return cls(tuple(parts), sum(map(len, parts))) if parts else EMPTY
+
+    def __len__(self) -> int:
+        return self.size
+
+    def concat(self, other: "FileData") -> "FileData":
+        """
+        self + other без копирования: части просто дописываются;
+        мелкие inline-куски на стыке склеиваются (пока влезают в CHUNK).
+        """
+        if not other.parts:
+            return self
+        if not self.parts:
+            return other
+        head, first = self.parts, other.parts[0]
+        last = head[-1]
+        if isinstance(last, bytes) and isinstance(first, bytes) and len(last) + len(first) <= CHUNK:
+            parts = head[:-1] + (last + first,) + other.parts[1:]
+        else:
+            parts = head + other.parts
+        return FileData(parts, self.size + other.size)
+
+    # ---------- чтение ----------
+    def chunks(self, chunk: int = CHUNK) -> Iterator[bytes]:
+        for p in self.parts:
+            n = _part_len(p)
+            if isinstance(p, bytes) and n <= chunk:
+                yield p
+                continue
+            for a in range(0, n, chunk):
+                yield _part_bytes(p, a, a + chunk)
+
+    def rchunks(self, chunk: int = CHUNK) -> Iterator[bytes]:
+        """Куски с конца к началу (для tail)."""
+        for p in reversed(self.parts):
+            b = _part_len(p)
+            while b > 0:
+                a = max(0, b - chunk)
+                yield _part_bytes(p, a, b)
+                b = a
+
+    def read(self) -> bytes:
+        return b"".join(self.chunks())
+
+    @cached_property
+    def digest(self) -> bytes:
+        """
+        Хэш содержимого (не разбиения на части) для Merkle-хэшей VFS.
+        Считается один раз на FileData: он не меняется.
+        """
+        h = hashlib.blake2b(digest_size=16)
+        for b in self.chunks():
+            h.update(b)
+        return h.digest()
+
+    # ---------- сериализация (сохранения, журнал) ----------
+    def to_json(self) -> list[Any]:
+        """
+        Части: {"text": ...} | {"b64": ...} | {"asset": имя, "off": .., "len": ..}.
+        Ассеты сохраняются ссылкой, не содержимым.
+        """
+        out: list[Any] = []
+        for p in self.parts:
+            if isinstance(p, AssetSlice):
+                out.append({"asset": p.name, "off": p.off, "len": p.size})
+                continue
+            try:
+                out.append({"text": p.decode("utf-8")})
+            except UnicodeDecodeError:
+                out.append({"b64": base64.b64encode(p).decode("ascii")})
+        return out
+
+    @classmethod
+    def from_json(cls, raw: list[Any]) -> "FileData":
+        parts: list[Part] = []
+        for r in raw:
+            if "asset" in r:
+                parts.append(AssetSlice(str(r["asset"]), int(r["off"]), int(r["len"])))
+            elif "text" in r:
+                parts.append(r["text"].encode("utf-8"))
+            elif "b64" in r:
+                parts.append(base64.b64decode(r["b64"]))
+            else:
+                raise ValueError(f"Bad file data part: {r!r}")
+        return cls(tuple(parts), sum(_part_len(p) for p in parts))
+
+
+EMPTY = FileData()
+
+
+# ---------- строки ----------
+def _decode(b: bytes) -> str:
+    return b.decode("utf-8", "replace")
+
+
+def iter_lines(data: FileData) -> Iterator[str]:
+    """Строки файла без \\n, кусок за куском."""
+    # начало незаконченной строки — списком кусков: склейка rest + c на
+    # каждом куске была квадратичной на файлах без \n
+    rest: list[bytes] = []
+    for c in data.chunks():
+        lines = c.split(b"\n")
+        if len(lines) == 1:
+            rest.append(c)
+            continue
+        if rest:
+            rest.append(lines[0])
+            lines[0] = b"".join(rest)
+        rest = [lines.pop()]
+        for line in lines:
+            yield _decode(line)
+    tail = b"".join(rest)
+    if tail:
+        yield _decode(tail)
+
+
+def tail_lines(data: FileData, n: int) -> list[str]:
+    """
+    Последние n строк: читаем куски с конца, пока не наберётся n + 1
+    переводов строки, — начало большого файла не трогаем.
+    """
+    if n <= 0:
+        return []
+    blocks: list[bytes] = []
+    newlines = 0
+    for c in data.rchunks():
+        blocks.append(c)
+        newlines += c.count(b"\n")
+        if newlines > n:
+            break
+    lines = b"".join(reversed(blocks)).split(b"\n")
+    if lines and lines[-1] == b"":
+        lines.pop()
+    return [_decode(x) for x in lines[-n:]]
+
+
+def count(data: FileData, *, words: bool = True) -> tuple[int, int, int]:
+    """
+    (строки, слова, байты) как у wc: строки — число \\n.
+    words=False пропускает подсчёт слов (wc -l в разы быстрее).
+    """
+    lines = n_words = 0
+    prev_space = True
+    for c in data.chunks():
+        lines += c.count(b"\n")
+        if not words:
+            continue
+        n_words += len(c.split())
+        # слово, разрезанное границей кусков, посчитано дважды
+        if not prev_space and not c[:1].isspace():
+            n_words -= 1
+        prev_space = c[-1:].isspace()
+    return lines, n_words, data.size
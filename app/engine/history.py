@@ -0,0 +1,164 @@
+"""
+История команд ученика: кольцевой буфер на MAX_HISTORY команд
+с номерами (seq) и обратным поиском как Ctrl-R в bash.
+
+- seq растёт всегда: по нему UI подгружает историю страницами
+  (page) и продолжает поиск с найденного места (search(before=seq)).
+- Индекс для поиска — триграммы -> возрастающие списки seq.
+  Строится при первом поиске и дальше дополняется в append,
+  так что ученики без Ctrl-R за него не платят.
+- Поиск идёт назад по самому короткому списку триграмм запроса
+  и проверяет кандидатов подстрокой: нажатие клавиши не обходит
+  всю историю. Запрос короче триграммы ищется просмотром назад —
+  такой почти всегда находится в последних командах, а весь
+  буфер просматривается только при промахе (доли миллисекунды).
+- Вытесненные из буфера команды остаются в списках индекса
+  (отсекаются по seq) до перестройки, когда таких больше половины.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any
+
+# сколько последних команд хранится (и попадает в сохранение)
+MAX_HISTORY = 20_000
+
+_GRAM = 3
+
+
+def _grams(cmd: str) -> set[str]:
+    return {cmd[i:i + _GRAM] for i in range(len(cmd) - _GRAM + 1)}
+
+
+class CommandHistory:
+    def __init__(self, limit: int = MAX_HISTORY) -> None:
+        self.limit = limit
+        # _items[k] — команда с seq = _base + k; первые _off уже вытеснены (None)
+        self._items: list[str | None] = []
+        self._base = 0
+        self._off = 0
+        self._grams: dict[str, list[int]] | None = None
+        self._postings = 0
+        self._stale = 0
+        # добавленные с прошлого take_new() — в журнал сохранения
+        self._new: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self._items) - self._off
+
+    @property
+    def first(self) -> int:
+        """seq самой старой хранимой команды."""
+        return self._base + self._off
+
+    @property
+    def end(self) -> int:
+        """seq, который получит следующая команда."""
+        return self._base + len(self._items)
+
+    def append(self, cmd: str) -> bool:
+        """
+        Добавить команду. Пустые и повтор предыдущей не добавляются
+        (как HISTCONTROL=ignoredups); False — не добавлена.
+        """
+        cmd = cmd.strip()
+        if not cmd or (len(self) and self._items[-1] == cmd):
+            return False
+        seq = self.end
+        self._items.append(cmd)
+        self._new.append(cmd)
+        if self._grams is not None:
+            self._index(seq, cmd)
+        if len(self) > self.limit:
+            self._evict()
+        return True
+
+    def _index(self, seq: int, cmd: str) -> None:
+        grams = self._grams
+        for g in _grams(cmd):
+            lst = grams.get(g)
+            if lst is None:
+                grams[g] = [seq]
+            else:
+                lst.append(seq)
+            self._postings += 1
+
+    def _evict(self) -> None:
+        old = self._items[self._off]
+        self._items[self._off] = None
+        self._off += 1
+        if self._grams is not None:
+            self._stale += len(_grams(old))
+            if self._stale * 2 > self._postings:
+                self._grams = None  # перестроится при следующем поиске
+        # сдвиг списка — раз в limit вытеснений, амортизированно O(1)
+        if self._off >= self.limit:
+            del self._items[:self._off]
+            self._base += self._off
+            self._off = 0
+
+    def _build_index(self) -> dict[str, list[int]]:
+        self._grams = {}
+        self._postings = self._stale = 0
+        for k in range(self._off, len(self._items)):
+            self._index(self._base + k, self._items[k])
+        return self._grams
+
+    def get(self, seq: int) -> str | None:
+        if self.first <= seq < self.end:
+            return self._items[seq - self._base]
+        return None
+
+    def search(self, query: str, before: int | None = None) -> tuple[int, str] | None:
+        """
+        Самая новая команда с seq < before (None — из всей истории),
+        в которой есть подстрока query. (seq, команда) или None.
+        """
+        hi = self.end if before is None else min(before, self.end)
+        lo = self.first
+        if hi <= lo:
+            return None
+        if len(query) < _GRAM:
+            items, base = self._items, self._base
+            for seq in range(hi - 1, lo - 1, -1):
+                if query in items[seq - base]:
+                    return seq, items[seq - base]
+            return None
+
+        grams = self._grams if self._grams is not None else self._build_index()
+        lists = [grams.get(g) for g in _grams(query)]
+        if not all(lists):
+            return None
+        seqs = min(lists, key=len)
+        j = bisect_left(seqs, hi) - 1
+        while j >= 0:
+            seq = seqs[j]
+            if seq < lo:
+                break
+            cmd = self._items[seq - self._base]
+            if query in cmd:
+                return seq, cmd
+            j -= 1
+        return None
+
+    def page(self, before: int | None = None, limit: int = 100) -> tuple[int, list[str]]:
+        """До limit команд перед before (по умолчанию — самые новые): (seq первой, команды)."""
+        hi = self.end if before is None else max(self.first, min(before, self.end))
+        lo = max(self.first, hi - max(0, limit))
+        return lo, self._items[lo - self._base:hi - self._base]
+
+    def take_new(self) -> list[str]:
+        new, self._new = self._new, []
+        return new
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"first": self.first, "items": self._items[self._off:]}
+
+    def load(self, data: dict[str, Any]) -> None:
+        items = [str(c) for c in data.get("items", [])][-self.limit:]
+        self._items = items
+        self._base = max(0, int(data.get("first", 0))) + len(data.get("items", [])) - len(items)
+        self._off = 0
+        self._grams = None
+        self._new = []
@@ -1,42 +1,372 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import marshal
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
+from app.engine.checker import CompiledRule, compile_rule
+from app.engine.filedata import FileData, asset_path
+from app.engine.mounts import source_from_spec
+from app.engine.vfs import FrozenNode, MountSource, VFS, freeze
+
+# lesson_loader.py лежит в app/engine/, уроки — в app/content/lessons/
+LESSONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "content", "lessons")
+# все уроки, скомпилированные при сборке приложения (python -m app.build_lessons)
+BUNDLE_PATH = os.path.join(os.path.dirname(LESSONS_DIR), "lessons.bundle")
+
+DEFAULT_START_CWD = "/home/student"
+
+# версия формата кэша: меняем, когда меняется компиляция урока
+_CACHE_VERSION = 4
+
+
+@dataclass(frozen=True)
+class Task:
+    id: str
+    title: str
+    prompt: str
+    rule: dict[str, Any]
+    hint: str
+    success_explain: str
+    # rule, скомпилированный при загрузке урока (в JS не отдаётся)
+    checker: CompiledRule = field(compare=False, repr=False)
+
 
 @dataclass(frozen=True)
 class LessonData:
     lesson_id: str
     title: str
     start_cwd: str
-    tasks: list[dict[str, Any]]
+    tasks: tuple[Task, ...]
+    # файлы, которые урок кладёт в VFS: (путь, {"text": ...} | {"asset": имя})
+    files: tuple[tuple[str, dict[str, str]], ...] = ()
+    # ленивые деревья урока: (точка монтирования, описание), см. mounts.py
+    mounts: tuple[tuple[str, dict[str, Any]], ...] = ()
+    # home -> общее замороженное дерево урока (см. base_tree)
+    _base: dict[str, FrozenNode] = field(default_factory=dict, compare=False, repr=False)
+
+    def mount_sources(self) -> list[tuple[str, MountSource]]:
+        return [(path, source_from_spec(spec)) for path, spec in self.mounts]
+
+    def seed_files(self) -> list[tuple[str, FileData]]:
+        """
+        Содержимое файлов урока. Ассеты не читаются — только ссылка и размер.
+        """
+        return [
+            (path, FileData.from_asset(spec["asset"]) if "asset" in spec else FileData.from_text(spec["text"]))
+            for path, spec in self.files
+        ]
 
+    def base_tree(self, home: str) -> FrozenNode:
+        """
+        Стартовое дерево урока (домашняя директория, монтирования, файлы) —
+        одно на все сессии урока; сессия работает с ним через VFS(base=...).
+        """
+        tree = self._base.get(home)
+        if tree is None:
+            vfs = VFS()
+            vfs.seed_basic_home(home)
+            for path, source in self.mount_sources():
+                vfs.mount(path, source)
+            for path, data in self.seed_files():
+                vfs.write_file(path, data)
+            tree = self._base[home] = freeze(vfs.root)
+        return tree
 
-def load_lesson_json(lesson_filename: str) -> LessonData:
+
+@dataclass(frozen=True)
+class LessonInfo:
+    id: str
+    title: str
+    task_count: int
+
+
+def compile_lesson(raw: Any, lesson_id: str) -> dict[str, Any]:
     """
-    Загружает JSON-урок из app/content/lessons/<lesson_filename>.
-    lesson_filename например: "01_paths.json"
+    Проверить сырой JSON урока и привести к каноническому виду
+    (только dict/list/str — так он кладётся в marshal-кэш).
+    Ошибки в уроке — ValueError сразу при загрузке, а не на submit.
     """
-    # lesson_loader.py лежит в app/engine/, поднимаемся в app/
-    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    lesson_path = os.path.join(app_dir, "content", "lessons", lesson_filename)
+    if not isinstance(raw, dict):
+        raise ValueError(f"Lesson {lesson_id}: JSON root must be an object")
+
+    tasks_raw = raw.get("tasks")
+    if not isinstance(tasks_raw, list) or len(tasks_raw) == 0:
+        raise ValueError(f"Lesson {lesson_id}: empty tasks list")
+
+    tasks: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for t in tasks_raw:
+        if not isinstance(t, dict):
+            raise ValueError(f"Lesson {lesson_id}: task must be an object")
+        for key in ("id", "title", "prompt", "rule"):
+            if key not in t:
+                raise ValueError(f"Lesson {lesson_id}: task missing required key: {key}")
+        tid = str(t["id"])
+        if tid in seen:
+            raise ValueError(f"Lesson {lesson_id}: duplicate task id: {tid}")
+        seen.add(tid)
+
+        rule = t["rule"]
+        try:
+            compile_rule(rule)
+        except ValueError as e:
+            raise ValueError(f"Lesson {lesson_id}: task {tid}: {e}") from None
+
+        tasks.append({
+            "id": tid,
+            "title": str(t["title"]),
+            "prompt": str(t["prompt"]),
+            "rule": rule,
+            "hint": str(t.get("hint", "")),
+            "success_explain": str(t.get("success_explain", "")),
+        })
 
-    with open(lesson_path, "r", encoding="utf-8") as f:
-        raw = json.load(f)
+    files_raw = raw.get("files", {})
+    if not isinstance(files_raw, dict):
+        raise ValueError(f"Lesson {lesson_id}: files must be an object")
+    files: dict[str, dict[str, str]] = {}
+    for path, spec in files_raw.items():
+        if not isinstance(path, str) or not path.startswith("/"):
+            raise ValueError(f"Lesson {lesson_id}: file path must be absolute: {path}")
+        if isinstance(spec, str):
+            spec = {"text": spec}
+        if not isinstance(spec, dict) or len(spec) != 1 or not isinstance(next(iter(spec.values())), str):
+            raise ValueError(f"Lesson {lesson_id}: file {path}: expected {{\"text\": ...}} or {{\"asset\": ...}}")
+        if "asset" in spec:
+            if not os.path.isfile(asset_path(spec["asset"])):
+                raise ValueError(f"Lesson {lesson_id}: file {path}: asset not found: {spec['asset']}")
+        elif "text" not in spec:
+            raise ValueError(f"Lesson {lesson_id}: file {path}: expected {{\"text\": ...}} or {{\"asset\": ...}}")
+        files[path] = dict(spec)
 
-    # минимальная валидация
-    for key in ("lesson_id", "title", "start_cwd", "tasks"):
-        if key not in raw:
-            raise ValueError(f"Lesson JSON missing required key: {key}")
+    mounts_raw = raw.get("mounts", {})
+    if not isinstance(mounts_raw, dict):
+        raise ValueError(f"Lesson {lesson_id}: mounts must be an object")
+    mounts: dict[str, dict[str, Any]] = {}
+    for path, spec in mounts_raw.items():
+        if not isinstance(path, str) or not path.startswith("/") or path.rstrip("/") == "":
+            raise ValueError(f"Lesson {lesson_id}: bad mount point: {path}")
+        if not isinstance(spec, dict):
+            raise ValueError(f"Lesson {lesson_id}: mount {path}: spec must be an object")
+        try:
+            source_from_spec(spec)
+            if "manifest" in spec and not os.path.isfile(asset_path(spec["manifest"])):
+                raise ValueError(f"manifest not found: {spec['manifest']}")
+        except ValueError as e:
+            raise ValueError(f"Lesson {lesson_id}: mount {path}: {e}") from None
+        mounts[path] = dict(spec)
 
-    if not isinstance(raw["tasks"], list) or len(raw["tasks"]) == 0:
-        raise ValueError("Lesson JSON has empty tasks list")
+    return {
+        # в старых уроках id лежит в "id", в новых — в "lesson_id"
+        "lesson_id": str(raw.get("lesson_id", raw.get("id", lesson_id))),
+        "title": str(raw.get("title", lesson_id)),
+        "start_cwd": str(raw.get("start_cwd", DEFAULT_START_CWD)),
+        "tasks": tasks,
+        "files": files,
+        "mounts": mounts,
+    }
 
+
+def _lesson_from_compiled(c: dict[str, Any]) -> LessonData:
     return LessonData(
-        lesson_id=str(raw["lesson_id"]),
-        title=str(raw["title"]),
-        start_cwd=str(raw["start_cwd"]),
-        tasks=list(raw["tasks"]),
+        lesson_id=c["lesson_id"],
+        title=c["title"],
+        start_cwd=c["start_cwd"],
+        tasks=tuple(Task(**t, checker=compile_rule(t["rule"])) for t in c["tasks"]),
+        files=tuple(c["files"].items()),
+        mounts=tuple(c["mounts"].items()),
     )
+
+
+def build_bundle(lessons_dir: str = LESSONS_DIR, path: str = BUNDLE_PATH) -> int:
+    """
+    Скомпилировать все уроки каталога в один marshal-файл (шаг сборки
+    приложения). Возвращает число уроков; ошибка в уроке — ValueError.
+    """
+    lessons: dict[str, dict[str, Any]] = {}
+    for name in sorted(os.listdir(lessons_dir)):
+        if not name.endswith(".json"):
+            continue
+        lesson_id = name[:-len(".json")]
+        with open(os.path.join(lessons_dir, name), "rb") as f:
+            lessons[lesson_id] = compile_lesson(json.loads(f.read().decode("utf-8")), lesson_id)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        marshal.dump({"version": _CACHE_VERSION, "lessons": lessons}, f)
+    os.replace(tmp, path)
+    return len(lessons)
+
+
+# stamp уроков из бандла: не совпадает ни с одним (mtime, size) файла
+_BUNDLED = (-1, -1)
+
+
+class LessonRepository:
+    """
+    Каталог уроков из app/content/lessons/*.json.
+    - index() — лёгкий список (id, title, число заданий), без разбора уроков,
+      если они не менялись: берётся из index.marshal в кэше
+    - get(id) — скомпилированный урок; в памяти кэшируется по (mtime, size),
+      на диске — в __pycache__/<id>.lesson (marshal, как .pyc), с проверкой
+      sha256 исходника, если mtime поменялся без изменения содержимого
+    - bundle — файл build_bundle(): если он есть и не старше уроков, все
+      уроки и индекс берутся из него одним чтением, без JSON и stat на урок
+    Ошибки в уроке (в том числе в rule/assert) — ValueError при загрузке.
+    Если каталог кэша недоступен на запись — просто работаем без него.
+    """
+
+    def __init__(self, lessons_dir: str = LESSONS_DIR, *, disk_cache: bool = True,
+                 bundle: str | None = None) -> None:
+        self.lessons_dir = lessons_dir
+        self.cache_dir = os.path.join(lessons_dir, "__pycache__") if disk_cache else None
+        self.bundle_path = bundle
+        self._bundle: dict[str, dict[str, Any]] | None = None
+        self._lessons: dict[str, tuple[tuple[int, int], LessonData]] = {}
+        self._index: dict[str, tuple[tuple[int, int], LessonInfo]] | None = None
+
+    # ---------- пути и кэш ----------
+    def _source(self, lesson_id: str) -> str:
+        return os.path.join(self.lessons_dir, f"{lesson_id}.json")
+
+    @staticmethod
+    def _stamp(st: os.stat_result) -> tuple[int, int]:
+        return st.st_mtime_ns, st.st_size
+
+    def _cache_read(self, name: str) -> Any:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, name), "rb") as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != _CACHE_VERSION:
+            return None
+        return data
+
+    def _cache_write(self, name: str, data: dict[str, Any]) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = os.path.join(self.cache_dir, f"{name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                marshal.dump({"version": _CACHE_VERSION, **data}, f)
+            os.replace(tmp, os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def _load_bundle(self) -> dict[str, dict[str, Any]]:
+        if self._bundle is None:
+            self._bundle = self._read_bundle()
+        return self._bundle
+
+    def _read_bundle(self) -> dict[str, dict[str, Any]]:
+        """
+        Уроки из бандла ({} — бандла нет). Бандл старше какого-то урока
+        (его правили после сборки) не используется.
+        """
+        if self.bundle_path is None:
+            return {}
+        try:
+            built = os.stat(self.bundle_path).st_mtime_ns
+            with open(self.bundle_path, "rb") as f:
+                data = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError):
+            return {}
+        if not isinstance(data, dict) or data.get("version") != _CACHE_VERSION:
+            return {}
+        try:
+            with os.scandir(self.lessons_dir) as it:
+                if any(e.name.endswith(".json") and e.stat().st_mtime_ns > built for e in it):
+                    return {}
+        except OSError:
+            pass  # в собранном приложении исходников уроков может не быть
+        return data["lessons"]
+
+    # ---------- компиляция ----------
+    def _compile(self, lesson_id: str, stamp: tuple[int, int]) -> dict[str, Any]:
+        path = self._source(lesson_id)
+        cached = self._cache_read(f"{lesson_id}.lesson")
+        if cached is not None and tuple(cached["stamp"]) == stamp:
+            return cached["lesson"]
+
+        with open(path, "rb") as f:
+            src = f.read()
+        digest = hashlib.sha256(src).hexdigest()
+        if cached is not None and cached.get("sha256") == digest:
+            compiled = cached["lesson"]
+        else:
+            compiled = compile_lesson(json.loads(src.decode("utf-8")), lesson_id)
+        self._cache_write(f"{lesson_id}.lesson", {"stamp": list(stamp), "sha256": digest, "lesson": compiled})
+        return compiled
+
+    def get(self, lesson_id: str) -> LessonData:
+        bundled = self._load_bundle().get(lesson_id)
+        if bundled is not None:
+            hit = self._lessons.get(lesson_id)
+            if hit is not None and hit[0] == _BUNDLED:
+                return hit[1]
+            lesson = _lesson_from_compiled(bundled)
+            self._lessons[lesson_id] = (_BUNDLED, lesson)
+            return lesson
+
+        st = os.stat(self._source(lesson_id))
+        stamp = self._stamp(st)
+        hit = self._lessons.get(lesson_id)
+        if hit is not None and hit[0] == stamp:
+            return hit[1]
+        lesson = _lesson_from_compiled(self._compile(lesson_id, stamp))
+        self._lessons[lesson_id] = (stamp, lesson)
+        return lesson
+
+    # ---------- индекс ----------
+    def index(self) -> list[LessonInfo]:
+        """
+        Все уроки каталога, по id. Один проход scandir; разбираются
+        только новые или изменившиеся уроки. С бандлом — без обхода каталога.
+        """
+        bundle = self._load_bundle()
+        if bundle:
+            return [LessonInfo(k, c["title"], len(c["tasks"])) for k, c in sorted(bundle.items())]
+
+        if self._index is None:
+            cached = self._cache_read("index.marshal") or {}
+            self._index = {k: (tuple(v[0]), LessonInfo(*v[1])) for k, v in cached.get("lessons", {}).items()}
+
+        fresh: dict[str, tuple[tuple[int, int], LessonInfo]] = {}
+        changed = False
+        with os.scandir(self.lessons_dir) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.endswith(".json"):
+                    continue
+                lesson_id = entry.name[:-len(".json")]
+                stamp = self._stamp(entry.stat())
+                prev = self._index.get(lesson_id)
+                if prev is not None and prev[0] == stamp:
+                    fresh[lesson_id] = prev
+                    continue
+                lesson = self.get(lesson_id)
+                fresh[lesson_id] = (stamp, LessonInfo(lesson_id, lesson.title, len(lesson.tasks)))
+                changed = True
+
+        if changed or fresh.keys() != self._index.keys():
+            self._cache_write("index.marshal", {
+                "lessons": {k: [list(s), [i.id, i.title, i.task_count]] for k, (s, i) in fresh.items()},
+            })
+        self._index = fresh
+        return [info for _, (_, info) in sorted(fresh.items())]
+
+
+_default_repo: LessonRepository | None = None
+
+
+def default_repository() -> LessonRepository:
+    global _default_repo
+    if _default_repo is None:
+        _default_repo = LessonRepository(bundle=BUNDLE_PATH)
+    return _default_repo
@@ -0,0 +1,176 @@
+"""
+Метрики обработки команд: где уходит время submit.
+
+Выключено по умолчанию. Включается переменными окружения при старте
+приложения (или enable() из кода):
+    TRAINER_METRICS=1            — счётчики и гистограммы, AppAPI.get_metrics()
+    TRAINER_TRACE=/tmp/trace.jsonl — плюс JSON-строка на каждую команду
+
+Этапы:
+- checkpoint — контрольная точка для undo (и для restart_task на новом задании)
+- parse    — разбор строки (checker._parse)
+- exec     — run_line: команды, меняющие VFS, выполняются здесь
+- asserts  — проверка цели задания
+- response — сборка ответа Session.submit
+- submit   — Session.submit целиком
+- save     — запись дельты в журнал (AppAPI)
+- output   — вычисление первого куска вывода (ленивый stdout считается тут)
+
+Выключенные метрики стоят одну проверку ACTIVE на этап:
+    m = metrics.ACTIVE
+    t0 = perf_counter_ns() if m else 0
+    ...
+    if m:
+        m.observe("parse", t0)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import Counter
+from time import perf_counter_ns
+from typing import IO, Any
+
+# верхние границы корзин гистограммы, мкс; последняя корзина — всё, что больше
+BUCKETS_US = (10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 1_000_000)
+
+
+class Histogram:
+    """
+    Фиксированные корзины: память не растёт с числом команд,
+    перцентили — оценка сверху по границе корзины.
+    """
+
+    __slots__ = ("counts", "count", "total_us", "max_us")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_US) + 1)
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def add(self, us: float) -> None:
+        self.counts[bisect_left(BUCKETS_US, us)] += 1
+        self.count += 1
+        self.total_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(float(BUCKETS_US[i]), self.max_us) if i < len(BUCKETS_US) else self.max_us
+        return self.max_us
+
+    def to_dict(self) -> dict[str, Any]:
+        labels = [f"<={b}" for b in BUCKETS_US] + [f">{BUCKETS_US[-1]}"]
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_us / self.count, 1) if self.count else 0.0,
+            "max_us": round(self.max_us, 1),
+            "p50_us": round(self.percentile(0.50), 1),
+            "p95_us": round(self.percentile(0.95), 1),
+            "p99_us": round(self.percentile(0.99), 1),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class Metrics:
+    def __init__(self, trace_path: str | None = None) -> None:
+        self.started = time.time()
+        self.stages: dict[str, Histogram] = {}
+        self.commands: Counter[str] = Counter()
+        self.codes: Counter[str] = Counter()
+        self.trace_path = trace_path
+        self._trace: IO[str] | None = open(trace_path, "a", encoding="utf-8") if trace_path else None
+        # запись трассы текущей команды: дописывается этапами до flush()
+        self._record: dict[str, Any] | None = None
+
+    def observe(self, stage: str, t0_ns: int) -> None:
+        """Этап закончился сейчас, начался в t0_ns (perf_counter_ns)."""
+        us = (perf_counter_ns() - t0_ns) / 1000
+        h = self.stages.get(stage)
+        if h is None:
+            h = self.stages[stage] = Histogram()
+        h.add(us)
+        rec = self._record
+        if rec is not None:
+            st = rec["stages"]
+            st[stage] = round(st.get(stage, 0.0) + us, 1)
+
+    def begin(self, lesson_id: str, task_id: str, user_input: str) -> None:
+        """Начало команды; незакрытая запись прошлой уходит в трассу."""
+        self.flush()
+        if self._trace is not None:
+            self._record = {"ts": round(time.time(), 3), "lesson": lesson_id, "task": task_id,
+                            "input": user_input, "stages": {}}
+
+    def count(self, cmds: list[str]) -> None:
+        self.commands.update(cmds)
+        if self._record is not None:
+            self._record["cmds"] = cmds
+
+    def result(self, code: str) -> None:
+        self.codes[code] += 1
+        if self._record is not None:
+            self._record["code"] = code
+
+    def flush(self) -> None:
+        rec, self._record = self._record, None
+        if rec is not None and self._trace is not None:
+            self._trace.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            self._trace.flush()
+
+    def close(self) -> None:
+        self.flush()
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "enabled": True,
+            "uptime_s": round(time.time() - self.started, 1),
+            "trace": self.trace_path,
+            "stages": {name: h.to_dict() for name, h in sorted(self.stages.items())},
+            "commands": dict(self.commands.most_common()),
+            "codes": dict(self.codes.most_common()),
+        }
+
+
+# включённые метрики процесса; None — выключены
+ACTIVE: Metrics | None = None
+
+
+def enable(trace_path: str | None = None) -> Metrics:
+    global ACTIVE
+    disable()
+    ACTIVE = Metrics(trace_path)
+    return ACTIVE
+
+
+def disable() -> None:
+    global ACTIVE
+    if ACTIVE is not None:
+        ACTIVE.close()
+        ACTIVE = None
+
+
+def enable_from_env() -> Metrics | None:
+    """TRAINER_METRICS=1 или TRAINER_TRACE=путь включают метрики."""
+    trace = os.environ.get("TRAINER_TRACE") or None
+    if trace or os.environ.get("TRAINER_METRICS", "") not in ("", "0"):
+        return enable(trace)
+    return None
+
+
+def snapshot() -> dict[str, Any]:
+    return ACTIVE.to_dict() if ACTIVE is not None else {"enabled": False}
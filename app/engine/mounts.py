@@ -0,0 +1,212 @@
+"""
+Ленивые точки монтирования для больших деревьев урока (/usr, /etc, /var/log).
+
+Урок объявляет их в "mounts":
+    "mounts": {
+        "/etc": {"manifest": "fs/etc.json"},
+        "/usr": {"generator": "usr", "params": {"packages": 400}}
+    }
+- manifest  — JSON-ассет (app/content/assets): {"имя": {...}} — директория,
+              {"имя": "текст"} или {"имя": null} — файл
+- generator — функция, зарегистрированная через @generator: по пути
+              директории внутри монтирования (rel) и params детерминированно
+              отдаёт её детей
+
+При старте урока дерево не строится: VFS.mount кладёт MountDir, который
+разворачивается по одной директории при первом обращении. В общем дереве
+урока (LessonData.base_tree) это FrozenMountDir — разворачивается один раз
+на все сессии.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Optional
+
+from app.engine.filedata import FileData, asset_path
+from app.engine.vfs import MountSource
+
+Entry = tuple[str, str, Optional[FileData]]
+GeneratorFn = Callable[[str, dict[str, Any]], list[Entry]]
+
+# имя генератора -> функция (rel, params) -> дети директории rel
+GENERATORS: dict[str, GeneratorFn] = {}
+
+
+def generator(name: str) -> Callable[[GeneratorFn], GeneratorFn]:
+    def deco(fn: GeneratorFn) -> GeneratorFn:
+        GENERATORS[name] = fn
+        return fn
+    return deco
+
+
+# ---------- источники ----------
+# разобранные манифесты: имя ассета -> дерево; общие для всех сессий
+_manifests: dict[str, dict[str, Any]] = {}
+
+
+class ManifestSource(MountSource):
+    """
+    Дерево из JSON-ассета. Манифест читается при первом обращении
+    к смонтированной директории, а не при загрузке урока.
+    """
+
+    def __init__(self, asset: str) -> None:
+        self.asset = asset
+
+    def _tree(self) -> dict[str, Any]:
+        tree = _manifests.get(self.asset)
+        if tree is None:
+            with open(asset_path(self.asset), "rb") as f:
+                tree = json.load(f)
+            if not isinstance(tree, dict):
+                raise ValueError(f"Manifest {self.asset}: root must be an object")
+            _manifests[self.asset] = tree
+        return tree
+
+    def entries(self, rel: str) -> list[Entry]:
+        node: Any = self._tree()
+        for part in rel.split("/") if rel else ():
+            node = node.get(part) if isinstance(node, dict) else None
+        if not isinstance(node, dict):
+            return []
+        out: list[Entry] = []
+        for name, v in node.items():
+            if isinstance(v, dict):
+                out.append((name, "dir", None))
+            else:
+                out.append((name, "file", FileData.from_text(v) if v else None))
+        return out
+
+
+class GeneratorSource(MountSource):
+    def __init__(self, name: str, params: dict[str, Any]) -> None:
+        self.fn = GENERATORS[name]
+        self.params = params
+
+    def entries(self, rel: str) -> list[Entry]:
+        return self.fn(rel, self.params)
+
+
+def source_from_spec(spec: dict[str, Any]) -> MountSource:
+    """
+    Источник по описанию из урока; ошибка в описании — ValueError.
+    """
+    if "manifest" in spec:
+        return ManifestSource(str(spec["manifest"]))
+    if "generator" in spec:
+        name = spec["generator"]
+        if name not in GENERATORS:
+            raise ValueError(f"Unknown mount generator: {name}")
+        params = spec.get("params", {})
+        if not isinstance(params, dict):
+            raise ValueError(f"Mount generator {name}: params must be an object")
+        return GeneratorSource(name, params)
+    raise ValueError('Mount spec must have "manifest" or "generator"')
+
+
+# ---------- генераторы ----------
+def _dirs(*names: str) -> list[Entry]:
+    return [(n, "dir", None) for n in names]
+
+
+def _files(*names: str) -> list[Entry]:
+    return [(n, "file", None) for n in names]
+
+
+@generator("synthetic")
+def _synthetic(rel: str, params: dict[str, Any]) -> list[Entry]:
+    """
+    Равномерное дерево для бенчмарков: в каждой директории fanout
+    поддиректорий d<i> (до глубины depth) и files файлов f<i>.txt.
+    """
+    fanout = int(params.get("fanout", 8))
+    files = int(params.get("files", 4))
+    depth = int(params.get("depth", 4))
+    level = rel.count("/") + 1 if rel else 0
+    out = _files(*(f"f{i}.txt" for i in range(files)))
+    if level < depth:
+        out += _dirs(*(f"d{i}" for i in range(fanout)))
+    return out
+
+
+_COMMANDS = (
+    "awk", "base64", "basename", "bash", "cat", "chmod", "chown", "clear", "cmp", "comm", "cp",
+    "curl", "cut", "date", "dd", "df", "diff", "dirname", "du", "echo", "env", "expr", "file",
+    "find", "free", "git", "grep", "gzip", "head", "hostname", "id", "join", "kill", "less", "ln",
+    "ls", "make", "man", "md5sum", "mkdir", "mktemp", "more", "mv", "nano", "nl", "nohup", "od",
+    "paste", "patch", "perl", "ping", "printf", "ps", "pwd", "python3", "readlink", "realpath",
+    "rm", "rmdir", "rsync", "scp", "sed", "seq", "sha256sum", "sleep", "sort", "split", "ssh",
+    "stat", "strings", "tac", "tail", "tar", "tee", "test", "time", "top", "touch", "tr", "tree",
+    "true", "tty", "uname", "uniq", "uptime", "vim", "wc", "wget", "which", "whoami", "xargs",
+    "yes", "zip",
+)
+
+_PACKAGES = (
+    "adduser", "apt", "base-files", "bash", "bzip2", "ca-certificates", "coreutils", "curl",
+    "dash", "debianutils", "diffutils", "dpkg", "e2fsprogs", "findutils", "gcc", "git", "gpgv",
+    "grep", "gzip", "hostname", "init-system-helpers", "less", "libc6", "libssl3", "login",
+    "make", "mount", "nano", "ncurses-base", "openssh-client", "passwd", "perl", "procps",
+    "python3", "readline-common", "rsync", "sed", "sensible-utils", "tar", "tzdata",
+    "util-linux", "vim", "wget", "zlib1g",
+)
+
+
+def _packages(params: dict[str, Any]) -> list[str]:
+    n = int(params.get("packages", len(_PACKAGES)))
+    out = list(_PACKAGES[:n])
+    # больше пакетов, чем в списке, — библиотеки python3-*
+    out += [f"python3-module{i}" for i in range(n - len(out))]
+    return out
+
+
+@generator("usr")
+def _usr(rel: str, params: dict[str, Any]) -> list[Entry]:
+    """
+    Правдоподобный /usr в духе Debian: bin, sbin, lib, include, share/doc
+    по пакету на директорию, share/man/man1 со страницами для bin.
+    """
+    parts = rel.split("/") if rel else []
+    if not parts:
+        return _dirs("bin", "include", "lib", "local", "sbin", "share")
+    top, rest = parts[0], parts[1:]
+
+    if top == "bin" and not rest:
+        return _files(*_COMMANDS)
+    if top == "sbin" and not rest:
+        return _files("adduser", "chroot", "cron", "fsck", "groupadd", "ip", "mkfs", "reboot", "sshd", "useradd")
+    if top == "include" and not rest:
+        return _files(*(f"{p}.h" for p in _packages(params) if p.startswith("lib")), "stdio.h", "stdlib.h")
+    if top == "local":
+        return _dirs("bin", "lib", "share") if not rest else []
+    if top == "lib":
+        if not rest:
+            return _dirs("python3", "x86_64-linux-gnu")
+        if rest == ["x86_64-linux-gnu"]:
+            return _files(*(f"{p}.so.1" for p in _packages(params)))
+        if rest == ["python3"]:
+            return _dirs("dist-packages")
+        if rest == ["python3", "dist-packages"]:
+            return _dirs(*(p[len("python3-"):] for p in _packages(params) if p.startswith("python3-")))
+        return []
+    if top == "share":
+        if not rest:
+            return _dirs("doc", "man", "zoneinfo")
+        if rest == ["doc"]:
+            return _dirs(*_packages(params))
+        if len(rest) == 2 and rest[0] == "doc":
+            return [
+                ("README", "file", FileData.from_text(f"{rest[1]}\n\nSee /usr/share/doc/{rest[1]}/copyright.\n")),
+                ("changelog.Debian.gz", "file", None),
+                ("copyright", "file", None),
+            ]
+        if rest == ["man"]:
+            return _dirs(*(f"man{i}" for i in range(1, 9)))
+        if rest == ["man", "man1"]:
+            return _files(*(f"{c}.1.gz" for c in _COMMANDS))
+        if rest == ["zoneinfo"]:
+            return _dirs("America", "Asia", "Europe") + _files("UTC")
+        if len(rest) == 2 and rest[0] == "zoneinfo":
+            cities = {"America": ("Chicago", "New_York"), "Asia": ("Tokyo",), "Europe": ("Berlin", "London", "Moscow")}
+            return _files(*cities.get(rest[1], ()))
+    return []
@@ -0,0 +1,79 @@
+"""
+Вывод команды для UI кусками.
+
+Session.submit отдаёт stdout ленивым итератором; AppAPI заворачивает его
+в OutputStream и возвращает только первый кусок, остальное JS дочитывает
+через read_output() по мере того, как xterm успевает рисовать. В памяти
+одновременно — не больше одного куска, а не весь вывод команды.
+"""
+
+from __future__ import annotations
+
+from itertools import count
+from typing import Iterable, Iterator
+
+# кусок ограничен и по строкам, и по символам (длинные строки не раздувают его)
+CHUNK_LINES = 1000
+CHUNK_CHARS = 64 * 1024
+
+_handles = count(1)
+
+
+class OutputStream:
+    def __init__(self, lines: Iterable[str], *, pager: bool = False) -> None:
+        self.handle = f"out{next(_handles)}"
+        self.pager = pager
+        self._it: Iterator[str] | None = iter(lines)
+        # строка длиннее max_chars отдаётся частями: сама строка и позиция
+        self._long: str | None = None
+        self._pos = 0
+
+    @property
+    def done(self) -> bool:
+        return self._it is None
+
+    @property
+    def partial(self) -> bool:
+        """Последний элемент прочитанного куска — часть строки, продолжение в следующем."""
+        return self._long is not None
+
+    def read(self, max_lines: int = CHUNK_LINES, max_chars: int = CHUNK_CHARS) -> list[str]:
+        """
+        Следующий кусок (может быть пустым, если вывод кончился).
+        Строка длиннее max_chars режется на части по max_chars символов;
+        часть, за которой строка продолжается, всегда последняя в куске
+        (см. partial) — UI не ставит после неё перевод строки.
+        """
+        it = self._it
+        if it is None:
+            return []
+        out: list[str] = []
+        chars = 0
+        while len(out) < max_lines and chars < max_chars:
+            if self._long is not None:
+                s, pos = self._long, self._pos
+                line = s[pos:pos + max_chars]
+                self._pos = pos + max_chars
+                if self._pos >= len(s):
+                    self._long = None
+            else:
+                line = next(it, None)
+                if line is None:
+                    self._it = None
+                    break
+                if len(line) > max_chars:
+                    self._long, self._pos = line, max_chars
+                    line = line[:max_chars]
+            out.append(line)
+            chars += len(line) + 1
+        return out
+
+    def close(self) -> None:
+        """Бросить остаток (Ctrl+C, q в пейджере): генераторы не дочитываются."""
+        self._it = None
+        self._long = None
+
+    def chunk_dict(self, max_lines: int = CHUNK_LINES) -> dict:
+        lines = self.read(max_lines)
+        return {"handle": self.handle, "lines": lines, "done": self.done, "partial": self.partial,
+                "pager": self.pager}
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+# операторы, которые понимает движок (порядок важен: длинные раньше коротких)
+OPERATORS = ("&&", ">>", "|", ">", ";")
+
+
+class ParseError(ValueError):
+    def __init__(self, message: str, pos: int) -> None:
+        super().__init__(message)
+        # позиция символа в строке, на котором разбор остановился
+        self.pos = pos
+
+
+@dataclass(frozen=True)
+class Token:
+    kind: str  # "word" | "op"
+    text: str
+    quoted: bool = False  # в слове были кавычки или \ (такие слова не раскрываются)
+    # line[start:end] — исходный текст токена (с кавычками)
+    start: int = 0
+    end: int = 0
+
+
+@dataclass(frozen=True)
+class Redirect:
+    op: str  # ">" | ">>"
+    target: str
+
+
+@dataclass(frozen=True)
+class SimpleCommand:
+    argv: tuple[str, ...]
+    redirects: tuple[Redirect, ...] = ()
+    # quoted-флаг для каждого элемента argv (см. Token.quoted)
+    quoted: tuple[bool, ...] = ()
+
+
+@dataclass(frozen=True)
+class Pipeline:
+    commands: tuple[SimpleCommand, ...]
+
+
+@dataclass(frozen=True)
+class CommandLine:
+    # (связка перед конвейером, конвейер); у первого связка "", дальше ";" или "&&"
+    items: tuple[tuple[str, Pipeline], ...]
+
+    def commands(self) -> list[SimpleCommand]:
+        return [c for _, p in self.items for c in p.commands]
+
+
+def tokenize(line: str) -> list[Token]:
+    """
+    Разбор как у POSIX shell, в объёме тренажёра:
+    - пробелы разделяют слова
+    - '...' — всё буквально, "..." — \\ экранирует только \\ " $ `
+    - \\ вне кавычек экранирует следующий символ
+    - | > >> && ; — отдельные токены-операторы (если не в кавычках)
+    Незакрытая кавычка или неподдерживаемый оператор (||, &, <) — ParseError
+    с позицией кавычки или оператора.
+    """
+    tokens: list[Token] = []
+    buf: list[str] = []
+    in_word = False
+    quoted = False
+    start = 0
+    i = 0
+    n = len(line)
+
+    def flush() -> None:
+        nonlocal in_word, quoted
+        if in_word:
+            tokens.append(Token("word", "".join(buf), quoted, start, i))
+            buf.clear()
+            in_word = False
+            quoted = False
+
+    while i < n:
+        c = line[i]
+        if not in_word:
+            start = i
+        if c in " \t\r\n":
+            flush()
+            i += 1
+        elif c == "'":
+            j = line.find("'", i + 1)
+            if j < 0:
+                raise ParseError("Незакрытая кавычка '.", i)
+            buf.append(line[i + 1:j])
+            in_word = quoted = True
+            i = j + 1
+        elif c == '"':
+            q = i
+            i += 1
+            while True:
+                if i >= n:
+                    raise ParseError('Незакрытая кавычка ".', q)
+                c = line[i]
+                if c == '"':
+                    break
+                if c == "\\" and i + 1 < n and line[i + 1] in '\\"$`':
+                    i += 1
+                    c = line[i]
+                buf.append(c)
+                i += 1
+            in_word = quoted = True
+            i += 1
+        elif c == "\\":
+            if i + 1 >= n:
+                raise ParseError("Команда заканчивается на \\.", i)
+            buf.append(line[i + 1])
+            in_word = quoted = True
+            i += 2
+        elif c in "|&;<>":
+            flush()
+            op = None if line.startswith("||", i) else next((o for o in OPERATORS if line.startswith(o, i)), None)
+            if op is None:  # ||, & или <
+                bad = "||" if line.startswith("||", i) else c
+                raise ParseError(f"Оператор '{bad}' пока не поддерживается.", i)
+            tokens.append(Token("op", op, False, i, i + len(op)))
+            i += len(op)
+        else:
+            buf.append(c)
+            in_word = True
+            i += 1
+
+    flush()
+    return tokens
+
+
+def parse(line: str) -> CommandLine:
+    """
+    Строка -> CommandLine. Пустая строка -> CommandLine без элементов.
+    Синтаксические ошибки (оператор без команды, > без файла) — ParseError,
+    pos — начало оператора, рядом с которым ошибка (или конец строки).
+    """
+    tokens = tokenize(line)
+    items: list[tuple[str, Pipeline]] = []
+    connector = ""
+    i = 0
+    n = len(tokens)
+
+    while i < n:
+        commands: list[SimpleCommand] = []
+        while True:
+            argv: list[str] = []
+            quoted: list[bool] = []
+            redirects: list[Redirect] = []
+            while i < n and not (tokens[i].kind == "op" and tokens[i].text in ("|", "&&", ";")):
+                t = tokens[i]
+                if t.kind == "op":  # > или >>
+                    if i + 1 >= n or tokens[i + 1].kind != "word":
+                        raise ParseError(f"После '{t.text}' нужно указать файл.", t.start)
+                    redirects.append(Redirect(t.text, tokens[i + 1].text))
+                    i += 2
+                    continue
+                argv.append(t.text)
+                quoted.append(t.quoted)
+                i += 1
+            if not argv:
+                at = tokens[i] if i < n else (tokens[i - 1] if i else None)
+                raise ParseError(f"Нет команды рядом с '{at.text if at else ''}'.", at.start if at else 0)
+            commands.append(SimpleCommand(tuple(argv), tuple(redirects), tuple(quoted)))
+            if i < n and tokens[i].text == "|":
+                i += 1
+                if i >= n:
+                    raise ParseError("Нет команды после '|'.", tokens[i - 1].start)
+                continue
+            break
+
+        items.append((connector, Pipeline(tuple(commands))))
+        if i < n:
+            connector = tokens[i].text  # ";" или "&&"
+            i += 1
+            if connector == "&&" and i >= n:
+                raise ParseError("Нет команды после '&&'.", tokens[i - 1].start)
+
+    return CommandLine(tuple(items))
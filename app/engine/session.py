@@ -1,50 +1,42 @@
 from __future__ import annotations
-from app.engine.vfs import VFS
-import posixpath
+from app.engine.vfs import VFS, FrozenNode
+from app.engine import vfs_binary
 
-from dataclasses import dataclass, asdict
-from typing import Any
-
-from app.engine.checker import check_command
-from app.engine.lesson_loader import load_lesson_json
-import json
-import os
+from collections import deque
 from dataclasses import dataclass
+from time import perf_counter_ns
+from typing import Any
 
+from app.engine import metrics
+from app.engine.checker import STATIC_CODES, check_command
+from app.engine.complete import Completion, complete
+from app.engine.history import CommandHistory
+from app.engine.lesson_loader import LessonRepository, Task, default_repository
+from app.engine.normalize import normalize_path
 
-@dataclass(frozen=True)
-class Task:
-    id: str
-    title: str
-    prompt: str
-    rule: dict[str, Any]
-    hint: str
-    success_explain: str
-
-
-LESSONS_DIR = os.path.join(os.path.dirname(__file__), "..", "content", "lessons")
-
+# сколько команд можно отменить подряд
+MAX_UNDO = 500
 
-def load_lesson(lesson_id: str) -> tuple[str, str, list["Task"]]:
-    path = os.path.normpath(os.path.join(LESSONS_DIR, f"{lesson_id}.json"))
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    lesson_title = data.get("title", lesson_id)
-    tasks_raw = data.get("tasks", [])
+def _task_brief(task: Task) -> dict[str, Any]:
+    # check — статические проверки для UI (ui/js/precheck.js)
+    return {"id": task.id, "title": task.title, "prompt": task.prompt, "check": task.checker.to_client()}
 
-    tasks: list[Task] = []
-    for t in tasks_raw:
-        tasks.append(Task(
-            id=t["id"],
-            title=t["title"],
-            prompt=t["prompt"],
-            rule=t["rule"],
-            success_explain=t.get("success_explain", ""),
-            hint=t.get("hint", "")
-        ))
 
-    return data.get("id", lesson_id), lesson_title, tasks
+@dataclass(frozen=True)
+class Checkpoint:
+    """
+    Состояние сессии для undo/redo/restart_task. Дерево — снимок
+    VFS.checkpoint(): общие поддеревья, так что сотни точек дёшевы.
+    """
+    vfs: FrozenNode
+    cwd: str
+    index: int
+    correct: int
+    last_args: tuple[str, ...]
+    last_cmd: str
+    # точка начала задания, в котором сделана эта; None — она сама
+    task_start: "Checkpoint | None"
 
 
 class Session:
@@ -53,51 +45,37 @@ class Session:
     - cwd (виртуальная директория)
     - индекс задания
     - статистика
-    - данные текущего урока (из JSON)
+    - данные текущего урока (из LessonRepository, скомпилированные и закэшированные)
+    - история для undo/redo (контрольная точка перед каждой командой)
+      и точка начала задания для restart_task; живёт только в памяти:
+      после загрузки сохранения начинается заново
+    - история введённых команд (CommandHistory) — в отличие от undo
+      сохраняется вместе с уроком и откатом не меняется
     """
 
-    def __init__(self, lesson_id: str = "01_paths") -> None:
+    def __init__(self, lesson_id: str = "01_paths", *, repo: LessonRepository | None = None) -> None:
+        lesson = (repo or default_repository()).get(lesson_id)
+
         self.lesson_id = lesson_id
-        self.lesson_title = ""
-        self.lesson_id, self.lesson_title, self._tasks = load_lesson(lesson_id)
-        self._i = 0
+        self.lesson_title = lesson.title
+        self._tasks: tuple[Task, ...] = lesson.tasks
+
         self.last_args: list[str] = []
         self.last_cmd = ""
+        self.history = CommandHistory()
         self.home = "/home/student"
-        self.vfs = VFS()
-        self.vfs.seed_basic_home(self.home)
-
-        # Пока грузим один урок. Потом легко сделаем выбор урока.
-        lesson = load_lesson_json("01_paths.json")
-
-        self.lesson_id = lesson.lesson_id
-        self.lesson_title = lesson.title
+        # копия-при-записи общего дерева урока: своё — только изменённое
+        self.vfs = VFS(indexed=True, base=lesson.base_tree(self.home))
 
         self.cwd = lesson.start_cwd
         self._i = 0
         self._correct = 0
         self._attempts = 0
 
-        self._tasks: list[Task] = [self._task_from_raw(t) for t in lesson.tasks]
-
-    def _task_from_raw(self, raw: dict[str, Any]) -> Task:
-        # минимальная валидация полей задачи
-        for key in ("id", "title", "prompt", "rule", "hint", "success_explain"):
-            if key not in raw:
-                raise ValueError(f"Task missing required key: {key}")
-
-        rule = raw["rule"]
-        if not isinstance(rule, dict) or "kind" not in rule:
-            raise ValueError(f"Task {raw.get('id')} has invalid rule")
-
-        return Task(
-            id=str(raw["id"]),
-            title=str(raw["title"]),
-            prompt=str(raw["prompt"]),
-            rule=rule,
-            hint=str(raw["hint"]),
-            success_explain=str(raw["success_explain"]),
-        )
+        # всё, что изменится после этого момента, попадёт в take_delta()
+        self.vfs.start_log()
+        self._delta_cwd = self.cwd
+        self._reset_history()
 
     def progress_dict(self) -> dict[str, Any]:
         return {
@@ -107,6 +85,8 @@ class Session:
             "total": len(self._tasks),
             "correct": self._correct,
             "attempts": self._attempts,
+            "undo": len(self._undo),
+            "redo": len(self._redo),
         }
 
     def current_task(self) -> Task:
@@ -115,21 +95,98 @@ class Session:
     def hint(self) -> str:
         return self.current_task().hint
 
+    def path_kinds(self, paths: list[str]) -> dict[str, str | None]:
+        """Путь как его набрали (~, .., относительный) -> "dir" / "file" / None."""
+        return {
+            p: self.vfs.stat(normalize_path(p, cwd=self.cwd, home=self.home)) if p else None
+            for p in paths
+        }
+
+    def complete(self, line: str, cursor: int) -> Completion:
+        """Tab: команды текущего задания и пути VFS относительно cwd."""
+        return complete(
+            line,
+            cursor,
+            commands=sorted(self.current_task().checker.allowed),
+            vfs=self.vfs,
+            cwd=self.cwd,
+            home=self.home,
+        )
+
     def _advance(self) -> None:
         if self._i < len(self._tasks) - 1:
             self._i += 1
 
     def submit(self, user_input: str) -> dict[str, Any]:
+        """
+        Выполнить команду и проверить задание.
+        - "stdout" — ленивый итератор вывода команды (в JSON не сериализуется:
+          AppAPI отдаёт его кусками через OutputStream)
+        - "pager" — вывод нужно показывать постранично (команда less/more)
+        - "terminal_lines" — строки фидбека, печатаются после вывода
+        """
+        m = metrics.ACTIVE
+        if m:
+            t_submit = perf_counter_ns()
+            m.begin(self.lesson_id, self.current_task().id, user_input)
+            try:
+                res = self._submit(user_input)
+            finally:
+                m.observe("submit", t_submit)
+            m.result(res["feedback"]["code"])
+            return res
+        return self._submit(user_input)
+
+    def record_attempt(self, user_input: str, code: str) -> None:
+        """
+        Попытка, которую UI отклонил сам (checker.STATIC_CODES): состояние
+        не меняется, как и при таком ответе submit, — только счётчик
+        попыток, история и метрики.
+        """
+        if code not in STATIC_CODES:
+            raise ValueError(f"not a static check code: {code}")
+        self._attempts += 1
+        self.history.append(user_input)
+        m = metrics.ACTIVE
+        if m:
+            m.begin(self.lesson_id, self.current_task().id, user_input)
+            m.result(code)
+
+    def _submit(self, user_input: str) -> dict[str, Any]:
+        m = metrics.ACTIVE
+        t0 = perf_counter_ns() if m else 0
+        self._undo.append(self._checkpoint())
+        self._redo.clear()
+        if m:
+            m.observe("checkpoint", t0)
+        self.history.append(user_input)
+
         self._attempts += 1
         task = self.current_task()
+        index = self._i
 
         ok, info, effects = check_command(
             user_input=user_input,
-            rule=task.rule,
+            rule=task.checker,
             cwd=self.cwd,
             home=self.home,
             vfs=self.vfs,
         )
+        t0 = perf_counter_ns() if m else 0
+        res = self._respond(task, ok, info, effects)
+        if m:
+            m.observe("response", t0)
+
+        if self._i != index:
+            # новое задание начинается с состояния после решения прошлого
+            t0 = perf_counter_ns() if m else 0
+            self._task_start = self._checkpoint(task_start=True)
+            if m:
+                m.observe("checkpoint", t0)
+        return res
+
+    def _respond(self, task: Task, ok: bool, info: dict[str, Any], effects: dict[str, Any]) -> dict[str, Any]:
+        """Применить эффекты команды и собрать ответ submit."""
         if effects and effects.get("last_args") is not None:
             self.last_args = effects["last_args"]
 
@@ -146,9 +203,8 @@ class Session:
         if effects.get("last_cmd"):
             self.last_cmd = effects["last_cmd"]
 
-        stdout = effects.get("stdout_lines")
-        if stdout:
-            terminal_lines.extend(stdout)
+        stdout = effects.get("stdout", iter(()))
+        pager = bool(effects.get("pager"))
 
         if ok:
             self._correct += 1
@@ -161,9 +217,11 @@ class Session:
 
             return {
                 "ok": True,
+                "stdout": stdout,
+                "pager": pager,
                 "terminal_lines": terminal_lines,
                 "feedback": {"type": "success", "code": code, "text": msg},
-                "task": {"id": next_task.id, "title": next_task.title, "prompt": next_task.prompt},
+                "task": _task_brief(next_task),
                 "cwd": self.cwd,
                 "progress": self.progress_dict(),
             }
@@ -173,33 +231,139 @@ class Session:
             terminal_lines.append(f"⚠️ {msg}")
             return {
                 "ok": False,
+                "stdout": stdout,
+                "pager": pager,
                 "terminal_lines": terminal_lines,
                 "feedback": {"type": "warn", "code": code, "text": msg},
-                "task": {"id": task.id, "title": task.title, "prompt": task.prompt},
+                "task": _task_brief(task),
                 "cwd": self.cwd,
                 "progress": self.progress_dict(),
             }
 
         # реальная ошибка
         terminal_lines.append(f"❌ {msg}")
+        feedback = {"type": "error", "code": code, "text": msg}
+        if "pos" in info:
+            # ERR_PARSE: где в строке разбор остановился
+            feedback["pos"] = info["pos"]
         return {
             "ok": False,
+            "stdout": stdout,
+            "pager": pager,
             "terminal_lines": terminal_lines,
-            "feedback": {"type": "error", "code": code, "text": msg},
-            "task": {"id": task.id, "title": task.title, "prompt": task.prompt},
+            "feedback": feedback,
+            "task": _task_brief(task),
             "cwd": self.cwd,
             "progress": self.progress_dict(),
         }
 
-    def to_dict(self) -> dict:
+    # ---------- undo / redo ----------
+    def _checkpoint(self, *, task_start: bool = False) -> Checkpoint:
+        return Checkpoint(
+            vfs=self.vfs.checkpoint(),
+            cwd=self.cwd,
+            index=self._i,
+            correct=self._correct,
+            last_args=tuple(self.last_args),
+            last_cmd=self.last_cmd,
+            task_start=None if task_start else self._task_start,
+        )
+
+    def _restore(self, cp: Checkpoint) -> None:
+        self.vfs.restore(cp.vfs)
+        self.cwd = cp.cwd
+        self._i = cp.index
+        self._correct = cp.correct
+        self.last_args = list(cp.last_args)
+        self.last_cmd = cp.last_cmd
+        self._task_start = cp.task_start or cp
+        # восстановление не выражается журналом мутаций: после него
+        # нужен полный снапшот сохранения (см. AppAPI.undo)
+        self.vfs.start_log()
+        self._delta_cwd = self.cwd
+
+    def _reset_history(self) -> None:
+        self._undo: deque[Checkpoint] = deque(maxlen=MAX_UNDO)
+        self._redo: list[Checkpoint] = []
+        self._task_start = self._checkpoint(task_start=True)
+
+    def undo(self) -> bool:
+        """Вернуть состояние до последней команды. False — отменять нечего."""
+        if not self._undo:
+            return False
+        self._redo.append(self._checkpoint())
+        self._restore(self._undo.pop())
+        return True
+
+    def redo(self) -> bool:
+        """Повторить отменённую команду. False — повторять нечего."""
+        if not self._redo:
+            return False
+        self._undo.append(self._checkpoint())
+        self._restore(self._redo.pop())
+        return True
+
+    def restart_task(self) -> None:
+        """Вернуть состояние начала текущего задания (отменяется через undo)."""
+        start = self._task_start
+        self._undo.append(self._checkpoint())
+        self._redo.clear()
+        self._restore(start)
+
+    def to_dict(self, *, binary_vfs: bool = False) -> dict:
+        """
+        binary_vfs=True кладёт в "vfs" бинарный снапшот (bytes, см. vfs_binary)
+        вместо вложенного dict — так его пишет storage/save.py.
+        """
         return {
             "lesson_id": self.lesson_id,
             "cwd": self.cwd,
             "task_index": self._i,
             "attempts": self._attempts,
             "correct": self._correct,
-            "vfs": self.vfs.to_dict(),  # мы добавим ниже
+            "vfs": vfs_binary.dump(self.vfs) if binary_vfs else self.vfs.to_dict(),
+            "history": self.history.to_dict(),
+        }
+
+    def take_delta(self) -> dict:
+        """
+        Изменения с прошлого take_delta(): мутации VFS, новый cwd, новые
+        команды истории и счётчики. Отсчёт сбрасывают только take_delta()
+        и from_dict(), а _restore (undo/redo/restart_task) — для VFS и cwd.
+        to_dict() его не трогает: полный снапшот не обнуляет будущую дельту.
+        Размер не зависит от размера дерева — это запись журнала сохранения.
+        """
+        delta: dict[str, Any] = {
+            "task_index": self._i,
+            "attempts": self._attempts,
+            "correct": self._correct,
         }
+        if self.cwd != self._delta_cwd:
+            delta["cwd"] = self.cwd
+            self._delta_cwd = self.cwd
+        ops = self.vfs.drain_log()
+        if ops:
+            delta["vfs"] = ops
+        new = self.history.take_new()
+        if new:
+            # seq первой новой команды: хвост журнала может лечь поверх
+            # снапшота, где эти команды уже есть (сбой между записью
+            # снапшота и удалением журнала) — при replay они пропускаются
+            delta["history"] = new
+            delta["history_seq"] = self.history.end - len(new)
+        return delta
+
+    def _apply_delta(self, delta: dict) -> None:
+        self.cwd = delta.get("cwd", self.cwd)
+        self._i = int(delta.get("task_index", self._i))
+        self._attempts = int(delta.get("attempts", self._attempts))
+        self._correct = int(delta.get("correct", self._correct))
+        self.vfs.replay(delta.get("vfs", []))
+        seq = delta.get("history_seq")
+        for k, cmd in enumerate(delta.get("history", ())):
+            if seq is not None and int(seq) + k < self.history.end:
+                continue
+            self.history.append(cmd)
 
     def from_dict(self, data: dict) -> None:
         # lesson_id пока игнорируем (у тебя пока один урок), но оставим на будущее
@@ -218,3 +382,17 @@ class Session:
         vfs_data = data.get("vfs")
         if isinstance(vfs_data, dict):
             self.vfs.from_dict(vfs_data)
+        elif isinstance(vfs_data, (bytes, bytearray, memoryview)):
+            vfs_binary.load_into(self.vfs, vfs_data)
+        if isinstance(data.get("history"), dict):
+            self.history.load(data["history"])
+
+        # хвост журнала сохранения поверх снапшота (см. storage/save.py)
+        for delta in data.get("journal", []):
+            self._apply_delta(delta)
+        self._i = min(max(self._i, 0), len(self._tasks) - 1)
+
+        self.vfs.start_log()
+        self._delta_cwd = self.cwd
+        self.history.take_new()
+        self._reset_history()
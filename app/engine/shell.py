@@ -1,10 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Any
-import posixpath
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator
+import fnmatch
+import re
 
+from app.engine.expand import ExpansionError, expand_argv
+from app.engine.filedata import FileData, count, iter_lines, tail_lines
 from app.engine.normalize import normalize_path, split_flags
+from app.engine.parser import CommandLine, SimpleCommand
 from app.engine.vfs import VFS
 
 
@@ -13,81 +19,546 @@ class ExecResult:
     ok: bool
     code: str
     message: str
-    stdout_lines: list[str]
+    # ленивый поток строк: в список превращается только на границе с терминалом
+    stdout_lines: Iterable[str]
     effects: dict[str, Any]
 
 
-def exec_command(*, cmd: str, args: list[str], cwd: str, home: str, vfs: VFS) -> ExecResult:
-    cmd = cmd.lower()
+@dataclass
+class ShellContext:
+    cwd: str
+    home: str
+    vfs: VFS
+    stdin: Iterator[str] | None = None
+    # False, если stdout уходит в | или > (ls тогда печатает по имени в строке)
+    tty: bool = True
+
+
+CommandFn = Callable[[list[str], ShellContext], ExecResult]
+
+
+@dataclass(frozen=True)
+class ArgSpec:
+    """
+    Какие аргументы команды — пути к уже существующим файлам: UI
+    подсвечивает несуществующие (ui/js/highlight.js) ещё до Enter.
+    """
+    # с какого позиционного аргумента начинаются такие пути (None — таких нет)
+    reads: int | None = None
+    # флаги со значением: значение не считается позиционным аргументом
+    value_flags: tuple[str, ...] = ()
+
+
+# имя команды -> реализация; exec_command ищет здесь за O(1)
+COMMANDS: dict[str, CommandFn] = {}
+ARG_SPECS: dict[str, ArgSpec] = {}
+
+
+def command(name: str, *, reads: int | None = None, value_flags: tuple[str, ...] = ()) -> Callable[[CommandFn], CommandFn]:
+    def deco(fn: CommandFn) -> CommandFn:
+        COMMANDS[name] = fn
+        ARG_SPECS[name] = ArgSpec(reads, value_flags)
+        return fn
+    return deco
+
+
+def _fail(code: str, message: str) -> ExecResult:
+    return ExecResult(False, code, message, [], {})
+
 
-    # ---- pwd ----
-    if cmd == "pwd":
-        if args:
-            return ExecResult(False, "ERR_UNEXPECTED_ARGS", "pwd не принимает аргументы.", [], {})
-        return ExecResult(True, "OK", "OK", [cwd], {"last_cmd": "pwd", "last_args": args})
+def _done(cmd: str, args: list[str], stdout: Iterable[str] = (), **effects: Any) -> ExecResult:
+    return ExecResult(True, "OK", "OK", stdout, {**effects, "last_cmd": cmd, "last_args": args})
 
-    # ---- ls ----
-    if cmd == "ls":
-        flags, positionals = split_flags(args)
-        if positionals:
-            return ExecResult(False, "ERR_UNEXPECTED_PATH",
-                              "В MVP ls работает без пути: просто ls или ls -l.", [], {})
 
-        names = vfs.list_dir(cwd)
+# Команды делают все чтения/изменения VFS сразу при вызове, а генератор stdout
+# только форматирует уже захваченные данные. Поэтому ленивый вывод не "видит"
+# изменений от следующих команд строки (ls; mkdir x).
 
-        if "-l" in flags:
-            lines = []
-            for n in names:
-                p = posixpath.normpath(posixpath.join(cwd, n))
-                lines.append(("drwxr-xr-x  " if vfs.is_dir(p) else "-rw-r--r--  ") + n)
-            return ExecResult(True, "OK", "OK", lines, {"last_cmd": "ls", "last_args": args})
+
+# ---- pwd ----
+@command("pwd")
+def _pwd(args: list[str], ctx: ShellContext) -> ExecResult:
+    if args:
+        return _fail("ERR_UNEXPECTED_ARGS", "pwd не принимает аргументы.")
+    return _done("pwd", args, [ctx.cwd])
+
+
+# ---- ls ----
+def _ls_lines(vfs: VFS, path: str, long: bool, tty: bool) -> list[str]:
+    if long:
+        return [("drwxr-xr-x  " if kind == "dir" else "-rw-r--r--  ") + n for n, kind in vfs.scandir(path)]
+    names = vfs.list_dir(path)
+    if not tty:
+        return names
+    return ["  ".join(names)] if names else [""]
+
+
+@command("ls", reads=0)
+def _ls(args: list[str], ctx: ShellContext) -> ExecResult:
+    flags, positionals = split_flags(args)
+    long = "-l" in flags
+    if not positionals:
+        return _done("ls", args, _ls_lines(ctx.vfs, ctx.cwd, long, ctx.tty))
+
+    # как в bash: сначала файлы (имя как набрано, ls *.txt), потом директории
+    files: list[str] = []
+    dirs: list[tuple[str, str]] = []
+    for a in positionals:
+        target = normalize_path(a, cwd=ctx.cwd, home=ctx.home)
+        kind = ctx.vfs.stat(target)
+        if kind is None:
+            return _fail("ERR_NO_SUCH_FILE", f"ls: нет такого файла или директории: {target}.")
+        if kind == "dir":
+            dirs.append((a, target))
         else:
-            return ExecResult(True, "OK", "OK",
-                              ["  ".join(names)] if names else [""],
-                              {"last_cmd": "ls", "last_args": args})
-
-    # ---- cd ----
-    if cmd == "cd":
-        if len(args) == 0:
-            return ExecResult(False, "ERR_MISSING_ARG", "После cd нужно указать путь.", [], {})
-        if len(args) > 1:
-            return ExecResult(False, "ERR_TOO_MANY_ARGS", "cd принимает ровно один аргумент.", [], {})
-
-        target = normalize_path(args[0], cwd=cwd, home=home)
-
-        if not vfs.exists(target):
-            return ExecResult(False, "ERR_NO_SUCH_DIR", f"Такой директории нет: {target}.", [], {})
-        if not vfs.is_dir(target):
-            return ExecResult(False, "ERR_NOT_DIR", f"Это не директория: {target}.", [], {})
-
-        return ExecResult(True, "OK", "OK", [], {"set_cwd": target, "last_cmd": "cd", "last_args": args})
-
-    # ---- mkdir ----
-    if cmd == "mkdir":
-        if len(args) == 0:
-            return ExecResult(False, "ERR_MISSING_ARG", "После mkdir нужно указать имя директории.", [], {})
-        if len(args) > 1:
-            return ExecResult(False, "ERR_TOO_MANY_ARGS", "В MVP mkdir создаёт одну директорию.", [], {})
-
-        target = normalize_path(args[0], cwd=cwd, home=home)
+            files.append(a)
+
+    lines: list[str] = []
+    if files:
+        if long:
+            lines.extend("-rw-r--r--  " + a for a in files)
+        elif ctx.tty:
+            lines.append("  ".join(files))
+        else:
+            lines.extend(files)
+    for a, target in dirs:
+        # несколько операндов — у содержимого каждой директории заголовок
+        if len(positionals) > 1:
+            if lines:
+                lines.append("")
+            lines.append(f"{a}:")
+        lines.extend(_ls_lines(ctx.vfs, target, long, ctx.tty))
+    return _done("ls", args, lines)
+
+
+# ---- cd ----
+@command("cd", reads=0)
+def _cd(args: list[str], ctx: ShellContext) -> ExecResult:
+    if len(args) == 0:
+        return _fail("ERR_MISSING_ARG", "После cd нужно указать путь.")
+    if len(args) > 1:
+        return _fail("ERR_TOO_MANY_ARGS", "cd принимает ровно один аргумент.")
+
+    target = normalize_path(args[0], cwd=ctx.cwd, home=ctx.home)
+
+    kind = ctx.vfs.stat(target)
+    if kind is None:
+        return _fail("ERR_NO_SUCH_DIR", f"Такой директории нет: {target}.")
+    if kind != "dir":
+        return _fail("ERR_NOT_DIR", f"Это не директория: {target}.")
+
+    return _done("cd", args, set_cwd=target)
+
+
+# ---- mkdir ----
+@command("mkdir")
+def _mkdir(args: list[str], ctx: ShellContext) -> ExecResult:
+    flags, positionals = split_flags(args)
+    if any(f != "-p" for f in flags):
+        return _fail("ERR_BAD_FLAG", "mkdir: поддерживается только флаг -p.")
+    if len(positionals) == 0:
+        return _fail("ERR_MISSING_ARG", "После mkdir нужно указать имя директории.")
+
+    # несколько имён — после раскрытия mkdir d{1..3} или явно
+    for a in positionals:
+        target = normalize_path(a, cwd=ctx.cwd, home=ctx.home)
         try:
-            vfs.mkdir(target)
+            if flags:
+                ctx.vfs.ensure_dir(target)
+            else:
+                ctx.vfs.mkdir(target)
         except ValueError:
-            return ExecResult(False, "ERR_EXISTS", "Такая директория уже существует.", [], {})
-        return ExecResult(True, "OK", "OK", [], {"last_cmd": "mkdir", "last_args": args})
+            return _fail("ERR_EXISTS", f"Такая директория уже существует: {target}.")
+    return _done("mkdir", args)
+
 
-    # ---- touch ----
-    if cmd == "touch":
-        if len(args) == 0:
-            return ExecResult(False, "ERR_MISSING_ARG", "После touch нужно указать имя файла.", [], {})
-        if len(args) > 1:
-            return ExecResult(False, "ERR_TOO_MANY_ARGS", "В MVP touch создаёт один файл.", [], {})
+# ---- touch ----
+@command("touch")
+def _touch(args: list[str], ctx: ShellContext) -> ExecResult:
+    if len(args) == 0:
+        return _fail("ERR_MISSING_ARG", "После touch нужно указать имя файла.")
 
-        target = normalize_path(args[0], cwd=cwd, home=home)
+    for a in args:
+        target = normalize_path(a, cwd=ctx.cwd, home=ctx.home)
         try:
-            vfs.touch(target)
+            ctx.vfs.touch(target)
         except ValueError as e:
-            return ExecResult(False, "ERR_TOUCH", str(e), [], {})
-        return ExecResult(True, "OK", "OK", [], {"last_cmd": "touch", "last_args": args})
+            return _fail("ERR_TOUCH", str(e))
+    return _done("touch", args)
+
+
+# ---- rm ----
+@command("rm", reads=0)
+def _rm(args: list[str], ctx: ShellContext) -> ExecResult:
+    flags, positionals = split_flags(args)
+    letters = set("".join(f[1:] for f in flags))
+    if letters - {"r", "f"}:
+        return _fail("ERR_BAD_FLAG", "rm: поддерживаются флаги -r и -f.")
+    if not positionals:
+        return _fail("ERR_MISSING_ARG", "После rm нужно указать, что удалить.")
+    recursive = "r" in letters
+    force = "f" in letters
+
+    targets = [normalize_path(a, cwd=ctx.cwd, home=ctx.home) for a in positionals]
+    for t in targets:
+        if t == "/" or ctx.cwd == t or ctx.cwd.startswith(t + "/"):
+            return _fail("ERR_BUSY", f"Нельзя удалить текущую директорию или её родителя: {t}.")
+        kind = ctx.vfs.stat(t)
+        if kind is None and not force:
+            return _fail("ERR_NO_SUCH_FILE", f"Нет такого файла или директории: {t}.")
+        if kind == "dir" and not recursive:
+            return _fail("ERR_IS_DIR", f"Это директория, нужен rm -r: {t}.")
+
+    # глубже — раньше: rm -r logs/** удаляет детей до родителей
+    for t in sorted(set(targets), reverse=True):
+        if ctx.vfs.stat(t) is not None:
+            ctx.vfs.remove(t)
+    return _done("rm", args)
+
+
+# ---- find ----
+@command("find", reads=0, value_flags=("-name", "-type"))
+def _find(args: list[str], ctx: ShellContext) -> ExecResult:
+    start = "."
+    rest = args
+    if rest and not rest[0].startswith("-"):
+        start, rest = rest[0], rest[1:]
+    name_rx = None
+    want = None
+    i = 0
+    while i < len(rest):
+        opt = rest[i]
+        val = rest[i + 1] if i + 1 < len(rest) else None
+        if opt == "-name" and val is not None:
+            name_rx = re.compile(fnmatch.translate(val)).match
+        elif opt == "-type" and val in ("f", "d"):
+            want = "file" if val == "f" else "dir"
+        else:
+            return _fail("ERR_BAD_ARGS", "find: используй find [путь] [-name ШАБЛОН] [-type f|d]")
+        i += 2
+
+    root = ctx.vfs.lookup(normalize_path(start, cwd=ctx.cwd, home=ctx.home))
+    if root is None:
+        return _fail("ERR_NO_SUCH_FILE", f"find: нет такого пути: {start}.")
+
+    # обходим сразу (смонтированные директории разворачиваются по мере обхода)
+    found: list[str] = []
+    stack = [(root, start)]
+    while stack:
+        node, path = stack.pop()
+        if (want is None or node.kind == want) and (name_rx is None or name_rx(node.name)):
+            found.append(path)
+        if node.kind == "dir":
+            ch = node.children or {}
+            prefix = path.rstrip("/") + "/"
+            stack.extend((ch[n], prefix + n) for n in reversed(node.sorted_names()))
+    return _done("find", args, found)
+
+
+# ---- echo ----
+@command("echo")
+def _echo(args: list[str], ctx: ShellContext) -> ExecResult:
+    return _done("echo", args, [" ".join(args)])
+
+
+# ---- чтение файлов и фильтры: cat / grep / head / tail / wc ----
+# Без файлов читают stdin, с файлами — содержимое кусками (см. filedata.py).
+def _stdin(ctx: ShellContext) -> Iterator[str]:
+    return ctx.stdin if ctx.stdin is not None else iter(())
+
+
+def _open(arg: str, cmd: str, ctx: ShellContext) -> FileData | ExecResult:
+    target = normalize_path(arg, cwd=ctx.cwd, home=ctx.home)
+    kind = ctx.vfs.stat(target)
+    if kind is None:
+        return _fail("ERR_NO_SUCH_FILE", f"{cmd}: нет такого файла: {target}.")
+    if kind != "file":
+        return _fail("ERR_IS_DIR", f"{cmd}: это директория: {target}.")
+    return ctx.vfs.read_file(target)
+
+
+def _open_all(args: list[str], cmd: str, ctx: ShellContext) -> list[FileData] | ExecResult:
+    out: list[FileData] = []
+    for a in args:
+        d = _open(a, cmd, ctx)
+        if isinstance(d, ExecResult):
+            return d
+        out.append(d)
+    return out
+
+
+class FileLines:
+    """
+    stdout cat'а: строки файлов, но с доступом к самим FileData —
+    cat big.log > copy.log копирует ссылки на части, а не строки.
+    """
+
+    def __init__(self, files: list[FileData]) -> None:
+        self.files = files
+
+    def __iter__(self) -> Iterator[str]:
+        for d in self.files:
+            yield from iter_lines(d)
+
+
+@command("cat", reads=0)
+def _cat(args: list[str], ctx: ShellContext) -> ExecResult:
+    flags, positionals = split_flags(args)
+    if flags:
+        return _fail("ERR_BAD_FLAG", f"cat: неизвестный флаг {flags[0]}")
+    if not positionals:
+        return _done("cat", args, _stdin(ctx))
+    files = _open_all(positionals, "cat", ctx)
+    if isinstance(files, ExecResult):
+        return files
+    return _done("cat", args, FileLines(files))
+
+
+def _pager(cmd: str, args: list[str], ctx: ShellContext) -> ExecResult:
+    """
+    Постраничный просмотр: сама команда только передаёт строки дальше,
+    листает UI (effects["pager"]). Не в терминал (less | grep) — как cat.
+    """
+    flags, positionals = split_flags(args)
+    if flags or len(positionals) > 1:
+        return _fail("ERR_BAD_ARGS", f"{cmd}: используй {cmd} ФАЙЛ или ... | {cmd}")
+    if positionals:
+        d = _open(positionals[0], cmd, ctx)
+        if isinstance(d, ExecResult):
+            return d
+        lines: Iterable[str] = FileLines([d])
+    else:
+        lines = _stdin(ctx)
+    return _done(cmd, args, lines, pager=ctx.tty)
+
+
+@command("less", reads=0)
+def _less(args: list[str], ctx: ShellContext) -> ExecResult:
+    return _pager("less", args, ctx)
+
+
+@command("more", reads=0)
+def _more(args: list[str], ctx: ShellContext) -> ExecResult:
+    return _pager("more", args, ctx)
+
+
+@command("grep", reads=1)
+def _grep(args: list[str], ctx: ShellContext) -> ExecResult:
+    flags, positionals = split_flags(args)
+    if not positionals:
+        return _fail("ERR_MISSING_ARG", "grep: укажи шаблон, например: ls | grep txt или grep ERROR app.log")
+    unknown = [f for f in flags if f not in ("-i", "-v")]
+    if unknown:
+        return _fail("ERR_BAD_FLAG", f"grep: неизвестный флаг {unknown[0]}")
+    try:
+        rx = re.compile(positionals[0], re.IGNORECASE if "-i" in flags else 0)
+    except re.error:
+        return _fail("ERR_BAD_PATTERN", f"grep: некорректный шаблон: {positionals[0]}")
+    invert = "-v" in flags
+
+    names = positionals[1:]
+    if not names:
+        return _done("grep", args, (line for line in _stdin(ctx) if bool(rx.search(line)) != invert))
+    files = _open_all(names, "grep", ctx)
+    if isinstance(files, ExecResult):
+        return files
+
+    def matches() -> Iterator[str]:
+        # несколько файлов — как в grep: "имя:строка"
+        for name, d in zip(names, files):
+            prefix = f"{name}:" if len(names) > 1 else ""
+            for line in iter_lines(d):
+                if bool(rx.search(line)) != invert:
+                    yield prefix + line
+
+    return _done("grep", args, matches())
+
+
+def _count_args(args: list[str], cmd: str) -> tuple[int, list[str]] | ExecResult:
+    """[-n ЧИСЛО] [файл] -> (число строк, файлы)."""
+    n = 10
+    rest = args
+    if rest and rest[0] == "-n":
+        if len(rest) < 2 or not rest[1].isdigit():
+            return _fail("ERR_BAD_ARGS", f"{cmd}: используй {cmd} -n ЧИСЛО [файл]")
+        n = int(rest[1])
+        rest = rest[2:]
+    if len(rest) > 1 or any(a.startswith("-") for a in rest):
+        return _fail("ERR_BAD_ARGS", f"{cmd}: используй {cmd} [-n ЧИСЛО] [файл]")
+    return n, rest
+
+
+@command("head", reads=0, value_flags=("-n",))
+def _head(args: list[str], ctx: ShellContext) -> ExecResult:
+    parsed = _count_args(args, "head")
+    if isinstance(parsed, ExecResult):
+        return parsed
+    n, names = parsed
+    if not names:
+        return _done("head", args, islice(_stdin(ctx), n))
+    d = _open(names[0], "head", ctx)
+    if isinstance(d, ExecResult):
+        return d
+    # читаем только начало файла: генератор останавливается на n-й строке
+    return _done("head", args, islice(iter_lines(d), n))
+
+
+@command("tail", reads=0, value_flags=("-n",))
+def _tail(args: list[str], ctx: ShellContext) -> ExecResult:
+    parsed = _count_args(args, "tail")
+    if isinstance(parsed, ExecResult):
+        return parsed
+    n, names = parsed
+    if not names:
+        def last() -> Iterator[str]:
+            yield from deque(_stdin(ctx), maxlen=n) if n else ()
+        return _done("tail", args, last())
+    d = _open(names[0], "tail", ctx)
+    if isinstance(d, ExecResult):
+        return d
+    # с конца файла, без чтения начала
+    return _done("tail", args, (line for line in tail_lines(d, n)))
+
+
+@command("wc", reads=0)
+def _wc(args: list[str], ctx: ShellContext) -> ExecResult:
+    flags, positionals = split_flags(args)
+    if any(f not in ("-l", "-w", "-c") for f in flags):
+        return _fail("ERR_BAD_ARGS", "wc: поддерживаются флаги -l, -w, -c")
+
+    def fmt(values: tuple[int, int, int], name: str = "") -> str:
+        picked = [v for f, v in zip(("-l", "-w", "-c"), values) if not flags or f in flags]
+        return " ".join([str(v) for v in picked] + ([name] if name else []))
+
+    if not positionals:
+        def from_stdin() -> Iterator[str]:
+            lines = words = chars = 0
+            for line in _stdin(ctx):
+                lines += 1
+                words += len(line.split())
+                chars += len(line) + 1
+            yield fmt((lines, words, chars))
+        return _done("wc", args, from_stdin())
+
+    files = _open_all(positionals, "wc", ctx)
+    if isinstance(files, ExecResult):
+        return files
+
+    def per_file() -> Iterator[str]:
+        total = [0, 0, 0]
+        for name, d in zip(positionals, files):
+            # только -c: размер известен без чтения файла
+            c = (0, 0, d.size) if flags == ["-c"] else count(d, words=not flags or "-w" in flags)
+            total = [a + b for a, b in zip(total, c)]
+            yield fmt(c, name)
+        if len(files) > 1:
+            yield fmt((total[0], total[1], total[2]), "total")
+
+    return _done("wc", args, per_file())
+
+
+def exec_command(*, cmd: str, args: list[str], cwd: str, home: str, vfs: VFS,
+                 stdin: Iterator[str] | None = None, tty: bool = True) -> ExecResult:
+    fn = COMMANDS.get(cmd.lower())
+    if fn is None:
+        return _fail("ERR_UNKNOWN_CMD", f"Команда '{cmd.lower()}' пока не поддерживается.")
+    return fn(args, ShellContext(cwd=cwd, home=home, vfs=vfs, stdin=stdin, tty=tty))
+
+
+# ---------- конвейеры и списки команд ----------
+def _redirect(c: SimpleCommand, r: ExecResult, ctx: ShellContext) -> ExecResult | None:
+    """
+    Записать stdout в файл из > / >> (при нескольких — как в bash: в последний,
+    остальные только создаются/обнуляются). None — всё хорошо.
+    Вывод cat'а копируется ссылками на части файлов, без чтения содержимого.
+    """
+    out = r.stdout_lines
+    if isinstance(out, FileLines):
+        data = FileData()
+        for d in out.files:
+            data = data.concat(d)
+    else:
+        data = FileData.from_lines(out)
+    r.stdout_lines = ()
+
+    last = len(c.redirects) - 1
+    for i, red in enumerate(c.redirects):
+        target = normalize_path(red.target, cwd=ctx.cwd, home=ctx.home)
+        if ctx.vfs.stat(target) == "dir":
+            return _fail("ERR_IS_DIR", f"Это директория: {target}.")
+        try:
+            if i == last:
+                ctx.vfs.write_file(target, data, append=red.op == ">>")
+            elif red.op == ">":
+                ctx.vfs.write_file(target, FileData())
+            else:
+                ctx.vfs.touch(target)
+        except ValueError as e:
+            return _fail("ERR_TOUCH", str(e))
+    return None
+
+
+@dataclass
+class LineResult:
+    ok: bool = True
+    code: str = "OK"
+    message: str = "OK"
+    outputs: list[Iterable[str]] = field(default_factory=list)
+    effects: dict[str, Any] = field(default_factory=dict)
+
+    def stdout(self) -> Iterator[str]:
+        return chain.from_iterable(self.outputs)
+
+
+def run_line(line: CommandLine, *, cwd: str, home: str, vfs: VFS) -> LineResult:
+    """
+    Выполнить разобранную строку: конвейеры через |, списки через ; и &&.
+    - аргументы раскрываются ({a,b}, *, ?, [...], **) прямо перед запуском
+      команды — по состоянию VFS после предыдущих команд строки
+    - cwd протягивается дальше по строке (cd x && touch a создаёт x/a)
+    - stdout стадии — вход следующей; всё ленивое, списком не становится
+    - && не запускает следующий конвейер после ошибки, ; — запускает
+    Итог: первая ошибка (если была), накопленные эффекты и общий stdout.
+    """
+    res = LineResult()
+    ctx = ShellContext(cwd=cwd, home=home, vfs=vfs)
+    last_ok = True
+
+    for connector, pipeline in line.items:
+        if connector == "&&" and not last_ok:
+            continue
+
+        stdin: Iterator[str] | None = None
+        r: ExecResult | None = None
+        last = len(pipeline.commands) - 1
+        for i, c in enumerate(pipeline.commands):
+            try:
+                argv = expand_argv(c.argv, c.quoted, cwd=ctx.cwd, home=ctx.home, vfs=vfs)
+            except ExpansionError as e:
+                r = _fail("ERR_TOO_MANY_WORDS", str(e))
+                break
+            r = exec_command(cmd=argv[0], args=argv[1:], cwd=ctx.cwd, home=ctx.home, vfs=vfs,
+                             stdin=stdin, tty=(i == last and not c.redirects))
+            if r.ok and c.redirects:
+                r = _redirect(c, r, ctx) or r
+            if not r.ok:
+                break
+            stdin = iter(r.stdout_lines)
+
+        assert r is not None
+        last_ok = r.ok
+        if not r.ok:
+            if res.ok:
+                res.ok, res.code, res.message = False, r.code, r.message
+            continue
+
+        res.outputs.append(stdin if stdin is not None else ())
+        if "set_cwd" in r.effects:
+            ctx.cwd = r.effects["set_cwd"]
+            res.effects["set_cwd"] = ctx.cwd
+        res.effects["last_cmd"] = r.effects["last_cmd"]
+        res.effects["last_args"] = r.effects["last_args"]
+        if r.effects.get("pager"):
+            res.effects["pager"] = True
 
-    return ExecResult(False, "ERR_UNKNOWN_CMD", f"Команда '{cmd}' пока не поддерживается.", [], {})
+    return res
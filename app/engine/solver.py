@@ -0,0 +1,270 @@
+"""
+Решатель уроков: проверяет, что каждое задание проходится, и находит
+кратчайшее решение (см. python -m app.solve).
+
+- Задания решаются по порядку: задание начинается с состояния (дерево
+  VFS и cwd), в котором его оставило найденное решение предыдущего, —
+  как у ученика, который решил так же.
+- Поиск — в ширину по строкам команд: команды задания (allowed_cmds),
+  флаги из has_flag и слова-пути (имена в cwd, .., ~, /, пути из
+  assert'ов, в том числе все пути ожидаемых деревьев tree_equals /
+  subtree_matches), не больше max_args путей в строке. Каждая строка идёт
+  через checker.check_command, как submit ученика: засчитанная — решение.
+- Состояние — снимок VFS.checkpoint() и cwd. Снимки делят нетронутые
+  поддеревья, повторы отсекаются по (cwd, Merkle-хэш дерева): хэши
+  закэшированы в узлах, так что новое состояние стоит пересчёта пути
+  от корня к изменённому.
+- Нерешаемым задание считается, только если перебраны все достижимые
+  состояния (exhausted) и ни один список кандидатов не был обрезан:
+  имён в cwd больше MAX_DIR_WORDS, пути глубже слов без cd, строка
+  с max_args путями выполнилась (больше путей не пробовали). Иначе, как
+  и при упоре в глубину или max_states, решение просто не найдено
+  в этих пределах.
+- Большие уровни поиска (от SPLIT_MIN состояний) можно разворачивать
+  в других процессах (remote, см. app/solve.py): туда уходят не снимки,
+  а строки-пути к состояниям, обратно — хэши новых состояний.
+"""
+
+from __future__ import annotations
+
+import posixpath
+import re
+import shlex
+from dataclasses import dataclass
+from itertools import product
+from typing import Callable, Iterable, Sequence
+
+from app.engine.asserts import CwdIs, ExistsDir, ExistsFile, HasFlag, TreeAssert
+from app.engine.checker import STATIC_CODES, check_command
+from app.engine.lesson_loader import LessonData, Task
+from app.engine.normalize import normalize_path
+from app.engine.vfs import VFS, FrozenNode, node_digest
+
+# домашняя директория ученика, как в Session
+HOME = "/home/student"
+
+MAX_DEPTH = 4
+MAX_STATES = 50_000
+# сколько имён из cwd пробовать аргументом (в смонтированных деревьях их тысячи)
+MAX_DIR_WORDS = 30
+
+# слово без кавычек, \, операторов и шаблонов — как есть (shlex.quote закавычил бы и ~)
+_PLAIN = re.compile(r"[^\s'\"\\|;&<>*?\[\]{}$`#]+")
+
+State = tuple[FrozenNode, str]
+
+
+def _quote(word: str) -> str:
+    return word if _PLAIN.fullmatch(word) else shlex.quote(word)
+
+
+@dataclass(frozen=True)
+class TaskResult:
+    task_id: str
+    # кратчайшее решение; None — не найдено
+    solution: tuple[str, ...] | None
+    # сколько разных состояний рассмотрено
+    states: int
+    # перебраны все достижимые состояния: без решения задание нерешаемо
+    exhausted: bool
+
+    @property
+    def status(self) -> str:
+        if self.solution is not None:
+            return "solved"
+        return "unsolvable" if self.exhausted else "not found"
+
+
+def _words(task: Task, vfs: VFS, cwd: str) -> tuple[list[str], bool]:
+    """
+    Аргументы-пути: из assert'ов задания, имена в cwd и .., ~, /.
+    Второе — список неполный: имён в cwd больше MAX_DIR_WORDS или среди
+    слов есть непустая директория, а cd нет (пути глубже не пробуются).
+    """
+    words: dict[str, None] = {}
+    for a in task.checker.asserts:
+        if isinstance(a, (ExistsDir, ExistsFile)):
+            words[a.path] = None
+        elif isinstance(a, CwdIs):
+            words[a.value] = None
+        elif isinstance(a, TreeAssert):
+            stack = [(a.path, a.tree)]
+            while stack:
+                path, node = stack.pop()
+                for name, child in (node.children or {}).items():
+                    words[posixpath.join(path, name)] = None
+                    stack.append((posixpath.join(path, name), child))
+    try:
+        names = vfs.list_dir(cwd)
+    except ValueError:  # cwd удалён
+        names = []
+    truncated = len(names) > MAX_DIR_WORDS
+    for w in (*names[:MAX_DIR_WORDS], "..", "~", "/"):
+        words[w] = None
+    if not truncated and "cd" not in task.checker.allowed:
+        # без cd имена внутри директорий станут словами, только если их назвали assert'ы
+        for w in words:
+            node = vfs.lookup(normalize_path(w, cwd=cwd, home=HOME))
+            if node is not None and node.kind == "dir" and any(
+                    posixpath.join(w, n) not in words for n in (node.children or ())):
+                truncated = True
+                break
+    return [_quote(w) for w in words], truncated
+
+
+def candidate_lines(task: Task, vfs: VFS, cwd: str, max_args: int = 1) -> tuple[list[tuple[str, int]], bool]:
+    """
+    Строки, которые пробуются из состояния, с числом путей в каждой:
+    сначала короткие — так из двух решений одной длины найдётся более
+    простое. Второе — список слов неполный (см. _words).
+    """
+    cmds = sorted(task.checker.allowed)
+    flags = [None, *dict.fromkeys(a.value for a in task.checker.asserts if isinstance(a, HasFlag))]
+    words, truncated = _words(task, vfs, cwd)
+    lines: list[tuple[str, int]] = []
+    for k in range(max_args + 1):
+        for flag in flags:
+            for cmd in cmds:
+                head = f"{cmd} {_quote(flag)}" if flag else cmd
+                lines.extend((" ".join((head, *args)), k) for args in product(words, repeat=k))
+    return lines, truncated
+
+
+@dataclass(frozen=True)
+class Step:
+    """Строка, выполненная из состояния: засчитана ли и куда привела."""
+    line: str
+    ok: bool
+    cwd: str
+    digest: bytes
+    # снимок после строки; None — посчитан в другом процессе (см. expand_paths)
+    tree: FrozenNode | None
+
+
+def expand(task: Task, vfs: VFS, state: State, max_args: int = 1) -> tuple[list[Step], bool]:
+    """
+    Все строки-кандидаты из state, кроме отвергнутых без выполнения.
+    Второе — пространство поиска из этого состояния обрезано: строка
+    с max_args путями выполнилась без ошибки (с ещё одним путём могла бы
+    что-то сделать) или выполнилась строка с путём, а список слов
+    неполный. Команды, которые пути отвергают (pwd x), поиск не обрезают.
+    """
+    tree, cwd = state
+    vfs.restore(tree)
+    lines, words_cut = candidate_lines(task, vfs, cwd, max_args)
+    truncated = False
+    steps: list[Step] = []
+    for line, nargs in lines:
+        vfs.restore(tree)
+        ok, info, effects = check_command(user_input=line, rule=task.checker, cwd=cwd, home=HOME, vfs=vfs)
+        if info["code"] in STATIC_CODES:
+            continue
+        if nargs and info["code"] == "GOAL_NOT_YET" and (words_cut or nargs == max_args):
+            truncated = True
+        after = vfs.checkpoint()
+        # как Session._respond: cwd меняется и при неудаче задания
+        steps.append(Step(line, ok, effects.get("set_cwd") or cwd, node_digest(after), after))
+    return steps, truncated
+
+
+def run_lines(task: Task, vfs: VFS, state: State, lines: Iterable[str]) -> State:
+    """Состояние после строк задания task, выполненных из state."""
+    tree, cwd = state
+    vfs.restore(tree)
+    for line in lines:
+        _, _, effects = check_command(user_input=line, rule=task.checker, cwd=cwd, home=HOME, vfs=vfs)
+        cwd = effects.get("set_cwd") or cwd
+    return vfs.checkpoint(), cwd
+
+
+def lesson_start(lesson: LessonData) -> tuple[VFS, State]:
+    vfs = VFS(indexed=True, base=lesson.base_tree(HOME))
+    return vfs, (vfs.checkpoint(), lesson.start_cwd)
+
+
+def expand_paths(lesson: LessonData, task_index: int, solved: Sequence[Sequence[str]],
+                 paths: Sequence[Sequence[str]], max_args: int = 1) -> list[tuple[list[Step], bool]]:
+    """
+    expand() для части уровня поиска в другом процессе. Состояния не
+    пересылаются: каждое восстанавливается повтором строк — решений
+    прошлых заданий (solved) и пути внутри задания task_index.
+    Снимки в ответ не кладутся (tree=None), родителю хватает хэшей.
+    """
+    vfs, start = lesson_start(lesson)
+    for task, lines in zip(lesson.tasks, solved):
+        start = run_lines(task, vfs, start, lines)
+    task = lesson.tasks[task_index]
+    out = []
+    for path in paths:
+        steps, truncated = expand(task, vfs, run_lines(task, vfs, start, path), max_args)
+        out.append(([Step(st.line, st.ok, st.cwd, st.digest, None) for st in steps], truncated))
+    return out
+
+
+# часть уровня поиска в других процессах: (номер задания, пути) -> expand_paths по путям
+RemoteExpand = Callable[[int, list[tuple[str, ...]]], list[tuple[list[Step], bool]]]
+
+# уровни меньше этого разворачиваются на месте: пересылка и повтор строк дороже
+SPLIT_MIN = 16
+
+
+def solve_task(task: Task, vfs: VFS, start: State, *, max_depth: int = MAX_DEPTH,
+               max_states: int = MAX_STATES, max_args: int = 1, task_index: int = 0,
+               remote: RemoteExpand | None = None) -> tuple[TaskResult, State]:
+    """
+    Кратчайшее решение задания из состояния start. Возвращает результат
+    и состояние после решения (не решено — start). С remote большие
+    уровни поиска разворачиваются в других процессах; результат тот же.
+    """
+    seen = {(start[1], node_digest(start[0]))}
+    # состояние (None — известен только путь к нему) и путь
+    frontier: list[tuple[State | None, tuple[str, ...]]] = [(start, ())]
+    truncated = False
+
+    def solved(path: tuple[str, ...], st: Step) -> tuple[TaskResult, State]:
+        after = (st.tree, st.cwd) if st.tree is not None else run_lines(task, vfs, start, path)
+        return TaskResult(task.id, path, len(seen), False), after
+
+    for _ in range(max_depth):
+        if remote is not None and len(frontier) >= SPLIT_MIN:
+            results = remote(task_index, [path for _, path in frontier])
+        else:
+            results = [expand(task, vfs, state if state is not None else run_lines(task, vfs, start, path), max_args)
+                       for state, path in frontier]
+        nxt: list[tuple[State | None, tuple[str, ...]]] = []
+        for (_, path), (steps, cut) in zip(frontier, results):
+            truncated |= cut
+            for st in steps:
+                if st.ok:
+                    return solved(path + (st.line,), st)
+                key = (st.cwd, st.digest)
+                if key in seen:
+                    continue
+                if len(seen) >= max_states:
+                    truncated = True
+                    continue
+                seen.add(key)
+                nxt.append(((st.tree, st.cwd) if st.tree is not None else None, path + (st.line,)))
+        if not nxt:
+            return TaskResult(task.id, None, len(seen), not truncated), start
+        frontier = nxt
+    return TaskResult(task.id, None, len(seen), False), start
+
+
+def solve_lesson(lesson: LessonData, *, max_depth: int = MAX_DEPTH, max_states: int = MAX_STATES,
+                 max_args: int = 1, remote: Callable[[tuple[tuple[str, ...], ...]], RemoteExpand] | None = None
+                 ) -> list[TaskResult]:
+    """
+    Все задания урока по порядку. Нерешённое задание состояние не меняет:
+    следующие ищутся с того же места. remote(решения прошлых заданий)
+    даёт RemoteExpand для поиска в других процессах (см. app/solve.py).
+    """
+    vfs, state = lesson_start(lesson)
+    results = []
+    solved: list[tuple[str, ...]] = []
+    for i, task in enumerate(lesson.tasks):
+        res, state = solve_task(task, vfs, state, max_depth=max_depth, max_states=max_states, max_args=max_args,
+                                task_index=i, remote=remote(tuple(solved)) if remote is not None else None)
+        results.append(res)
+        solved.append(res.solution or ())
+    return results
@@ -1,7 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, Union
+import hashlib
 import posixpath
+import sys
+
+from app.engine.filedata import EMPTY, FileData
 
 
 @dataclass
@@ -9,16 +16,299 @@ class Node:
     name: str
     kind: str  # "dir" | "file"
     children: dict[str, "Node"] | None = None
+    # отсортированные имена детей: строится при первом листинге,
+    # дальше поддерживается инкрементально в add_child (без sorted() на каждый ls)
+    _sorted: list[str] | None = field(default=None, init=False, repr=False, compare=False)
+    # содержимое файла (None — пустой файл), см. filedata.py
+    data: FileData | None = field(default=None, repr=False, compare=False)
+    # директория общего дерева урока, копией которой начался этот узел
+    # (см. FrozenNode): в сохранение идут только отличия от неё
+    base: "FrozenNode | None" = field(default=None, repr=False, compare=False)
+    # Merkle-хэш (см. node_digest); None — устарел, пересчитается по запросу
+    _merkle: "tuple[bytes, int] | None" = field(default=None, init=False, repr=False, compare=False)
+
+    def add_child(self, node: "Node") -> None:
+        if self.children is None:
+            self.children = {}
+        self.children[node.name] = node
+        if self._sorted is not None:
+            insort(self._sorted, node.name)
+
+    def remove_child(self, name: str) -> "Node":
+        node = self.children.pop(name)
+        if self._sorted is not None:
+            del self._sorted[bisect_left(self._sorted, name)]
+        return node
+
+    def sorted_names(self) -> list[str]:
+        if self._sorted is None:
+            self._sorted = sorted(self.children or ())
+        return self._sorted
+
+    def lazy_frozen(self) -> "FrozenNode | None":
+        """
+        Снимок для VFS.checkpoint у ленивой директории, дети которой ещё
+        не развёрнуты, — тоже ленивый. None — замораживать обходом детей.
+        """
+        return None
+
+
+class MountSource(ABC):
+    """
+    Источник содержимого смонтированного дерева (см. mounts.py).
+    entries(rel) — дети директории rel ("" — точка монтирования):
+    (имя, "dir" | "file", содержимое файла или None). Вызывается только
+    при первом обращении к директории и должна быть детерминированной:
+    сохранения хранят ссылки (mount, rel), а не само дерево.
+    """
+
+    @abstractmethod
+    def entries(self, rel: str) -> list[tuple[str, str, Optional[FileData]]]:
+        ...
+
+
+class MountDir(Node):
+    """
+    Директория смонтированного дерева: дети создаются при первом
+    обращении к children. Пока поддерево не менялось (pristine),
+    to_dict и бинарный снапшот сохраняют его ссылкой (mount, rel).
+    """
+
+    def __init__(self, name: str, source: MountSource, mount: str, rel: str) -> None:
+        super().__init__(name=name, kind="dir")
+        self._source: MountSource | None = source
+        self.mount = mount
+        self.rel = rel
+        self.dirty = False
+
+    @property
+    def children(self) -> dict[str, Node] | None:
+        src = self._source
+        if src is not None:
+            self._source = None
+            ch: dict[str, Node] = {}
+            prefix = self.rel + "/" if self.rel else ""
+            for name, kind, data in src.entries(self.rel):
+                if kind == "dir":
+                    ch[name] = MountDir(name, src, self.mount, prefix + name)
+                else:
+                    ch[name] = Node(name=name, kind="file", children=None, data=data)
+            self._children = ch
+        return self._children
+
+    @children.setter
+    def children(self, value: dict[str, Node] | None) -> None:
+        self._source = None
+        self._children = value
+
+    @property
+    def loaded(self) -> bool:
+        return self._source is None
+
+    def add_child(self, node: Node) -> None:
+        self.dirty = True
+        super().add_child(node)
+
+    def remove_child(self, name: str) -> Node:
+        self.dirty = True
+        return super().remove_child(name)
+
+    def pristine(self) -> bool:
+        """Поддерево совпадает с источником (загруженные части не менялись)."""
+        if not self.loaded:
+            return True
+        if self.dirty:
+            return False
+        return all(c.pristine() for c in self._children.values() if isinstance(c, MountDir))
+
+    def lazy_frozen(self) -> "FrozenNode | None":
+        return None if self.loaded else FrozenMountDir(self.name, self._source, self.rel)
+
+
+class FrozenNode:
+    """
+    Неизменяемый узел: общее дерево урока (VFS(base=...)) и контрольные
+    точки VFS (checkpoint). Имена интернированы, __slots__ вместо __dict__.
+    Не меняется никогда: перед изменением VFS копирует директорию
+    в свою сессию (путь от корня, см. VFS._owned_dir), так что разные
+    деревья делят все нетронутые поддеревья.
+
+    base — как у Node: директория общего дерева урока на том же месте;
+    у узлов самого общего дерева это они сами.
+    """
+
+    __slots__ = ("name", "kind", "children", "data", "_sorted", "base", "_merkle")
+
+    def __init__(self, name: str, kind: str, children: dict[str, "FrozenNode"] | None = None,
+                 data: FileData | None = None, base: "FrozenNode | None" = None) -> None:
+        self.name = sys.intern(name)
+        self.kind = kind
+        self.children = children
+        self.data = data
+        self._sorted: list[str] | None = None
+        self.base = base
+        self._merkle: tuple[bytes, int] | None = None
+
+    def sorted_names(self) -> list[str]:
+        if self._sorted is None:
+            self._sorted = sorted(self.children or ())
+        return self._sorted
+
+
+class FrozenMountDir(FrozenNode):
+    """
+    Смонтированная директория общего дерева: разворачивается при первом
+    обращении один раз на все сессии (источник детерминирован).
+    """
+
+    __slots__ = ("_src", "_ch", "rel")
+
+    def __init__(self, name: str, source: MountSource, rel: str, *, as_base: bool = False) -> None:
+        super().__init__(name, "dir")
+        self._src: MountSource | None = source
+        self._ch: dict[str, FrozenNode] | None = None
+        self.rel = rel
+        if as_base:
+            self.base = self
+
+    @property  # type: ignore[override]
+    def children(self) -> dict[str, FrozenNode] | None:
+        src = self._src
+        if src is not None:
+            self._src = None
+            prefix = self.rel + "/" if self.rel else ""
+            as_base = self.base is self
+            self._ch = {
+                sys.intern(name): FrozenMountDir(name, src, prefix + name, as_base=as_base) if kind == "dir"
+                else FrozenNode(name, "file", None, data)
+                for name, kind, data in src.entries(self.rel)
+            }
+        return self._ch
+
+    @children.setter
+    def children(self, value: dict[str, FrozenNode] | None) -> None:
+        self._ch = value
+
+
+AnyNode = Union[Node, FrozenNode]
+
+
+def freeze(node: Node) -> FrozenNode:
+    """
+    Заморозить дерево, собранное уроком, в общее (VFS(base=...)).
+    Нетронутые смонтированные поддеревья остаются ленивыми.
+    """
+    if isinstance(node, MountDir) and not node.loaded:
+        return FrozenMountDir(node.name, node._source, node.rel, as_base=True)
+    if node.kind == "file":
+        return FrozenNode(node.name, "file", None, node.data)
+    f = FrozenNode(node.name, "dir", {sys.intern(k): freeze(c) for k, c in (node.children or {}).items()})
+    f.base = f
+    # индекс имён для Tab (engine/complete.py) — один раз на все сессии;
+    # _thaw копирует его, дальше add_child/remove_child ведут его сами
+    f._sorted = sorted(f.children)
+    return f
+
+
+def _thaw(f: FrozenNode) -> Node:
+    """Собственная копия замороженной директории: дети пока общие."""
+    n = Node(name=f.name, kind="dir", children=dict(f.children or {}), base=f.base)
+    if f._sorted is not None:
+        n._sorted = list(f._sorted)
+    n._merkle = f._merkle
+    return n
+
+
+def diff_base(node: AnyNode) -> FrozenNode | None:
+    """
+    Директория общего дерева, отличия от которой сохраняет to_dict
+    и бинарный снапшот, или None — узел сохраняется целиком.
+    """
+    base = node.base
+    return None if base is node else base
+
+
+# ---------- Merkle-хэши ----------
+_MASK = (1 << 128) - 1
+
+
+def _merkle(node: AnyNode) -> tuple[bytes, int]:
+    """
+    (хэш содержимого узла, вклад в хэш родителя). Хэш директории — от
+    суммы вкладов детей по модулю 2**128: от порядка не зависит,
+    и пересчёт устаревшей директории — сложение закэшированных
+    вкладов детей, без сортировки и без хэширования каждого имени заново.
+    """
+    m = node._merkle
+    if m is None:
+        if node.kind == "file":
+            d = hashlib.blake2b(b"f" + (node.data or EMPTY).digest, digest_size=16).digest()
+        else:
+            acc = 0
+            for child in (node.children or {}).values():
+                acc += _merkle(child)[1]
+            d = hashlib.blake2b(b"d" + (acc & _MASK).to_bytes(16, "little"), digest_size=16).digest()
+        part = hashlib.blake2b(node.name.encode() + b"\0" + d, digest_size=16).digest()
+        m = node._merkle = (d, int.from_bytes(part, "little"))
+    return m
+
+
+def node_digest(node: AnyNode) -> bytes:
+    """
+    Merkle-хэш поддерева: имена, типы и содержимое файлов (имя самого
+    узла не входит). Одинаковые деревья — одинаковый хэш, где бы они
+    ни лежали и как бы ни были получены. Хэш кэшируется в узле; мутации
+    VFS сбрасывают его на пути от корня к изменённому (см. VFS._owned_dir),
+    так что после изменения пересчитывается только этот путь.
+    Смонтированные поддеревья для хэша разворачиваются.
+    """
+    return _merkle(node)[0]
 
 
 class VFS:
     """
     Мини-VFS (виртуальная файловая система) только для обучения.
     Никаких реальных файлов на диске.
+
+    indexed=True включает режим "таблицы инодов": плоский индекс
+    путь -> Node, который поддерживается всеми мутирующими операциями.
+    Тогда exists/is_dir/is_file/stat работают за O(1), без обхода от корня.
+
+    base — общее замороженное дерево урока (FrozenNode). VFS начинается
+    как его копия-при-записи: своими становятся только директории на пути
+    к изменённому (вместе со словарём детей), остальное — общие узлы.
+    Удаление — просто отсутствие имени в своей копии (whiteout), to_dict
+    и бинарный снапшот сохраняют только отличия от base.
+
+    digest(path) — Merkle-хэш поддерева (node_digest): сравнение двух
+    деревьев — сравнение хэшей, а не обход.
     """
 
-    def __init__(self) -> None:
-        self.root = Node(name="/", kind="dir", children={})
+    def __init__(self, *, indexed: bool = False, base: FrozenNode | None = None) -> None:
+        self._base = base
+        self.root = _thaw(base) if base is not None else Node(name="/", kind="dir", children={})
+        self._index: dict[str, AnyNode] | None = {"/": self.root} if indexed else None
+        # False, когда дерево подгружается лениво (attach_root) или лежит в base:
+        # тогда промах по индексу ещё не значит "нет такого пути" — индекс работает как кэш
+        self._index_complete = base is None
+        # журнал мутаций для инкрементальных сохранений (см. start_log/drain_log)
+        self._log: list[list] | None = None
+        # точка монтирования -> источник (см. mount)
+        self._mounts: dict[str, MountSource] = {}
+        # последняя контрольная точка, пока дерево с неё не менялось
+        self._clean: FrozenNode | None = None
+
+    @property
+    def indexed(self) -> bool:
+        return self._index is not None
+
+    @property
+    def mounts(self) -> dict[str, MountSource]:
+        return self._mounts
+
+    @property
+    def base(self) -> FrozenNode | None:
+        return self._base
 
     def seed_basic_home(self, home: str) -> None:
         """
@@ -30,6 +320,49 @@ class VFS:
         self.ensure_dir(posixpath.join(home, "downloads"))
         self.ensure_file(posixpath.join(home, "readme.txt"))
 
+    def mount(self, path: str, source: MountSource) -> None:
+        """
+        Смонтировать ленивое дерево в path (родители создаются, прежнее
+        содержимое path заменяется). Узлы создаются только при обходе,
+        индекс становится кэшем. Это настройка урока — в журнал не пишется.
+        """
+        key = self._key(path)
+        if key == "/":
+            raise ValueError("Cannot mount over /")
+        parent = self._owned_dir(posixpath.dirname(key), create=True)
+        name = posixpath.basename(key)
+        if parent.children and name in parent.children:
+            parent.remove_child(name)
+        parent.add_child(MountDir(name, source, key, ""))
+        self._mounts[key] = source
+        if self._index is not None:
+            prefix = key + "/"
+            for k in [k for k in self._index if k == key or k.startswith(prefix)]:
+                del self._index[k]
+            self._index_complete = False
+
+    def mount_node(self, name: str, mount: str, rel: str) -> AnyNode:
+        """
+        Узел по ссылке {"mount", "rel"} из сохранения; неизвестный mount —
+        пустая директория. С base смонтированное уже лежит в общем дереве.
+        """
+        if self._base is not None:
+            n = self._base_node(posixpath.join(mount, rel) if rel else mount)
+            if n is not None and n.kind == "dir":
+                return n
+        src = self._mounts.get(mount)
+        if src is None:
+            return Node(name=name, kind="dir", children={})
+        return MountDir(name, src, mount, rel)
+
+    def _base_node(self, key: str) -> FrozenNode | None:
+        cur = self._base
+        for part in self._split(key):
+            if cur is None or cur.kind != "dir":
+                return None
+            cur = (cur.children or {}).get(part)
+        return cur
+
     # ---------- path helpers ----------
     def _split(self, path: str) -> list[str]:
         p = posixpath.normpath(path)
@@ -37,11 +370,31 @@ class VFS:
             return []
         return [x for x in p.split("/") if x]
 
-    def _walk(self, path: str) -> Node | None:
+    def _key(self, path: str) -> str:
+        """
+        Канонический ключ индекса: "/" + части пути через "/".
+        """
+        return "/" + "/".join(self._split(path))
+
+    def _walk(self, path: str) -> AnyNode | None:
         """
         Вернуть узел по абсолютному path или None.
         """
-        parts = self._split(path)
+        if self._index is not None:
+            # пути из normalize_path уже канонические — пробуем без normpath
+            n = self._index.get(path)
+            if n is None:
+                key = self._key(path)
+                n = self._index.get(key)
+                if n is None and not self._index_complete:
+                    n = self._walk_parts(self._split(key))
+                    if n is not None:
+                        self._index[key] = n
+            return n
+
+        return self._walk_parts(self._split(path))
+
+    def _walk_parts(self, parts: list[str]) -> AnyNode | None:
         cur = self.root
         for part in parts:
             if cur.kind != "dir" or cur.children is None:
@@ -51,6 +404,20 @@ class VFS:
                 return None
         return cur
 
+    def lookup(self, path: str) -> AnyNode | None:
+        """
+        Узел по абсолютному пути (для обходов вроде glob) или None.
+        """
+        return self._walk(path)
+
+    def stat(self, path: str) -> str | None:
+        """
+        Один поиск вместо пары exists()+is_dir():
+        вернуть kind узла ("dir" | "file") или None, если пути нет.
+        """
+        n = self._walk(path)
+        return None if n is None else n.kind
+
     def exists(self, path: str) -> bool:
         return self._walk(path) is not None
 
@@ -67,19 +434,65 @@ class VFS:
         """
         Создать директорию (и родителей), как mkdir -p.
         """
+        n = self._walk(path)
+        if n is not None and n.kind == "dir":
+            return
+        self._owned_dir(path, create=True)
+
+    def _owned_dir(self, path: str, *, create: bool) -> Node:
+        """
+        Директория path, которую можно менять: узлы общего дерева на пути
+        от корня заменяются своими копиями. create=True создаёт недостающие
+        (как mkdir -p), иначе нет пути — ValueError.
+        """
+        self._clean = None  # все изменения дерева проходят здесь
+        if self._index is not None:
+            n = self._index.get(self._key(path))
+            if n is not None and n.kind == "dir" and not isinstance(n, FrozenNode):
+                # хэш устарел — значит, устарели и хэши всех предков
+                # (хэш директории считается только после хэшей детей)
+                if n._merkle is not None:
+                    self._invalidate(self._split(path))
+                return n
+
         parts = self._split(path)
         cur = self.root
+        cur._merkle = None
+        key = ""
+        created = False
         for part in parts:
+            key += "/" + part
             if cur.children is None:
                 cur.children = {}
             nxt = cur.children.get(part)
             if nxt is None:
+                if not create:
+                    raise ValueError("No such file or directory")
                 nxt = Node(name=part, kind="dir", children={})
-                cur.children[part] = nxt
-            else:
-                if nxt.kind != "dir":
-                    raise ValueError(f"Cannot create dir '{path}': '{part}' is a file")
+                cur.add_child(nxt)
+                created = True
+                if self._index is not None:
+                    self._index[key] = nxt
+            elif nxt.kind != "dir":
+                raise ValueError(f"Cannot create dir '{path}': '{part}' is a file")
+            elif isinstance(nxt, FrozenNode):
+                # имя уже есть, порядок детей не меняется
+                nxt = cur.children[part] = _thaw(nxt)
+                if self._index is not None:
+                    self._index[key] = nxt
+            nxt._merkle = None
             cur = nxt
+        if created and self._log is not None:
+            self._log.append(["dir", key])
+        return cur
+
+    def _invalidate(self, parts: list[str]) -> None:
+        """Сбросить Merkle-хэши своих директорий на пути от корня."""
+        cur = self.root
+        cur._merkle = None
+        for part in parts:
+            cur = cur.children[part]
+            cur._merkle = None
 
     def ensure_file(self, path: str) -> None:
         """
@@ -90,14 +503,24 @@ class VFS:
         if name in ("", "/", ".", ".."):
             raise ValueError("Bad file name")
 
-        self.ensure_dir(parent)
+        existing = self._walk(path)
+        if existing is not None:
+            if existing.kind != "file":
+                raise ValueError("Cannot touch: target is a directory")
+            return
 
-        pnode = self._walk(parent)
-        assert pnode and pnode.kind == "dir" and pnode.children is not None
+        pnode = self._owned_dir(parent, create=True)
+        assert pnode.kind == "dir" and pnode.children is not None
 
         existing = pnode.children.get(name)
         if existing is None:
-            pnode.children[name] = Node(name=name, kind="file", children=None)
+            node = Node(name=name, kind="file", children=None)
+            pnode.add_child(node)
+            key = posixpath.join(self._key(parent), name)
+            if self._index is not None:
+                self._index[key] = node
+            if self._log is not None:
+                self._log.append(["file", key])
         else:
             if existing.kind != "file":
                 raise ValueError("Cannot touch: target is a directory")
@@ -114,40 +537,298 @@ class VFS:
     def touch(self, path: str) -> None:
         self.ensure_file(path)
 
-    def list_dir(self, path: str) -> list[str]:
-        """
-        Возвращает список имён в директории.
-        """
+    def _dir_node(self, path: str) -> AnyNode:
         n = self._walk(path)
         if n is None:
             raise ValueError("No such file or directory")
         if n.kind != "dir" or n.children is None:
             raise ValueError("Not a directory")
-        return sorted(n.children.keys())
+        return n
+
+    def remove(self, path: str) -> None:
+        """
+        Удалить файл или директорию вместе со всем содержимым (как rm -r).
+        """
+        key = self._key(path)
+        if key == "/":
+            raise ValueError("Cannot remove /")
+        name = posixpath.basename(key)
+        if self._walk(key) is None:
+            raise ValueError("No such file or directory")
+        parent = self._owned_dir(posixpath.dirname(key), create=False)
+        node = parent.remove_child(name)
+
+        if self._index is not None:
+            if self._index_complete:
+                # полный индекс: снимаем ровно поддерево
+                stack = [(key, node)]
+                while stack:
+                    k, n = stack.pop()
+                    self._index.pop(k, None)
+                    for child_name, child in (n.children or {}).items():
+                        stack.append((k + "/" + child_name, child))
+            else:
+                # индекс-кэш: поддерево могло быть не загружено, чистим по префиксу
+                prefix = key + "/"
+                for k in [k for k in self._index if k == key or k.startswith(prefix)]:
+                    del self._index[k]
+        if self._log is not None:
+            self._log.append(["rm", key])
+
+    def read_file(self, path: str) -> FileData:
+        """
+        Содержимое файла (неизменяемое: запись создаёт новый FileData).
+        """
+        n = self._walk(path)
+        if n is None:
+            raise ValueError("No such file or directory")
+        if n.kind != "file":
+            raise ValueError("Is a directory")
+        return n.data or EMPTY
+
+    def write_file(self, path: str, data: FileData, *, append: bool = False) -> None:
+        """
+        Записать содержимое (как > ), append=True — дописать в конец (как >>).
+        Файл и родители создаются при необходимости.
+        """
+        self.ensure_file(path)
+        key = self._key(path)
+        node = self._walk(key)
+        assert node is not None
+        old_len = len(node.data or EMPTY)
+        new_data = (node.data or EMPTY).concat(data) if append else data
+        parent = self._owned_dir(posixpath.dirname(key), create=False)
+        if isinstance(node, FrozenNode):
+            # файл общего дерева не трогаем: в своей директории — своя копия
+            node = parent.children[node.name] = Node(name=node.name, kind="file", children=None)
+            if self._index is not None:
+                self._index[key] = node
+        node.data = new_data
+        node._merkle = None
+        if isinstance(parent, MountDir):
+            parent.dirty = True
+        if self._log is not None:
+            # >> — только дописанный кусок: журнал растёт на размер изменения,
+            # а не файла; длина до записи делает повтор (replay) идемпотентным
+            if append:
+                self._log.append(["append", key, old_len, data.to_json()])
+            else:
+                self._log.append(["write", key, new_data.to_json()])
+
+    def digest(self, path: str = "/") -> bytes:
+        """Merkle-хэш поддерева path (node_digest)."""
+        n = self._walk(path)
+        if n is None:
+            raise ValueError("No such file or directory")
+        return node_digest(n)
+
+    def list_dir(self, path: str) -> list[str]:
+        """
+        Возвращает список имён в директории (отсортированный).
+        """
+        return list(self._dir_node(path).sorted_names())
+
+    def scandir(self, path: str) -> Iterator[tuple[str, str]]:
+        """
+        Пары (имя, kind) в порядке сортировки — прямо из узла-родителя,
+        без повторного поиска каждого ребёнка от корня.
+        """
+        n = self._dir_node(path)
+        children = n.children
+        for name in n.sorted_names():
+            yield name, children[name].kind
+
+    # ---------- журнал мутаций ----------
+    def start_log(self) -> None:
+        """
+        Начать запись мутаций с чистого листа.
+        """
+        self._log = []
+
+    def drain_log(self) -> list[list]:
+        """
+        Забрать накопленные мутации и очистить журнал:
+        ["dir"|"file"|"rm", path], ["write", path, FileData.to_json()]
+        или ["append", path, длина до записи, дописанное FileData.to_json()].
+        """
+        if not self._log:
+            return []
+        ops, self._log = self._log, []
+        return ops
+
+    def replay(self, ops: list[list]) -> None:
+        """
+        Применить мутации из drain_log(). Операции идемпотентны.
+        """
+        for op in ops:
+            kind, path = op[0], op[1]
+            if kind == "dir":
+                self.ensure_dir(path)
+            elif kind == "file":
+                self.ensure_file(path)
+            elif kind == "rm":
+                if self._walk(path) is not None:
+                    self.remove(path)
+            elif kind == "write":
+                self.write_file(path, FileData.from_json(op[2]))
+            elif kind == "append":
+                # уже дописано (снапшот новее записи журнала) — длина не совпадёт
+                node = self._walk(path)
+                if (len(node.data or EMPTY) if node is not None else 0) == op[2]:
+                    self.write_file(path, FileData.from_json(op[3]), append=True)
+            else:
+                raise ValueError(f"Unknown VFS op: {kind}")
+
+    # ---------- контрольные точки ----------
+    def checkpoint(self) -> FrozenNode:
+        """
+        Неизменяемый снимок дерева для restore(). Замораживаются только
+        директории, скопированные с прошлой контрольной точки (путь
+        к изменённому), остальное — общие узлы: сотни снимков стоят
+        столько, сколько изменений между ними.
+        """
+        if self._clean is not None:
+            return self._clean
+        index = self._index
+
+        def walk(node: AnyNode, key: str) -> FrozenNode:
+            if isinstance(node, FrozenNode):
+                return node
+            # неразвёрнутое (смонтированное, из снапшота сохранения) не разворачиваем
+            f = node.lazy_frozen()
+            if f is None and node.kind == "file":
+                f = FrozenNode(node.name, "file", None, node.data)
+            elif f is None:
+                f = FrozenNode(node.name, "dir", {k: walk(c, key + "/" + k) for k, c in (node.children or {}).items()},
+                               base=node.base)
+                f._sorted = node._sorted
+            f._merkle = node._merkle
+            # индекс не должен указывать на узлы, которых больше нет в дереве
+            if index is not None and index.get(key or "/") is node:
+                index[key or "/"] = f
+            return f
+
+        frozen = self._clean = walk(self.root, "")
+        self.root = _thaw(frozen)
+        if index is not None:
+            index["/"] = self.root
+        return frozen
+
+    def restore(self, frozen: FrozenNode) -> None:
+        """
+        Вернуть дерево к контрольной точке (снимок не меняется и годится
+        для повторного restore). В журнал мутаций не пишется: после
+        restore нужен полный снапшот сохранения.
+        """
+        self.root = _thaw(frozen)
+        self._clean = frozen
+        if self._index is not None:
+            self._index = {"/": self.root}
+            self._index_complete = False
 
     def to_dict(self) -> dict:
-        def dump(node: Node) -> dict:
+        """
+        Дерево как вложенные dict. Нетронутые смонтированные поддеревья —
+        ссылкой {"mount": точка монтирования, "rel": путь внутри}.
+        Директория, начатая с общего дерева (base), — только отличия:
+        {"base": true, "children": изменённые, "whiteout": удалённые имена}.
+        """
+        def dump(node: AnyNode, in_base: bool) -> dict:
+            if isinstance(node, MountDir) and node.pristine():
+                return {"name": node.name, "kind": "dir", "mount": node.mount, "rel": node.rel}
             if node.kind == "file":
+                if node.data:
+                    return {"name": node.name, "kind": node.kind, "data": node.data.to_json()}
                 return {"name": node.name, "kind": node.kind}
+            children = node.children or {}
+            # отличиями — только под директорией, которая тоже пишется отличиями:
+            # при загрузке base ребёнка берётся из base родителя
+            base = diff_base(node) if in_base else None
+            if base is not None:
+                base_children = base.children or {}
+                d = {
+                    "name": node.name,
+                    "kind": node.kind,
+                    "base": True,
+                    "children": {k: dump(v, True) for k, v in children.items() if v is not base_children.get(k)},
+                }
+                whiteout = sorted(k for k in base_children if k not in children)
+                if whiteout:
+                    d["whiteout"] = whiteout
+                return d
             return {
                 "name": node.name,
                 "kind": node.kind,
-                "children": {k: dump(v) for k, v in (node.children or {}).items()},
+                "children": {k: dump(v, False) for k, v in children.items()},
             }
 
-        return dump(self.root)
+        return dump(self.root, True)
 
     def from_dict(self, data: dict) -> None:
-        def load(d: dict) -> Node:
+        def load(d: dict, base: FrozenNode | None) -> AnyNode:
             kind = d.get("kind", "dir")
             name = d.get("name", "/")
+            if "mount" in d:
+                return self.mount_node(name, d["mount"], d.get("rel", ""))
             if kind == "file":
-                return Node(name=name, kind="file", children=None)
+                raw = d.get("data")
+                return Node(name=name, kind="file", children=None, data=FileData.from_json(raw) if raw else None)
 
             children_raw = d.get("children", {}) or {}
+            if d.get("base") and base is not None and base.kind == "dir":
+                # отличия от общего дерева: остальные дети — общие узлы
+                node = _thaw(base)
+                for k in d.get("whiteout", ()):
+                    node.children.pop(k, None)
+                base_children = base.children or {}
+                for k, v in children_raw.items():
+                    node.children[k] = load(v, base_children.get(k))
+                node._sorted = None
+                node._merkle = None
+                return node
             node = Node(name=name, kind="dir", children={})
             for k, v in children_raw.items():
-                node.children[k] = load(v)
+                node.children[k] = load(v, None)
             return node
 
-        self.root = load(data)
+        self.root = load(data, self._base)
+        self._clean = None
+        if self._index is not None:
+            if self._base is not None:
+                # общие узлы не обходим: индекс — кэш
+                self._index = {"/": self.root}
+                self._index_complete = False
+            else:
+                self._reindex()
+
+    def attach_root(self, root: Node) -> None:
+        """
+        Подменить дерево целиком, не обходя его (например, лениво
+        загружаемым бинарным снапшотом). Индекс тогда заполняется по мере обращений.
+        """
+        self.root = root
+        self._clean = None
+        if self._index is not None:
+            self._index = {"/": root}
+            self._index_complete = False
+
+    def _reindex(self) -> None:
+        """
+        Перестроить плоский индекс путей по текущему дереву.
+        """
+        index: dict[str, Node] = {"/": self.root}
+        complete = True
+        stack: list[tuple[str, Node]] = [("", self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            for name, child in (node.children or {}).items():
+                key = prefix + "/" + name
+                index[key] = child
+                if child.kind != "dir":
+                    continue
+                if isinstance(child, MountDir) and not child.loaded:
+                    complete = False  # не разворачиваем смонтированное
+                else:
+                    stack.append((key, child))
+        self._index = index
+        self._index_complete = complete
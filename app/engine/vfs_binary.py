@@ -0,0 +1,334 @@
+"""
+Бинарный снапшот VFS (версионированный формат).
+
+Раскладка (little-endian, все u32-секции выровнены по 4 байта):
+    header   magic "LTVF", u16 version, u16 flags, u32 n_names, u32 n_nodes, u32 blob_len,
+             u32 data_len (с версии 2)
+    offsets  u32[n_names + 1]  — границы имён в blob
+    name_idx u32[n_nodes]      — индекс имени узла в таблице имён
+    sizes    u32[n_nodes]      — размер поддерева (сам узел + потомки)
+    kinds    u8[n_nodes]       — 0 = dir, 1 = file, 2 = нетронутое смонтированное
+                                 поддерево (v3; детей в снапшоте нет), 3 = директория
+                                 общего дерева урока (v4; дети — только изменённые)
+    blob     utf-8 имён подряд (каждое уникальное имя — один раз)
+    data     (v2) JSON [[номер узла, значение], ...] по возрастанию номера:
+             для файла — FileData.to_json() (ассеты уроков — ссылками),
+             для смонтированного поддерева (v3) — {"mount": .., "rel": ..},
+             для директории общего дерева (v4) — {"wh": [удалённые имена]}, если есть
+
+Узлы лежат в прямом порядке обхода (preorder), дети директории — по имени.
+Первый ребёнок узла i — это i + 1, следующий брат узла j — j + sizes[j].
+
+Чтение не декодирует файл целиком: массивы — это memoryview поверх
+bytes/mmap, а дети директории создаются только при первом обращении
+к node.children (см. LazyDir). Дети директории общего дерева — её дети
+из VFS.base без удалённых, поверх — изменённые из снапшота. Контрольная
+точка VFS не разворачивает и их: нетронутая LazyDir замораживается
+в FrozenLazyDir над тем же (неизменяемым) буфером.
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+from app.engine.filedata import FileData
+from app.engine.vfs import FrozenMountDir, FrozenNode, MountDir, Node, VFS, diff_base
+
+MAGIC = b"LTVF"
+VERSION = 4
+_HEADER_V1 = struct.Struct("<4sHHIII")
+_HEADER = struct.Struct("<4sHHIIII")
+
+KIND_DIR = 0
+KIND_FILE = 1
+KIND_MOUNT = 2
+KIND_BASEDIR = 3
+
+
+class Snapshot:
+    """
+    Представление бинарного снапшота поверх буфера без копирования.
+    """
+
+    def __init__(self, buf, vfs: VFS | None = None) -> None:
+        mv = memoryview(buf)
+        magic, version, _flags, n_names, n_nodes, blob_len = _HEADER_V1.unpack_from(mv, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a VFS snapshot")
+        if version == 1:
+            data_len = 0
+            off = _HEADER_V1.size
+        elif 2 <= version <= VERSION:
+            data_len = _HEADER.unpack_from(mv, 0)[-1]
+            off = _HEADER.size
+        else:
+            raise ValueError(f"Unsupported VFS snapshot version: {version}")
+
+        self.offsets = self._u32(mv, off, n_names + 1)
+        off += 4 * (n_names + 1)
+        self.name_idx = self._u32(mv, off, n_nodes)
+        off += 4 * n_nodes
+        self.sizes = self._u32(mv, off, n_nodes)
+        off += 4 * n_nodes
+        self.kinds = mv[off:off + n_nodes]
+        off += n_nodes
+        self.blob = mv[off:off + blob_len]
+        off += blob_len
+        # содержимое файлов: номер узла -> части (декодируются в node())
+        entries = json.loads(bytes(mv[off:off + data_len])) if data_len else []
+        self.data_pos: list[int] = [e[0] for e in entries]
+        self.data: list[list] = [e[1] for e in entries]
+
+        self.n_nodes = n_nodes
+        # VFS, в которую грузим: ссылки на смонтированное и общее дерево
+        self.vfs = vfs
+        self._names: list[str | None] = [None] * n_names
+
+    @staticmethod
+    def _u32(mv: memoryview, off: int, n: int):
+        part = mv[off:off + 4 * n]
+        if sys.byteorder == "little":
+            return part.cast("I")
+        a = array("I", part)  # на big-endian приходится копировать
+        a.byteswap()
+        return a
+
+    def name(self, j: int) -> str:
+        s = self._names[j]
+        if s is None:
+            s = sys.intern(str(self.blob[self.offsets[j]:self.offsets[j + 1]], "utf-8"))
+            self._names[j] = s
+        return s
+
+    def node(self, i: int, base: FrozenNode | None = None, frozen: bool = False) -> Node | FrozenNode:
+        """
+        base — узел общего дерева на том же месте (для KIND_BASEDIR);
+        frozen — узел для контрольной точки (FrozenNode, см. FrozenLazyDir).
+        """
+        name = self.name(self.name_idx[i])
+        kind = self.kinds[i]
+        lazy = FrozenLazyDir if frozen else LazyDir
+        if kind == KIND_DIR:
+            return lazy(name, self, i)
+        if kind == KIND_BASEDIR:
+            if base is None or base.kind != "dir":  # урок больше не даёт этот узел
+                return lazy(name, self, i)
+            return lazy(name, self, i, base)
+        extra = self.extra(i)
+        if kind == KIND_MOUNT:
+            if extra is None or self.vfs is None:
+                return FrozenNode(name, "dir", {}) if frozen else Node(name=name, kind="dir", children={})
+            n = self.vfs.mount_node(name, extra["mount"], extra["rel"])
+            if frozen and isinstance(n, MountDir):
+                return FrozenMountDir(name, n._source, n.rel)
+            return n
+        data = FileData.from_json(extra) if extra else None
+        if frozen:
+            return FrozenNode(name, "file", None, data)
+        return Node(name=name, kind="file", children=None, data=data)
+
+    def extra(self, i: int):
+        k = bisect_left(self.data_pos, i)
+        if k < len(self.data_pos) and self.data_pos[k] == i:
+            return self.data[k]
+        return None
+
+    def children_of(self, i: int, base: FrozenNode | None = None, frozen: bool = False) -> dict:
+        if base is not None:
+            out = dict(base.children or {})
+            extra = self.extra(i)
+            for name in extra.get("wh", ()) if extra else ():
+                out.pop(name, None)
+            base_children = base.children or {}
+        else:
+            out = {}
+            base_children = {}
+        sizes = self.sizes
+        j = i + 1
+        end = i + sizes[i]
+        while j < end:
+            name = self.name(self.name_idx[j])
+            out[name] = self.node(j, base_children.get(name), frozen)
+            j += sizes[j]
+        return out
+
+
+class LazyDir(Node):
+    """
+    Директория из снапшота: дети декодируются при первом обращении к children.
+    """
+
+    def __init__(self, name: str, snap: Snapshot, i: int, base: FrozenNode | None = None) -> None:
+        super().__init__(name=name, kind="dir", base=base)
+        self._snap: Snapshot | None = snap
+        self._i = i
+
+    @property
+    def children(self) -> dict[str, Node] | None:
+        snap = self._snap
+        if snap is not None:
+            self._snap = None
+            self._children = snap.children_of(self._i, self.base)
+            if self._sorted is None and self.base is None:
+                self._sorted = list(self._children)  # в снапшоте дети уже по имени
+        return self._children
+
+    @children.setter
+    def children(self, value: dict[str, Node] | None) -> None:
+        self._snap = None
+        self._children = value
+
+    @property
+    def loaded(self) -> bool:
+        return self._snap is None
+
+    def lazy_frozen(self) -> FrozenNode | None:
+        if self._snap is None:
+            return None
+        return FrozenLazyDir(self.name, self._snap, self._i, self.base)
+
+
+class FrozenLazyDir(FrozenNode):
+    """
+    LazyDir в контрольной точке: дети (тоже замороженные) декодируются
+    из снапшота при первом обращении. Снимок после загрузки сохранения
+    не разворачивает всё дерево.
+    """
+
+    __slots__ = ("_snap", "_i", "_ch")
+
+    def __init__(self, name: str, snap: Snapshot, i: int, base: FrozenNode | None = None) -> None:
+        super().__init__(name, "dir", base=base)
+        self._snap: Snapshot | None = snap
+        self._i = i
+
+    @property  # type: ignore[override]
+    def children(self) -> dict[str, FrozenNode] | None:
+        snap = self._snap
+        if snap is not None:
+            self._snap = None
+            self._ch = snap.children_of(self._i, self.base, frozen=True)
+            if self._sorted is None and self.base is None:
+                self._sorted = list(self._ch)
+        return self._ch
+
+    @children.setter
+    def children(self, value: dict[str, FrozenNode] | None) -> None:
+        self._ch = value
+
+    @property
+    def loaded(self) -> bool:
+        return self._snap is None
+
+
+def dump(vfs: VFS) -> bytes:
+    """
+    Сериализовать дерево VFS. Нетронутые поддеревья из ранее загруженного
+    снапшота копируются срезами массивов, без создания узлов; от директорий
+    общего дерева (VFS.base) — только изменённые дети и удалённые имена.
+    """
+    names: dict[str, int] = {}
+    name_idx = array("I")
+    sizes = array("I")
+    kinds = bytearray()
+    data: list[list] = []
+
+    def intern(name: str) -> int:
+        j = names.get(name)
+        if j is None:
+            j = names[name] = len(names)
+        return j
+
+    def emit(node: Node, in_base: bool) -> int:
+        pos = len(kinds)
+        name_idx.append(intern(node.name))
+        sizes.append(1)
+        if isinstance(node, MountDir) and node.pristine():
+            kinds.append(KIND_MOUNT)
+            data.append([pos, {"mount": node.mount, "rel": node.rel}])
+            return pos
+        # отличиями — только под KIND_BASEDIR (см. VFS.to_dict)
+        base = diff_base(node) if in_base else None
+        if base is not None:
+            kinds.append(KIND_BASEDIR)
+            ch = node.children or {}
+            wh = sorted(k for k in (base.children or {}) if k not in ch)
+            if wh:
+                data.append([pos, {"wh": wh}])
+            return pos
+        kinds.append(KIND_DIR if node.kind == "dir" else KIND_FILE)
+        if node.data:
+            data.append([pos, node.data.to_json()])
+        return pos
+
+    def copy_subtree(node: LazyDir | FrozenLazyDir) -> None:
+        snap = node._snap
+        assert snap is not None
+        a, b = node._i, node._i + snap.sizes[node._i]
+        shift = len(kinds) - a
+        for k in range(bisect_left(snap.data_pos, a), bisect_left(snap.data_pos, b)):
+            data.append([snap.data_pos[k] + shift, snap.data[k]])
+        name_idx.extend(intern(snap.name(j)) for j in snap.name_idx[a:b])
+        sizes.extend(snap.sizes[a:b])
+        kinds.extend(snap.kinds[a:b])
+
+    def kids(node: Node, pos: int):
+        ch = node.children or {}
+        base = diff_base(node) if kinds[pos] == KIND_BASEDIR else None
+        if base is not None:
+            base_children = base.children or {}
+            return (ch[n] for n in node.sorted_names() if ch[n] is not base_children.get(n))
+        return (ch[n] for n in node.sorted_names())
+
+    root = emit(vfs.root, True)
+    stack = [(root, kids(vfs.root, root))]
+    while stack:
+        pos, it = stack[-1]
+        child = next(it, None)
+        if child is None:
+            stack.pop()
+            sizes[pos] = len(kinds) - pos
+            continue
+        if isinstance(child, (LazyDir, FrozenLazyDir)) and not child.loaded:
+            copy_subtree(child)
+            continue
+        cpos = emit(child, kinds[pos] == KIND_BASEDIR)
+        if kinds[cpos] in (KIND_DIR, KIND_BASEDIR):
+            stack.append((cpos, kids(child, cpos)))
+
+    encoded = [n.encode("utf-8") for n in names]
+    offsets = array("I", [0])
+    total = 0
+    for e in encoded:
+        total += len(e)
+        offsets.append(total)
+
+    if sys.byteorder != "little":
+        for a in (offsets, name_idx, sizes):
+            a.byteswap()
+
+    data_raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8") if data else b""
+    return b"".join([
+        _HEADER.pack(MAGIC, VERSION, 0, len(encoded), len(kinds), total, len(data_raw)),
+        offsets.tobytes(),
+        name_idx.tobytes(),
+        sizes.tobytes(),
+        bytes(kinds),
+        b"".join(encoded),
+        data_raw,
+    ])
+
+
+def load_into(vfs: VFS, buf) -> None:
+    """
+    Подключить снапшот к vfs без полного декодирования: корень сразу,
+    остальное — по мере обращения.
+    """
+    snap = Snapshot(buf, vfs)
+    if snap.n_nodes == 0 or snap.kinds[0] not in (KIND_DIR, KIND_BASEDIR):
+        raise ValueError("Bad VFS snapshot: root must be a directory")
+    vfs.attach_root(snap.node(0, vfs.base))
@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+# отсчёт для --profile-startup: до импорта webview и остального
+from time import perf_counter
+
+_T0 = perf_counter()
+
+import argparse
 import os
-import webview
+import sys
+import threading
 
-from app.api import AppAPI
+from app.api import AppAPI, preload
 
 
 def _abs_path(*parts: str) -> str:
@@ -11,8 +18,80 @@ def _abs_path(*parts: str) -> str:
     return os.path.join(root, *parts)
 
 
-def main() -> None:
-    api = AppAPI()
+class StartupProfile:
+    """
+    --profile-startup: отметки времени от запуска main.py до первого
+    задания на экране; отчёт — в stderr, когда задание показано.
+    """
+
+    def __init__(self) -> None:
+        self.marks: list[tuple[str, float]] = []
+        self._lock = threading.Lock()
+        self.done = False
+
+    def mark(self, label: str) -> None:
+        with self._lock:
+            if not any(name == label for name, _ in self.marks):
+                self.marks.append((label, perf_counter() - _T0))
+
+    def report(self) -> str:
+        lines = ["startup profile (ms from main.py start):"]
+        prev = 0.0
+        for label, t in sorted(self.marks, key=lambda m: m[1]):
+            lines.append(f"  {label:<22} {t * 1e3:>8.1f}   (+{(t - prev) * 1e3:.1f})")
+            prev = t
+        return "\n".join(lines)
+
+
+class ProfiledAPI(AppAPI):
+    """AppAPI с отметками первого вызова (первое обращение JS, первое задание)."""
+
+    def __init__(self, profile: StartupProfile) -> None:
+        super().__init__()
+        self._profile = profile
+
+    def list_lessons(self) -> dict:
+        self._profile.mark("first bridge call")
+        res = super().list_lessons()
+        self._profile.mark("lessons listed")
+        return res
+
+    def shell_info(self) -> dict:
+        # последний вызов boot() перед стартовым экраном
+        res = super().shell_info()
+        self._profile.mark("start screen ready")
+        return res
+
+    def get_task(self) -> dict:
+        # get_task в конце start_new/continue_game: задание уходит в UI
+        res = super().get_task()
+        p = self._profile
+        p.mark("first task")
+        if not p.done:
+            p.done = True
+            print(p.report(), file=sys.stderr, flush=True)
+        return res
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m app.main")
+    ap.add_argument("--profile-startup", action="store_true",
+                    help="напечатать время до первого кадра и до первого задания")
+    ns = ap.parse_args(argv)
+
+    profile = StartupProfile() if ns.profile_startup else None
+    # тяжёлый импорт GUI-тулкита; движок (app.engine) до окна не импортируется
+    import webview
+
+    if profile:
+        profile.mark("webview imported")
+
+    # TRAINER_METRICS / TRAINER_TRACE, см. engine/metrics.py (модуль лёгкий);
+    # TRAINER_SAVE_BACKEND=sqlite — сохранения в одной базе (storage/save.py)
+    from app.engine import metrics
+
+    metrics.enable_from_env()
+    api = ProfiledAPI(profile) if profile else AppAPI()
 
     index_file = _abs_path("ui", "index.html")
     window = webview.create_window(
@@ -24,6 +103,18 @@ def main() -> None:
         resizable=True,
     )
 
+    def on_loaded() -> None:
+        if profile:
+            profile.mark("page loaded")
+        # первый кадр уже есть — движок и уроки грузим, пока открыт стартовый экран
+        preload()
+        if profile:
+            profile.mark("engine preloaded")
+
+    if profile:
+        window.events.shown += lambda: profile.mark("window shown")
+    window.events.loaded += on_loaded
+
     webview.start(debug=False)
 
 
@@ -0,0 +1,326 @@
+"""
+Серверный режим для класса: один процесс, много учеников в браузере.
+
+Запуск из корня репозитория:
+    python -m app.server --port 8080
+    python -m app.server --max-sessions 300 --max-memory 1024 --save-dir /srv/trainer
+    python -m app.server --save-backend sqlite --save-dir /srv/trainer
+
+Ученик открывает http://host:8080/?user=<имя>. Отдаётся тот же ui/, что и
+в окне pywebview, плюс js/server_api.js: он подменяет window.pywebview.api
+вызовами по WebSocket (/ws?user=<имя>), так что app.js не меняется.
+
+Сообщения WebSocket — JSON:
+    -> {"id": 1, "method": "submit_command", "args": ["ls"]}
+    <- {"id": 1, "result": {...}} | {"id": 1, "error": "..."}
+
+У каждого ученика свой AppAPI и свои сохранения (<user>__<урок>): файлы
+на урок или, с --save-backend sqlite, строки одной базы saves.sqlite3.
+Сессии живут в памяти, пока их не вытеснят:
+- больше --max-sessions живых сессий — выгружается давно не активная
+- RSS процесса выше --max-memory МБ — выгружается доля самых старых
+Выгрузка — полный снапшот в сохранение (AppAPI.suspend); при следующем
+вызове ученика сессия поднимается из него (continue_game) незаметно для UI.
+
+Команды выполняются прямо в цикле событий: submit — десятки-сотни мкс,
+а так у сессии не бывает двух одновременных вызовов.
+GET /stats — число сессий, вытеснений, RSS (для bench/loadgen.py).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import mimetypes
+import os
+import re
+import signal
+import sys
+import time
+import traceback
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from app.api import AppAPI
+from app.engine import metrics
+from app.storage import save
+from app.ws import OP_TEXT, WebSocketClosed, ws_accept, ws_frame, ws_read
+
+UI_DIR = Path(__file__).resolve().parent.parent / "ui"
+
+# методы AppAPI, доступные по WebSocket (как js_api у pywebview, без служебных)
+_METHODS = frozenset(
+    name for name in vars(AppAPI)
+    if not name.startswith("_") and callable(getattr(AppAPI, name)) and name != "suspend"
+)
+# эти вызовы сами создают/загружают сессию или она им не нужна — поднимать выгруженную не нужно
+_NO_RESUME = frozenset({"list_lessons", "has_save", "start_new", "continue_game", "reset_progress", "get_metrics",
+                        "shell_info"})
+
+_USER = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+# ---------- сессии ----------
+def current_rss() -> int | None:
+    """RSS процесса в байтах (Linux, /proc), иначе None."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class SessionPool:
+    """
+    AppAPI по ученикам + LRU живых сессий.
+
+    RSS после выгрузки сам не уменьшается (память остаётся у аллокатора
+    и уходит на новые сессии), поэтому по памяти вытесняем только когда
+    RSS превысил и предел, и уровень прошлого вытеснения.
+    """
+
+    def __init__(self, *, max_sessions: int, max_memory: int | None) -> None:
+        self.max_sessions = max_sessions
+        self.max_memory = max_memory
+        self._apis: dict[str, AppAPI] = {}
+        self._live: OrderedDict[str, None] = OrderedDict()  # от давних к свежим
+        self._suspended: dict[str, str] = {}  # ученик -> урок выгруженной сессии
+        self._conns: Counter[str] = Counter()
+        self._rss_mark = 0
+        self.evicted = 0
+        self.resumed = 0
+
+    def connect(self, user: str) -> None:
+        self._conns[user] += 1
+
+    def disconnect(self, user: str) -> None:
+        self._conns[user] -= 1
+        if self._conns[user] <= 0:
+            del self._conns[user]
+            if user not in self._live:
+                self._apis.pop(user, None)
+
+    def call(self, user: str, method: str, args: list[Any]) -> Any:
+        api = self._apis.get(user)
+        if api is None:
+            api = self._apis[user] = AppAPI(user=user)
+        if api.session is None and method not in _NO_RESUME:
+            lesson_id = self._suspended.pop(user, None)
+            if lesson_id is not None:
+                api.continue_game(lesson_id)
+                self.resumed += 1
+        try:
+            return getattr(api, method)(*args)
+        finally:
+            if api.session is not None:
+                self._suspended.pop(user, None)
+                self._live[user] = None
+                self._live.move_to_end(user)
+                self._enforce(keep=user)
+
+    def _evict_oldest(self, keep: str) -> bool:
+        for user in self._live:
+            if user != keep:
+                break
+        else:
+            return False
+        del self._live[user]
+        api = self._apis[user]
+        lesson_id = api.suspend()
+        if lesson_id is not None:
+            self._suspended[user] = lesson_id
+        if user not in self._conns:
+            del self._apis[user]
+        self.evicted += 1
+        return True
+
+    def _enforce(self, keep: str) -> None:
+        while len(self._live) > self.max_sessions and self._evict_oldest(keep):
+            pass
+        if self.max_memory is None:
+            return
+        rss = current_rss()
+        if rss is None or rss <= self.max_memory or rss <= self._rss_mark:
+            return
+        target = int(len(self._live) * self.max_memory / rss * 0.9)
+        while len(self._live) > target and self._evict_oldest(keep):
+            pass
+        gc.collect()
+        self._rss_mark = current_rss() or rss
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "live": len(self._live),
+            "suspended": len(self._suspended),
+            "connections": sum(self._conns.values()),
+            "evicted": self.evicted,
+            "resumed": self.resumed,
+            "rss_mb": round((current_rss() or 0) / 2**20, 1),
+            "max_sessions": self.max_sessions,
+            "max_memory_mb": self.max_memory and self.max_memory // 2**20,
+        }
+
+    def suspend_all(self) -> None:
+        for user in list(self._live):
+            self._apis[user].suspend()
+        self._live.clear()
+
+
+# ---------- HTTP ----------
+class Server:
+    def __init__(self, pool: SessionPool, *, ui_dir: Path = UI_DIR) -> None:
+        self.pool = pool
+        self.ui_dir = ui_dir.resolve()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {}
+            for line in lines[1:]:
+                k, sep, v = line.partition(":")
+                if sep:
+                    headers[k.strip().lower()] = v.strip()
+            url = urlsplit(target)
+            if url.path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                await self._websocket(reader, writer, headers, parse_qs(url.query))
+            elif method in ("GET", "HEAD"):
+                self._get(writer, unquote(url.path), head_only=(method == "HEAD"))
+            else:
+                self._respond(writer, 405, b"method not allowed\n")
+        except ValueError:
+            self._respond(writer, 400, b"bad request\n")
+        finally:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, body: bytes, *,
+                 ctype: str = "text/plain; charset=utf-8", head_only: bool = False) -> None:
+        reason = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}.get(status, "")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache\r\nConnection: close\r\n\r\n".encode("latin-1")
+            + (b"" if head_only else body)
+        )
+
+    def _get(self, writer: asyncio.StreamWriter, path: str, *, head_only: bool) -> None:
+        if path == "/stats":
+            body = json.dumps({**self.pool.stats(), "metrics": metrics.snapshot()}, ensure_ascii=False).encode("utf-8")
+            self._respond(writer, 200, body, ctype="application/json", head_only=head_only)
+            return
+        if path in ("/", ""):
+            path = "/index.html"
+        file = (self.ui_dir / path.lstrip("/")).resolve()
+        if self.ui_dir not in file.parents or not file.is_file():
+            self._respond(writer, 404, b"not found\n", head_only=head_only)
+            return
+        body = file.read_bytes()
+        if file.name == "index.html":
+            # мост pywebview.api -> WebSocket подключается только в серверном режиме
+            body = body.replace(b'<script src="js/app.js">',
+                                b'<script src="js/server_api.js"></script>\n  <script src="js/app.js">')
+        ctype = mimetypes.guess_type(file.name)[0] or "application/octet-stream"
+        if ctype.startswith("text/") or ctype.endswith("javascript"):
+            ctype += "; charset=utf-8"
+        self._respond(writer, 200, body, ctype=ctype, head_only=head_only)
+
+    async def _websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                         headers: dict[str, str], query: dict[str, list[str]]) -> None:
+        user = (query.get("user") or [""])[0]
+        key = headers.get("sec-websocket-key")
+        if not key or not _USER.match(user):
+            self._respond(writer, 400, b"need ?user=[A-Za-z0-9_-]{1,64} and a websocket key\n")
+            return
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {ws_accept(key)}\r\n\r\n".encode("latin-1")
+        )
+        self.pool.connect(user)
+        try:
+            while True:
+                op, data = await ws_read(reader, writer)
+                if op != OP_TEXT:
+                    continue
+                writer.write(ws_frame(OP_TEXT, self._dispatch(user, data)))
+                await writer.drain()
+        except (WebSocketClosed, ConnectionError):
+            pass
+        finally:
+            self.pool.disconnect(user)
+
+    def _dispatch(self, user: str, data: bytes) -> bytes:
+        msg_id = None
+        try:
+            msg = json.loads(data)
+            msg_id = msg.get("id")
+            method = msg.get("method")
+            args = msg.get("args") or []
+            if method not in _METHODS or not isinstance(args, list):
+                raise ValueError(f"unknown method: {method}")
+            reply = {"id": msg_id, "result": self.pool.call(user, method, args)}
+        except Exception as e:
+            if not isinstance(e, ValueError):
+                traceback.print_exc()
+            reply = {"id": msg_id, "error": f"{type(e).__name__}: {e}"}
+        return json.dumps(reply, ensure_ascii=False).encode("utf-8")
+
+
+async def serve(host: str, port: int, pool: SessionPool) -> None:
+    server = await asyncio.start_server(Server(pool).handle, host, port)
+    addr = server.sockets[0].getsockname()
+    print(f"serving ui/ on http://{addr[0]}:{addr[1]}/?user=<name>  (stats: /stats)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def _stop(*_: object) -> None:
+    raise KeyboardInterrupt
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.server", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--max-sessions", type=int, default=500, help="живых сессий в памяти")
+    ap.add_argument("--max-memory", type=int, default=None, help="предел RSS процесса, МБ")
+    ap.add_argument("--save-dir", default=None, help="каталог сохранений вместо ./appdata")
+    ap.add_argument("--save-backend", choices=save.BACKENDS, default=None,
+                    help="файлы на урок или одна база SQLite (по умолчанию TRAINER_SAVE_BACKEND или files)")
+    ns = ap.parse_args(argv)
+
+    if ns.save_dir:
+        save.SAVE_DIR = Path(ns.save_dir)
+        save.SAVE_DIR.mkdir(parents=True, exist_ok=True)
+    if ns.save_backend:
+        save.BACKEND = ns.save_backend
+    metrics.enable_from_env()
+    pool = SessionPool(max_sessions=max(1, ns.max_sessions),
+                       max_memory=ns.max_memory * 2**20 if ns.max_memory else None)
+    # SIGTERM — как Ctrl+C: живые сессии успевают выгрузиться в сохранения
+    signal.signal(signal.SIGTERM, _stop)
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(serve(ns.host, ns.port, pool))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.suspend_all()
+        print(f"stopped after {time.perf_counter() - t0:.0f} s: {pool.stats()}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
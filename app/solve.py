@@ -0,0 +1,143 @@
+"""
+Проверка уроков решателем (engine/solver.py): каждое задание должно
+проходиться из состояния, которое оставляют предыдущие, командами из
+его allowed_cmds. На каждое задание печатается кратчайшее решение или
+"unsolvable" / "not found".
+
+Запуск из корня репозитория:
+    python -m app.solve
+    python -m app.solve 02_files --depth 5 --max-states 200000
+    python -m app.solve --lessons-dir /tmp/lessons --jobs 8 --json > report.jsonl
+
+Задания урока зависят друг от друга и идут по порядку, уроки — тоже
+по очереди; параллелен сам поиск: уровень BFS от solver.SPLIT_MIN
+состояний делится на части между --jobs процессами, так что и один
+большой урок занимает все ядра.
+Код выхода 1, если хоть одно задание не решено.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from app.engine import solver
+from app.engine.lesson_loader import LessonRepository, default_repository
+
+
+@dataclass(frozen=True)
+class Limits:
+    max_depth: int
+    max_states: int
+    max_args: int
+
+
+_repo: LessonRepository | None = None
+
+
+def _init_worker(lessons_dir: str | None) -> None:
+    global _repo
+    _repo = LessonRepository(lessons_dir) if lessons_dir else default_repository()
+
+
+def expand(job: tuple[str, int, tuple[tuple[str, ...], ...], list[tuple[str, ...]], int]
+           ) -> list[tuple[list[solver.Step], bool]]:
+    """Часть уровня поиска в процессе пула (см. solver.expand_paths)."""
+    lesson_id, task_index, solved, paths, max_args = job
+    return solver.expand_paths(_repo.get(lesson_id), task_index, solved, paths, max_args)
+
+
+def _remote(pool: ProcessPoolExecutor, workers: int, lesson_id: str, max_args: int):
+    """solver.solve_lesson(remote=...): уровень поиска — частями в пул."""
+    def for_lesson(solved: tuple[tuple[str, ...], ...]) -> solver.RemoteExpand:
+        def run(task_index: int, paths: list[tuple[str, ...]]) -> list[tuple[list[solver.Step], bool]]:
+            # частей больше, чем процессов: неравные части не оставляют ядра без дела
+            size = -(-len(paths) // (workers * 4))
+            jobs = [(lesson_id, task_index, solved, paths[i:i + size], max_args)
+                    for i in range(0, len(paths), size)]
+            return [r for part in pool.map(expand, jobs) for r in part]
+        return run
+    return for_lesson
+
+
+def solve(lesson_id: str, limits: Limits, pool: ProcessPoolExecutor | None = None,
+          workers: int = 1) -> list[solver.TaskResult]:
+    lesson = _repo.get(lesson_id)
+    remote = _remote(pool, workers, lesson_id, limits.max_args) if pool is not None else None
+    return solver.solve_lesson(lesson, max_depth=limits.max_depth, max_states=limits.max_states,
+                               max_args=limits.max_args, remote=remote)
+
+
+def _report_text(lesson_id: str, results: list[solver.TaskResult], out) -> None:
+    print(f"== {lesson_id}", file=out)
+    for r in results:
+        if r.solution is not None:
+            steps = " ; ".join(r.solution)
+            print(f"  {r.task_id:<6} {len(r.solution)} step(s)  $ {steps}", file=out)
+        else:
+            print(f"  {r.task_id:<6} {r.status.upper()} ({r.states} states)", file=out)
+
+
+def _report_json(lesson_id: str, results: list[solver.TaskResult], out) -> None:
+    for r in results:
+        print(json.dumps({
+            "lesson_id": lesson_id,
+            "task_id": r.task_id,
+            "status": r.status,
+            "solution": list(r.solution) if r.solution is not None else None,
+            "states": r.states,
+        }, ensure_ascii=False), file=out)
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.solve", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("lessons", nargs="*", help="id уроков (по умолчанию — все)")
+    ap.add_argument("--lessons-dir", default=None, help="каталог уроков вместо app/content/lessons")
+    ap.add_argument("--depth", type=int, default=solver.MAX_DEPTH, help="максимум команд в решении задания")
+    ap.add_argument("--max-states", type=int, default=solver.MAX_STATES, help="максимум состояний на задание")
+    ap.add_argument("--max-args", type=int, default=1, help="максимум путей в одной команде")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                    help="число процессов для больших уровней поиска (1 — без пула)")
+    ap.add_argument("--json", action="store_true", help="JSON-строка на задание вместо текста")
+    ns = ap.parse_args(argv)
+
+    limits = Limits(ns.depth, ns.max_states, ns.max_args)
+    _init_worker(ns.lessons_dir)
+    try:
+        lesson_ids = ns.lessons or [info.id for info in _repo.index()]
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    report = _report_json if ns.json else _report_text
+    summary_out = sys.stderr if ns.json else sys.stdout
+
+    solved = failed = 0
+    t0 = time.perf_counter()
+    pool = None
+    if ns.jobs > 1:
+        pool = ProcessPoolExecutor(max_workers=ns.jobs, initializer=_init_worker, initargs=(ns.lessons_dir,))
+
+    try:
+        for lesson_id in lesson_ids:
+            res = solve(lesson_id, limits, pool, ns.jobs)
+            report(lesson_id, res, sys.stdout)
+            ok = sum(r.solution is not None for r in res)
+            solved += ok
+            failed += len(res) - ok
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    dt = time.perf_counter() - t0
+    print(f"\n{len(lesson_ids)} lesson(s): {solved} task(s) solved, {failed} not solved in {dt:.2f} s", file=summary_out)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,350 @@
+from __future__ import annotations
+
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+import atexit
 import json
+import mmap
+import os
+import struct
+
+if TYPE_CHECKING:
+    from app.storage.sqlite_store import SqliteStore
 
+# создаётся при первой записи, а не при импорте (импорт — на пути к первому окну)
 SAVE_DIR = Path("appdata")
-SAVE_DIR.mkdir(exist_ok=True)
+
+# где лежат сохранения:
+# - "files" — save_<ключ>.bin/.json + .journal в SAVE_DIR на каждый урок
+# - "sqlite" — одна база SAVE_DIR/saves.sqlite3 (WAL, см. sqlite_store.py)
+BACKENDS = ("files", "sqlite")
+BACKEND = os.environ.get("TRAINER_SAVE_BACKEND") or "files"
+SQLITE_NAME = "saves.sqlite3"
+
+# ключ сохранения — lesson_id или <user>__<lesson_id> (AppAPI._key);
+# в id уроков "__" не бывает, в именах учеников — может быть
+USER_SEP = "__"
+
+# после стольких записей журнала он сворачивается в новый снапшот
+JOURNAL_COMPACT_EVERY = 200
+# fsync журнала раз в столько записей (между ними — только flush в ОС)
+JOURNAL_FSYNC_EVERY = 8
+
+
+def split_key(key: str) -> tuple[str, str]:
+    """Ключ сохранения -> (user, lesson_id); user "" — сохранение окна pywebview."""
+    user, _, lesson_id = key.rpartition(USER_SEP)
+    return user, lesson_id
+
+
+_store: SqliteStore | None = None
+
+
+def _db() -> SqliteStore | None:
+    """База сохранений при BACKEND = "sqlite" (открывается один раз на SAVE_DIR), иначе None."""
+    global _store
+    if BACKEND == "files":
+        return None
+    if BACKEND != "sqlite":
+        raise ValueError(f"Unknown save backend: {BACKEND!r} (expected one of {', '.join(BACKENDS)})")
+    path = SAVE_DIR / SQLITE_NAME
+    if _store is None or _store.path != path:
+        from app.storage.sqlite_store import SqliteStore
+
+        if _store is not None:
+            _store.close()
+        _store = SqliteStore(path, compact_every=JOURNAL_COMPACT_EVERY)
+    return _store
 
 
 def _save_path(lesson_id: str) -> Path:
     return SAVE_DIR / f"save_{lesson_id}.json"
 
 
+def _bin_path(lesson_id: str) -> Path:
+    return SAVE_DIR / f"save_{lesson_id}.bin"
+
+
+def _journal_path(lesson_id: str) -> Path:
+    return SAVE_DIR / f"save_{lesson_id}.journal"
+
+
+# save_<id>.bin: magic, u32 длина JSON-метаданных, JSON, выравнивание до 4,
+# дальше бинарный снапшот VFS (app/engine/vfs_binary.py) до конца файла
+_BIN_MAGIC = b"LTSV"
+_BIN_HEADER = struct.Struct("<4sI")
+
+
+def _pack_bin(data: dict) -> bytes:
+    meta = {k: v for k, v in data.items() if k != "vfs"}
+    raw = json.dumps(meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    pad = -(_BIN_HEADER.size + len(raw)) % 4
+    return b"".join([_BIN_HEADER.pack(_BIN_MAGIC, len(raw)), raw, b" " * pad, bytes(data["vfs"])])
+
+
+def _unpack_bin(p: Path) -> dict:
+    """
+    Снапшот VFS не декодируется: data["vfs"] — memoryview поверх mmap
+    (на не-POSIX — поверх прочитанных байтов: там нельзя заменить
+    отображённый в память файл), узлы создаются лениво при обращении.
+    """
+    if os.name == "posix":
+        with open(p, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    else:
+        buf = p.read_bytes()
+    mv = memoryview(buf)
+    magic, meta_len = _BIN_HEADER.unpack_from(mv, 0)
+    if magic != _BIN_MAGIC:
+        raise ValueError(f"Not a save file: {p}")
+    start = _BIN_HEADER.size + meta_len
+    data = json.loads(bytes(mv[_BIN_HEADER.size:start]))
+    data["vfs"] = mv[start + (-start % 4):]
+    return data
+
+
+def _atomic_write(p: Path, content: str | bytes) -> None:
+    """
+    Записать файл целиком через временный файл + os.replace:
+    после падения на диске либо старая, либо новая версия.
+    """
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + ".tmp")
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    with open(tmp, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, p)
+
+
+class SaveJournal:
+    """
+    Журнал сохранения урока: снапшот save_<id>.bin (или .json) + дописываемый save_<id>.journal.
+    - append() дописывает одну строку JSON с дельтой одного submit
+    - fsync пачками (раз в fsync_every записей и при закрытии)
+    - после compact_every записей журнал сворачивается в новый снапшот
+    Снапшот всегда соответствует состоянию после последней записи журнала,
+    поэтому повторное применение хвоста после падения безопасно: append
+    VFS проверяет длину файла, команды истории — свой seq (history_seq).
+    """
+
+    def __init__(self, lesson_id: str, *, compact_every: int = JOURNAL_COMPACT_EVERY,
+                 fsync_every: int = JOURNAL_FSYNC_EVERY) -> None:
+        self.lesson_id = lesson_id
+        self.compact_every = compact_every
+        self.fsync_every = fsync_every
+        self._f = None
+        self._entries = 0
+        self._unsynced = 0
+
+    def _open(self):
+        if self._f is None:
+            p = _journal_path(self.lesson_id)
+            if p.exists():
+                with open(p, "rb") as f:
+                    self._entries = sum(1 for _ in f)
+            else:
+                p.parent.mkdir(parents=True, exist_ok=True)
+            self._f = open(p, "a", encoding="utf-8")
+        return self._f
+
+    def append(self, delta: dict, snapshot: Callable[[], dict]) -> None:
+        f = self._open()
+        f.write(json.dumps(delta, ensure_ascii=False, separators=(",", ":")) + "\n")
+        f.flush()
+        self._entries += 1
+        self._unsynced += 1
+
+        if self._entries >= self.compact_every:
+            self.write_snapshot(snapshot())
+        elif self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self) -> None:
+        if self._f is not None and self._unsynced:
+            os.fsync(self._f.fileno())
+            self._unsynced = 0
+
+    def write_snapshot(self, data: dict) -> None:
+        """
+        Полный снапшот; журнал после него начинается с нуля.
+        Если data["vfs"] — байты бинарного снапшота, пишется save_<id>.bin.
+        """
+        if isinstance(data.get("vfs"), (bytes, bytearray, memoryview)):
+            _atomic_write(_bin_path(self.lesson_id), _pack_bin(data))
+            _save_path(self.lesson_id).unlink(missing_ok=True)
+        else:
+            _atomic_write(_save_path(self.lesson_id),
+                          json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+            _bin_path(self.lesson_id).unlink(missing_ok=True)
+        self.close()
+        _journal_path(self.lesson_id).unlink(missing_ok=True)
+        self._entries = 0
+
+    def close(self) -> None:
+        if self._f is not None:
+            self.sync()
+            self._f.close()
+            self._f = None
+            self._unsynced = 0
+
+    def read(self) -> list[dict]:
+        """
+        Записи журнала по порядку. Недописанная последняя строка (падение
+        посреди записи) игнорируется.
+        """
+        p = _journal_path(self.lesson_id)
+        if not p.exists():
+            return []
+        out: list[dict] = []
+        with open(p, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    out.append(json.loads(line))
+                except ValueError:
+                    break
+        return out
+
+
+_journals: dict[str, SaveJournal] = {}
+
+
+def _journal(lesson_id: str) -> SaveJournal:
+    j = _journals.get(lesson_id)
+    if j is None:
+        j = _journals[lesson_id] = SaveJournal(lesson_id)
+    return j
+
+
+@atexit.register
+def _close_journals() -> None:
+    for j in _journals.values():
+        j.close()
+    if _store is not None:
+        _store.close()
+
+
 def load_save(lesson_id: str) -> dict | None:
+    """
+    Снапшот + хвост журнала в data["journal"] (его применяет Session.from_dict).
+    """
+    db = _db()
+    if db is not None:
+        return db.load(*split_key(lesson_id))
+    b = _bin_path(lesson_id)
     p = _save_path(lesson_id)
-    if not p.exists():
+    if b.exists():
+        data = _unpack_bin(b)
+    elif p.exists():
+        data = json.loads(p.read_text(encoding="utf-8"))
+    else:
         return None
-    return json.loads(p.read_text(encoding="utf-8"))
+    journal = _journal(lesson_id).read()
+    if journal:
+        data["journal"] = journal
+    return data
 
 
 def write_save(lesson_id: str, data: dict) -> None:
-    p = _save_path(lesson_id)
-    p.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    db = _db()
+    if db is not None:
+        db.write(*split_key(lesson_id), data)
+        return
+    _journal(lesson_id).write_snapshot(data)
+
+
+def append_save(lesson_id: str, delta: dict, snapshot: Callable[[], dict]) -> None:
+    """
+    Дописать дельту одного submit в журнал. snapshot() вызывается только
+    при сворачивании журнала в новый полный снапшот.
+    """
+    db = _db()
+    if db is not None:
+        db.append(*split_key(lesson_id), delta, snapshot)
+        return
+    _journal(lesson_id).append(delta, snapshot)
 
 
 def delete_save(lesson_id: str) -> None:
+    db = _db()
+    if db is not None:
+        db.delete(*split_key(lesson_id))
+        return
+    j = _journals.pop(lesson_id, None)
+    if j is not None:
+        j.close()
+    _journal_path(lesson_id).unlink(missing_ok=True)
+    _bin_path(lesson_id).unlink(missing_ok=True)
     p = _save_path(lesson_id)
     if p.exists():
         p.unlink()
 
 
 def do_has_save(lesson_id: str) -> bool:
-    return _save_path(lesson_id).exists()
+    db = _db()
+    if db is not None:
+        return db.has(*split_key(lesson_id))
+    return _bin_path(lesson_id).exists() or _save_path(lesson_id).exists()
+
+
+def _file_keys(user: str) -> list[str]:
+    """Ключи сохранений user в SAVE_DIR — один проход по директории."""
+    if not SAVE_DIR.is_dir():
+        return []
+    keys = set()
+    for p in SAVE_DIR.iterdir():
+        name = p.name
+        if name.startswith("save_") and name.endswith((".bin", ".json")):
+            key = name[len("save_"):name.rindex(".")]
+            if split_key(key)[0] == user:
+                keys.add(key)
+    return sorted(keys)
+
+
+def _file_progress(key: str) -> dict:
+    b = _bin_path(key)
+    if b.exists():
+        # метаданные .bin — в начале файла, снапшот VFS не читается
+        with open(b, "rb") as f:
+            magic, meta_len = _BIN_HEADER.unpack(f.read(_BIN_HEADER.size))
+            if magic != _BIN_MAGIC:
+                raise ValueError(f"Not a save file: {b}")
+            data = json.loads(f.read(meta_len))
+        updated = b.stat().st_mtime
+    else:
+        p = _save_path(key)
+        data = json.loads(p.read_text(encoding="utf-8"))
+        updated = p.stat().st_mtime
+    journal = _journal(key).read()
+    if journal:
+        data.update(journal[-1])
+        updated = _journal_path(key).stat().st_mtime
+    return {
+        "task_index": int(data.get("task_index", 0)),
+        "correct": int(data.get("correct", 0)),
+        "attempts": int(data.get("attempts", 0)),
+        "updated": updated,
+    }
+
+
+def saved_lessons(user: str | None = None) -> list[str]:
+    """Уроки, у которых есть сохранение (у ученика user; None — окно pywebview)."""
+    db = _db()
+    if db is not None:
+        return db.lessons(user or "")
+    return [split_key(key)[1] for key in _file_keys(user or "")]
+
+
+def saved_progress(user: str | None = None) -> dict[str, dict]:
+    """
+    Прогресс по всем сохранённым урокам одним вызовом:
+    lesson_id -> {task_index, correct, attempts, updated (unix time)}.
+    В SQLite — один запрос по индексу; у файлов — чтение начала
+    каждого сохранения и его журнала.
+    """
+    db = _db()
+    if db is not None:
+        return db.progress(user or "")
+    return {split_key(key)[1]: _file_progress(key) for key in _file_keys(user or "")}
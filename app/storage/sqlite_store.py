@@ -0,0 +1,204 @@
+"""
+Сохранения в одной базе SQLite вместо файлов save_<ключ>.* на урок
+(save.BACKEND = "sqlite"): на общих машинах в классе тысячи мелких
+файлов в одной директории медленны и ломаются при сбоях.
+
+Контракт тот же, что у файлов в save.py: полный снапшот + журнал
+дельт submit, который сворачивается в новый снапшот раз в compact_every
+записей. Таблицы (ключ — (user, lesson_id), см. save.split_key):
+    sessions  — сохранение без vfs (JSON) и число записей журнала
+    progress  — task_index / correct / attempts / updated: индекс для
+                "прогресс по всем урокам" и "у каких уроков есть сохранение"
+    snapshots — снапшот VFS: бинарный (BLOB, vfs_binary) или JSON
+    journal   — дельта одного submit на строку, по seq
+
+- WAL + synchronous=NORMAL: читатели не ждут писателя, fsync — на
+  checkpoint WAL, а не на каждый submit (как пачки fsync журнала файлов).
+  После сбоя база — на границе какой-то транзакции.
+- Все записи одного submit (дельта, счётчики прогресса и, если пора,
+  новый снапшот) — одна транзакция BEGIN IMMEDIATE.
+- SQL — константные строки: sqlite3 готовит каждую один раз и берёт
+  из кэша statement'ов соединения.
+- Вызовы из разных потоков (pywebview) идут через один замок.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user        TEXT NOT NULL,
+    lesson_id   TEXT NOT NULL,
+    meta        TEXT NOT NULL,
+    journal_len INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user, lesson_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS progress (
+    user       TEXT NOT NULL,
+    lesson_id  TEXT NOT NULL,
+    task_index INTEGER NOT NULL,
+    correct    INTEGER NOT NULL,
+    attempts   INTEGER NOT NULL,
+    updated    REAL NOT NULL,
+    PRIMARY KEY (user, lesson_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS snapshots (
+    user      TEXT NOT NULL,
+    lesson_id TEXT NOT NULL,
+    binary    INTEGER NOT NULL,
+    vfs       BLOB,
+    PRIMARY KEY (user, lesson_id)
+);
+CREATE TABLE IF NOT EXISTS journal (
+    user      TEXT NOT NULL,
+    lesson_id TEXT NOT NULL,
+    seq       INTEGER NOT NULL,
+    delta     TEXT NOT NULL,
+    PRIMARY KEY (user, lesson_id, seq)
+) WITHOUT ROWID;
+"""
+
+_GET_SAVE = ("SELECT s.meta, n.binary, n.vfs FROM sessions s JOIN snapshots n USING (user, lesson_id) "
+             "WHERE s.user = ? AND s.lesson_id = ?")
+_GET_JOURNAL = "SELECT delta FROM journal WHERE user = ? AND lesson_id = ? ORDER BY seq"
+_GET_JOURNAL_LEN = "SELECT journal_len FROM sessions WHERE user = ? AND lesson_id = ?"
+_PUT_SESSION = "INSERT OR REPLACE INTO sessions (user, lesson_id, meta, journal_len) VALUES (?, ?, ?, 0)"
+_PUT_SNAPSHOT = "INSERT OR REPLACE INTO snapshots (user, lesson_id, binary, vfs) VALUES (?, ?, ?, ?)"
+_PUT_PROGRESS = ("INSERT OR REPLACE INTO progress (user, lesson_id, task_index, correct, attempts, updated) "
+                 "VALUES (?, ?, ?, ?, ?, ?)")
+_PUT_DELTA = "INSERT INTO journal (user, lesson_id, seq, delta) VALUES (?, ?, ?, ?)"
+_SET_JOURNAL_LEN = "UPDATE sessions SET journal_len = ? WHERE user = ? AND lesson_id = ?"
+_DELETE = tuple(f"DELETE FROM {t} WHERE user = ? AND lesson_id = ?"
+                for t in ("sessions", "progress", "snapshots", "journal"))
+_HAS_SAVE = "SELECT 1 FROM sessions WHERE user = ? AND lesson_id = ?"
+_LESSONS = "SELECT lesson_id FROM progress WHERE user = ? ORDER BY lesson_id"
+_PROGRESS = "SELECT lesson_id, task_index, correct, attempts, updated FROM progress WHERE user = ? ORDER BY lesson_id"
+
+
+def _dumps(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class SqliteStore:
+    """
+    Сохранения в базе path. Методы — как функции save.py, но ключ уже
+    разобран на (user, lesson_id); user "" — сохранения окна pywebview.
+    """
+
+    def __init__(self, path: Path, *, compact_every: int) -> None:
+        self.path = path
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # транзакции открываются явно (_tx), без неявных BEGIN модуля sqlite3
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        # другой процесс (второй сервер, окно) пишет — подождать, а не падать
+        self._db.execute("PRAGMA busy_timeout=5000")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            self._db.close()
+            raise ValueError(f"Unsupported save database version: {version}")
+        if version < SCHEMA_VERSION:
+            self._db.executescript(f"BEGIN IMMEDIATE;{_SCHEMA}PRAGMA user_version={SCHEMA_VERSION};COMMIT;")
+
+    @contextmanager
+    def _tx(self, begin: str = "BEGIN IMMEDIATE") -> Iterator[sqlite3.Connection]:
+        """Транзакция под замком: COMMIT, при исключении — ROLLBACK."""
+        with self._lock:
+            db = self._db
+            db.execute(begin)
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _write(self, db: sqlite3.Connection, user: str, lesson_id: str, data: dict) -> None:
+        meta = {k: v for k, v in data.items() if k not in ("vfs", "journal")}
+        vfs = data.get("vfs")
+        binary = isinstance(vfs, (bytes, bytearray, memoryview))
+        db.execute(_PUT_SESSION, (user, lesson_id, _dumps(meta)))
+        db.execute(_PUT_SNAPSHOT, (user, lesson_id, int(binary), vfs if binary else _dumps(vfs)))
+        db.execute(_DELETE[3], (user, lesson_id))
+        self._progress(db, user, lesson_id, data)
+
+    @staticmethod
+    def _progress(db: sqlite3.Connection, user: str, lesson_id: str, data: dict) -> None:
+        db.execute(_PUT_PROGRESS, (user, lesson_id, int(data.get("task_index", 0)), int(data.get("correct", 0)),
+                                   int(data.get("attempts", 0)), time.time()))
+
+    def load(self, user: str, lesson_id: str) -> dict | None:
+        """Снапшот + хвост журнала в data["journal"], как save.load_save."""
+        # снапшот и журнал — из одного состояния базы
+        with self._tx("BEGIN") as db:
+            row = db.execute(_GET_SAVE, (user, lesson_id)).fetchone()
+            if row is None:
+                return None
+            journal = [json.loads(d) for (d,) in db.execute(_GET_JOURNAL, (user, lesson_id))]
+        meta, binary, vfs = row
+        data = json.loads(meta)
+        # бинарный снапшот декодируется лениво (vfs_binary.load_into), как из mmap файла
+        data["vfs"] = vfs if binary else json.loads(vfs)
+        if journal:
+            data["journal"] = journal
+        return data
+
+    def write(self, user: str, lesson_id: str, data: dict) -> None:
+        """Полный снапшот; журнал после него начинается с нуля."""
+        with self._tx() as db:
+            self._write(db, user, lesson_id, data)
+
+    def append(self, user: str, lesson_id: str, delta: dict, snapshot: Callable[[], dict]) -> None:
+        """
+        Дельта одного submit и счётчики прогресса — одной транзакцией.
+        Сохранения ещё нет или журнал дорос до compact_every — вместо
+        дельты пишется snapshot() (в нём уже есть и эта дельта).
+        """
+        with self._tx() as db:
+            row = db.execute(_GET_JOURNAL_LEN, (user, lesson_id)).fetchone()
+            if row is None or row[0] + 1 >= self.compact_every:
+                self._write(db, user, lesson_id, snapshot())
+                return
+            n = row[0]
+            db.execute(_PUT_DELTA, (user, lesson_id, n, _dumps(delta)))
+            db.execute(_SET_JOURNAL_LEN, (n + 1, user, lesson_id))
+            self._progress(db, user, lesson_id, delta)
+
+    def delete(self, user: str, lesson_id: str) -> None:
+        with self._tx() as db:
+            for sql in _DELETE:
+                db.execute(sql, (user, lesson_id))
+
+    def has(self, user: str, lesson_id: str) -> bool:
+        with self._lock:
+            return self._db.execute(_HAS_SAVE, (user, lesson_id)).fetchone() is not None
+
+    def lessons(self, user: str) -> list[str]:
+        """Уроки user, у которых есть сохранение (по индексу progress)."""
+        with self._lock:
+            return [lesson_id for (lesson_id,) in self._db.execute(_LESSONS, (user,))]
+
+    def progress(self, user: str) -> dict[str, dict]:
+        """lesson_id -> {task_index, correct, attempts, updated} по всем урокам user."""
+        with self._lock:
+            rows = self._db.execute(_PROGRESS, (user,)).fetchall()
+        return {
+            lesson_id: {"task_index": i, "correct": correct, "attempts": attempts, "updated": updated}
+            for lesson_id, i, correct, attempts, updated in rows
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
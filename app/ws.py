@@ -0,0 +1,93 @@
+"""
+Минимальный WebSocket (RFC 6455) поверх asyncio-потоков: рукопожатие,
+кадры, склейка фрагментов, ping/pong, закрытие. Без расширений и
+подпротоколов — ровно то, что нужно app/server.py и bench/loadgen.py.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import struct
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MAX_MESSAGE = 1 << 20
+
+
+class WebSocketClosed(Exception):
+    pass
+
+
+def ws_accept(key: str) -> str:
+    return base64.b64encode(hashlib.sha1(key.encode("ascii") + _WS_GUID).digest()).decode("ascii")
+
+
+def _mask(data: bytes, mask: bytes) -> bytes:
+    # XOR целиком как одно большое число — быстрее побайтового цикла
+    n = len(data)
+    if not n:
+        return data
+    key = (mask * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+def ws_frame(opcode: int, payload: bytes, *, mask: bool = False) -> bytes:
+    """Один кадр с FIN; клиент (mask=True) обязан маскировать, сервер — нет."""
+    n = len(payload)
+    head = bytes([0x80 | opcode])
+    bit = 0x80 if mask else 0
+    if n < 126:
+        head += bytes([bit | n])
+    elif n < 1 << 16:
+        head += bytes([bit | 126]) + struct.pack("!H", n)
+    else:
+        head += bytes([bit | 127]) + struct.pack("!Q", n)
+    if mask:
+        key = os.urandom(4)
+        return head + key + _mask(payload, key)
+    return head + payload
+
+
+async def ws_read(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> tuple[int, bytes]:
+    """
+    Следующее сообщение (opcode, данные), фрагменты склеены; ping отвечается
+    сам. Закрытие соединения — WebSocketClosed.
+    """
+    opcode = None
+    parts: list[bytes] = []
+    size = 0
+    while True:
+        try:
+            b0, b1 = await reader.readexactly(2)
+            n = b1 & 0x7F
+            if n == 126:
+                (n,) = struct.unpack("!H", await reader.readexactly(2))
+            elif n == 127:
+                (n,) = struct.unpack("!Q", await reader.readexactly(8))
+            key = await reader.readexactly(4) if b1 & 0x80 else b""
+            if size + n > MAX_MESSAGE:
+                writer.write(ws_frame(OP_CLOSE, struct.pack("!H", 1009)))
+                raise WebSocketClosed()
+            data = await reader.readexactly(n)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            raise WebSocketClosed() from e
+        if key:
+            data = _mask(data, key)
+        op = b0 & 0x0F
+        if op == OP_PING:
+            writer.write(ws_frame(OP_PONG, data))
+            continue
+        if op == OP_PONG:
+            continue
+        if op == OP_CLOSE:
+            writer.write(ws_frame(OP_CLOSE, data[:2]))
+            raise WebSocketClosed()
+        if op != OP_CONT:
+            opcode = op
+        parts.append(data)
+        size += n
+        if b0 & 0x80:
+            return opcode or OP_TEXT, b"".join(parts)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import random
+import time
+from collections import deque
+from typing import Callable
+
+
+def synthetic_tree(n_nodes: int, *, fanout: int = 8, files_per_dir: int = 4) -> tuple[dict, list[str]]:
+    """
+    Синтетическое дерево в формате VFS.to_dict() примерно из n_nodes узлов.
+    Строим в ширину: в каждой директории fanout поддиректорий и files_per_dir файлов.
+    Возвращает (дерево, список всех путей).
+    """
+    root: dict = {"name": "/", "kind": "dir", "children": {}}
+    paths: list[str] = []
+    queue: deque[tuple[str, dict]] = deque([("", root)])
+    count = 1
+    while queue and count < n_nodes:
+        prefix, d = queue.popleft()
+        for i in range(files_per_dir):
+            if count >= n_nodes:
+                break
+            name = f"f{i}.txt"
+            d["children"][name] = {"name": name, "kind": "file"}
+            paths.append(f"{prefix}/{name}")
+            count += 1
+        for i in range(fanout):
+            if count >= n_nodes:
+                break
+            name = f"d{i}"
+            child = {"name": name, "kind": "dir", "children": {}}
+            d["children"][name] = child
+            paths.append(f"{prefix}/{name}")
+            queue.append((f"{prefix}/{name}", child))
+            count += 1
+    return root, paths
+
+
+def sample_paths(paths: list[str], k: int, *, missing_ratio: float = 0.1, seed: int = 1) -> list[str]:
+    """
+    Выборка путей для поиска: в основном существующие, часть — несуществующие.
+    """
+    rnd = random.Random(seed)
+    out = [rnd.choice(paths) for _ in range(k)]
+    for i in range(int(k * missing_ratio)):
+        out[i] = out[i] + "/nope"
+    rnd.shuffle(out)
+    return out
+
+
+def best_of(fn: Callable[[], object], *, repeat: int = 5) -> float:
+    """
+    Лучшее время (в секундах) из repeat запусков fn().
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def fmt_us(seconds: float, ops: int = 1) -> str:
+    return f"{seconds / ops * 1e6:9.3f} µs"
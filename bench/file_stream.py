@@ -0,0 +1,88 @@
+"""
+Бенчмарк чтения больших файлов урока (ассетов): head / tail / wc / grep
+по логу в несколько МБ через run_line — время и пик выделенной памяти
+(tracemalloc). Ассет подключается ссылкой и читается кусками через mmap,
+так что память не должна расти вместе с размером файла.
+
+Запуск из корня репозитория:
+    python -m bench.file_stream
+    python -m bench.file_stream --sizes-mb 8 64
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from app.engine import filedata
+from app.engine.filedata import FileData
+from app.engine.parser import parse
+from app.engine.shell import run_line
+from app.engine.vfs import VFS
+from bench.common import best_of
+
+HOME = "/home/student"
+
+COMMANDS = [
+    "head -n 10 app.log",
+    "tail -n 10 app.log",
+    "wc -c app.log",
+    "wc -l app.log",
+    "grep ERROR app.log | head -n 5",
+    "grep -c ERROR app.log",  # ошибка флага: строка не должна ничего читать
+    "cat app.log > copy.log",
+]
+
+
+def write_log(path: str, size_mb: int) -> None:
+    line = 0
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as f:
+        while f.tell() < target:
+            block = "".join(
+                f"2024-05-01 12:{(i // 60) % 60:02d}:{i % 60:02d} {'ERROR' if i % 997 == 0 else 'INFO'} "
+                f"GET /api/items/{i} 200 {i % 350}ms\n"
+                for i in range(line, line + 10_000)
+            )
+            f.write(block)
+            line += 10_000
+
+
+def run(size_mb: int, assets: str) -> None:
+    name = f"bench_{size_mb}mb.log"
+    write_log(os.path.join(assets, name), size_mb)
+    vfs = VFS(indexed=True)
+    vfs.seed_basic_home(HOME)
+    vfs.write_file(f"{HOME}/app.log", FileData.from_asset(name))
+
+    print(f"\n{size_mb} MB log:")
+    for cmd in COMMANDS:
+        line = parse(cmd)
+
+        def go() -> None:
+            for _ in run_line(line, cwd=HOME, home=HOME, vfs=vfs).stdout():
+                pass
+
+        t = best_of(go, repeat=3)
+        tracemalloc.start()
+        go()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {cmd:<32}{t * 1e3:>10.2f} ms   peak {peak / 1024:>8.0f} KiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes-mb", type=int, nargs="+", default=[8, 64])
+    ns = ap.parse_args()
+    with tempfile.TemporaryDirectory() as assets:
+        filedata.ASSETS_DIR = assets
+        for size in ns.sizes_mb:
+            run(size, assets)
+        filedata.close_assets()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Бенчмарк раскрытия шаблонов путей (app/engine/expand.py) на глубоких деревьях
+против наивного варианта: обход всех узлов и fnmatch по полному пути каждого.
+
+Запуск из корня репозитория:
+    python -m bench.glob_expand
+    python -m bench.glob_expand --sizes 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import re
+
+from app.engine.expand import compile_glob, glob
+from app.engine.vfs import VFS, Node
+from bench.common import best_of, synthetic_tree
+
+PATTERNS = [
+    "**/f1.txt",
+    "d0/d1/**/*.txt",
+    "**/d2/d0/f?.txt",
+    "d1/*/d0/*",
+    "d[01]/d[01]/d[01]/**",
+]
+
+
+def naive(vfs: VFS, pattern: str) -> list[str]:
+    # "как без движка": обойти всё дерево и fnmatch'ем проверить полный путь каждого узла
+    rx = re.compile(fnmatch.translate(pattern.replace("**/", "*").replace("**", "*")))
+    out: list[str] = []
+
+    def walk(node: Node, rel: str) -> None:
+        for name, c in (node.children or {}).items():
+            p = rel + name
+            if rx.match(p):
+                out.append(p)
+            if c.kind == "dir":
+                walk(c, p + "/")
+
+    walk(vfs.root, "")
+    return sorted(out)
+
+
+def run(size: int) -> None:
+    tree, paths = synthetic_tree(size, fanout=3, files_per_dir=3)
+    vfs = VFS(indexed=True)
+    vfs.from_dict(tree)
+    depth = max(p.count("/") for p in paths)
+
+    print(f"\n{size} nodes, depth {depth}:")
+    print(f"  {'pattern':<24}{'matches':>9}{'glob':>12}{'naive':>12}")
+    for pat in PATTERNS:
+        n = len(glob(pat, cwd="/", home="/", vfs=vfs))
+        t_glob = best_of(lambda: glob(pat, cwd="/", home="/", vfs=vfs), repeat=3)
+        t_naive = best_of(lambda: naive(vfs, pat), repeat=3)
+        print(f"  {pat:<24}{n:>9}{t_glob * 1e3:>10.2f}ms{t_naive * 1e3:>10.2f}ms")
+
+    compile_glob.cache_clear()
+    cold = best_of(lambda: [compile_glob.__wrapped__(p) for p in PATTERNS], repeat=3)
+    warm = best_of(lambda: [compile_glob(p) for p in PATTERNS], repeat=3)
+    print(f"  compile x{len(PATTERNS)}: cold {cold * 1e6:.1f} µs, LRU {warm * 1e6:.1f} µs")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ns = ap.parse_args()
+    for size in ns.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
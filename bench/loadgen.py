@@ -0,0 +1,189 @@
+"""
+Нагрузка на серверный режим (app/server.py): N учеников одновременно
+шлют команды по WebSocket; меряем submit/с и задержку (p50/p95/p99)
+от отправки submit_command до ответа.
+
+По умолчанию поднимает сервер сам (подпроцесс, временный каталог
+сохранений, свободный порт); --url — бить в уже запущенный.
+
+Запуск из корня репозитория:
+    python -m bench.loadgen --sessions 200 --duration 10
+    python -m bench.loadgen --sessions 300 --max-sessions 100     # с вытеснением
+    python -m bench.loadgen --sessions 50 --think 200             # пауза 200 мс между командами
+    python -m bench.loadgen --url ws://127.0.0.1:8080 --sessions 100
+
+Клиенты и сервер делят одну машину: на малом числе ядер клиент
+заметно съедает часть пропускной способности.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+from app.ws import OP_TEXT, ws_frame, ws_read
+
+# то, что ученик делает в 01_paths: навигация, ошибки, вывод
+SCRIPT = ["pwd", "ls", "cd projects", "ls -l", "cd ..", "cd /nope", "pwd", "ls projects", "mkdir tmp", "cd ~"]
+
+
+class Client:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self._id = 0
+
+    @classmethod
+    async def connect(cls, url: str, user: str) -> "Client":
+        u = urlsplit(url)
+        reader, writer = await asyncio.open_connection(u.hostname, u.port or 80)
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        writer.write(
+            f"GET /ws?user={user} HTTP/1.1\r\nHost: {u.netloc}\r\nUpgrade: websocket\r\n"
+            f"Connection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode("latin-1")
+        )
+        head = await reader.readuntil(b"\r\n\r\n")
+        if not head.startswith(b"HTTP/1.1 101"):
+            raise RuntimeError(head.decode("latin-1").splitlines()[0])
+        return cls(reader, writer)
+
+    async def call(self, method: str, *args) -> dict:
+        self._id += 1
+        self.writer.write(ws_frame(OP_TEXT, json.dumps({"id": self._id, "method": method, "args": list(args)}).encode(), mask=True))
+        await self.writer.drain()
+        _, data = await ws_read(self.reader, self.writer)
+        msg = json.loads(data)
+        if "error" in msg:
+            raise RuntimeError(msg["error"])
+        return msg["result"]
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def student(url: str, user: str, deadline: float, think: float, latencies: list[float], errors: list[str]) -> None:
+    try:
+        c = await Client.connect(url, user)
+        await c.call("start_new", "01_paths")
+    except Exception as e:  # сервер не принял соединение
+        errors.append(f"{user}: {e}")
+        return
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            res = await c.call("submit_command", SCRIPT[i % len(SCRIPT)])
+            if not res["output"]["done"]:
+                await c.call("close_output", res["output"]["handle"])
+            latencies.append(time.perf_counter() - t0)
+            i += 1
+            if think:
+                await asyncio.sleep(think)
+    except Exception as e:
+        errors.append(f"{user}: {e}")
+    finally:
+        c.close()
+
+
+async def run(url: str, sessions: int, duration: float, think: float, ramp: float) -> tuple[list[float], list[str], float]:
+    latencies: list[float] = []
+    errors: list[str] = []
+    start = time.perf_counter()
+    deadline = start + ramp + duration
+    tasks = []
+    for n in range(sessions):
+        tasks.append(asyncio.create_task(student(url, f"load{n}", deadline, think, latencies, errors)))
+        if ramp:
+            await asyncio.sleep(ramp / sessions)
+    await asyncio.gather(*tasks)
+    return latencies, errors, time.perf_counter() - start
+
+
+def _pct(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_up(url: str, timeout: float = 15.0) -> None:
+    u = urlsplit(url)
+    end = time.perf_counter() + timeout
+    while True:
+        try:
+            with socket.create_connection((u.hostname, u.port), timeout=0.5):
+                return
+        except OSError:
+            if time.perf_counter() > end:
+                raise
+            time.sleep(0.1)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=100, help="одновременных учеников")
+    ap.add_argument("--duration", type=float, default=10.0, help="секунд нагрузки")
+    ap.add_argument("--think", type=float, default=0.0, help="пауза между командами ученика, мс")
+    ap.add_argument("--ramp", type=float, default=1.0, help="за сколько секунд подключить всех")
+    ap.add_argument("--url", default=None, help="ws://host:port уже запущенного сервера")
+    ap.add_argument("--max-sessions", type=int, default=None, help="передать серверу (вытеснение)")
+    ap.add_argument("--max-memory", type=int, default=None, help="передать серверу, МБ")
+    ns = ap.parse_args()
+
+    proc = None
+    tmp = None
+    url = ns.url
+    if url is None:
+        tmp = tempfile.TemporaryDirectory()
+        port = _free_port()
+        cmd = [sys.executable, "-m", "app.server", "--port", str(port), "--save-dir", tmp.name]
+        if ns.max_sessions:
+            cmd += ["--max-sessions", str(ns.max_sessions)]
+        if ns.max_memory:
+            cmd += ["--max-memory", str(ns.max_memory)]
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, cwd=tmp.name,
+                                env={**os.environ, "PYTHONPATH": os.getcwd()})
+        url = f"ws://127.0.0.1:{port}"
+        _wait_up(url)
+
+    try:
+        latencies, errors, wall = asyncio.run(run(url, ns.sessions, ns.duration, ns.think / 1000, ns.ramp))
+        u = urlsplit(url)
+        with urllib.request.urlopen(f"http://{u.netloc}/stats", timeout=5) as r:
+            stats = json.load(r)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        if tmp is not None:
+            tmp.cleanup()
+
+    latencies.sort()
+    print(f"sessions: {ns.sessions}, think: {ns.think:g} ms, wall: {wall:.1f} s")
+    print(f"submits: {len(latencies)}  ({len(latencies) / ns.duration:.0f} submits/s over {ns.duration:g} s)")
+    print(f"latency ms: p50 {_pct(latencies, 0.50) * 1e3:.2f}  p95 {_pct(latencies, 0.95) * 1e3:.2f}  "
+          f"p99 {_pct(latencies, 0.99) * 1e3:.2f}  max {(latencies[-1] if latencies else 0) * 1e3:.2f}")
+    print("server: " + ", ".join(f"{k}={v}" for k, v in stats.items() if k != "metrics"))
+    if errors:
+        print(f"{len(errors)} client error(s), first: {errors[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
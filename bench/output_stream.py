@@ -0,0 +1,80 @@
+"""
+Бенчмарк вывода больших результатов в UI: весь stdout одним списком
+(как раньше уходило через мост pywebview) против OutputStream —
+время до первого куска и пик выделенной памяти (tracemalloc).
+
+Запуск из корня репозитория:
+    python -m bench.output_stream
+    python -m bench.output_stream --lines 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+from app.engine.filedata import FileData
+from app.engine.output import OutputStream
+from app.engine.parser import parse
+from app.engine.shell import run_line
+from app.engine.vfs import VFS
+
+HOME = "/home/student"
+
+
+def make_vfs(n_lines: int) -> VFS:
+    vfs = VFS(indexed=True)
+    vfs.seed_basic_home(HOME)
+    text = "".join(f"{i:08d} INFO worker-{i % 16} processed batch {i}\n" for i in range(n_lines))
+    vfs.write_file(f"{HOME}/big.log", FileData.from_text(text))
+    return vfs
+
+
+def measure(fn) -> tuple[float, float, int]:
+    """(время до первого куска, общее время, пик памяти)."""
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    first = None
+    for _ in fn():
+        if first is None:
+            first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first or total, total, peak
+
+
+def run(n_lines: int) -> None:
+    vfs = make_vfs(n_lines)
+    line = parse("cat big.log")
+
+    def whole():
+        # старый путь: список всех строк, потом один JSON-ответ
+        yield list(run_line(line, cwd=HOME, home=HOME, vfs=vfs).stdout())
+
+    def chunked():
+        out = OutputStream(run_line(line, cwd=HOME, home=HOME, vfs=vfs).stdout())
+        while True:
+            chunk = out.chunk_dict()
+            yield chunk["lines"]
+            if chunk["done"]:
+                break
+
+    print(f"\ncat of {n_lines} lines:")
+    for label, fn in (("list", whole), ("chunks", chunked)):
+        first, total, peak = measure(fn)
+        print(f"  {label:<7} first chunk {first * 1e3:>9.2f} ms   all {total * 1e3:>9.2f} ms"
+              f"   peak {peak / 1024:>9.0f} KiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--lines", type=int, nargs="+", default=[100_000, 1_000_000])
+    ns = ap.parse_args()
+    for n in ns.lines:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
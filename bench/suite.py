@@ -0,0 +1,573 @@
+"""
+Набор бенчмарков горячих путей движка с сохранённым baseline.
+
+Покрывает: Session.submit целиком, check_command и check_asserts,
+exec_command для каждой команды из COMMANDS, stat/ensure_dir/touch/list_dir
+VFS на синтетических деревьях растущего размера, to_dict/from_dict,
+write_save/load_save/append_save и прогресс по всем урокам (файлы и SQLite),
+Tab-дополнение и поиск по истории (Ctrl-R).
+Работает без pywebview.
+
+У части случаев есть абсолютный бюджет (Case.budget_us, например
+дополнение — 2 мс на нажатие Tab в директории на 50k имён): он
+проверяется и без baseline, превышение — OVER BUDGET.
+
+Запуск из корня репозитория:
+    python -m bench.suite                     # прогон + сравнение с bench/baseline.json
+    python -m bench.suite --filter vfs.       # только часть случаев
+    python -m bench.suite --save-baseline     # записать новый baseline
+    python -m bench.suite --threshold 0.25    # регрессия — медленнее baseline больше чем на 25%
+
+Код выхода 1, если есть регрессии относительно baseline или превышен бюджет.
+Baseline зависит от машины: сравнивать имеет смысл прогоны на одной.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable
+
+from app.engine.asserts import check_asserts, compile_asserts
+from app.engine.checker import check_command, compile_rule
+from app.engine.complete import complete
+from app.engine.filedata import FileData
+from app.engine.history import MAX_HISTORY, CommandHistory
+from app.engine.session import Session
+from app.engine.shell import COMMANDS, exec_command
+from app.engine.vfs import VFS, FrozenNode, freeze
+from bench.common import sample_paths, synthetic_tree
+
+BASELINE = Path(__file__).with_name("baseline.json")
+HOME = "/home/student"
+SIZES = (1_000, 10_000, 100_000)
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str
+    # вызывается перед каждым повтором (не замеряется) и возвращает замеряемую функцию
+    setup: Callable[[], Callable[[], object]]
+    ops: int
+    # предел µs/op независимо от baseline (задержка, которую видит пользователь)
+    budget_us: float | None = None
+
+
+CASES: list[Case] = []
+
+
+def case(name: str, ops: int = 1, budget_us: float | None = None
+         ) -> Callable[[Callable[[], Callable[[], object]]], Callable[[], Callable[[], object]]]:
+    def deco(setup: Callable[[], Callable[[], object]]) -> Callable[[], Callable[[], object]]:
+        CASES.append(Case(name, setup, ops, budget_us))
+        return setup
+    return deco
+
+
+def _drain(lines) -> None:
+    for _ in lines:
+        pass
+
+
+def _home_vfs() -> VFS:
+    """Домашняя директория с файлами для команд чтения и поддеревом для find."""
+    vfs = VFS(indexed=True)
+    vfs.seed_basic_home(HOME)
+    log = "".join(f"2024-05-01 12:00:{i % 60:02d} {'ERROR' if i % 50 == 0 else 'INFO'} job {i}\n" for i in range(1000))
+    vfs.write_file(f"{HOME}/notes.txt", FileData.from_text(log))
+    for i in range(200):
+        vfs.ensure_file(f"{HOME}/projects/p{i % 20}/src/file{i}.txt")
+    return vfs
+
+
+# ---------- сессия и проверка ----------
+SCRIPT = ["pwd", "cd ..", "cd ~/projects", "ls -l", "mkdir logs", "touch logs/app.log",
+          "ls", "cd /nope", "echo hi | grep h", "pwd"]
+
+
+@case("session.submit", ops=len(SCRIPT))
+def _session_submit():
+    session = Session("01_paths")
+
+    def go() -> None:
+        for cmd in SCRIPT:
+            _drain(session.submit(cmd)["stdout"])
+    return go
+
+
+_RULE = compile_rule({
+    "kind": "goal",
+    "allowed_cmds": ["cd", "ls", "grep", "pwd"],
+    "expected_cmd": "ls",
+    "assert": [{"type": "cwd_is", "value": HOME}, {"type": "last_cmd_is", "value": "grep"}],
+})
+
+
+@case("check_command", ops=1000)
+def _check_command():
+    vfs = _home_vfs()
+
+    def go() -> None:
+        for _ in range(1000):
+            _, _, effects = check_command(user_input="ls -l | grep txt", rule=_RULE, cwd=HOME, home=HOME, vfs=vfs)
+            _drain(effects.get("stdout", ()))
+    return go
+
+
+@case("check_asserts", ops=1000)
+def _check_asserts():
+    tree, _ = synthetic_tree(10_000)
+    vfs = VFS(indexed=True)
+    vfs.from_dict(tree)
+    asserts = compile_asserts([
+        {"type": "exists_dir", "path": "/d1/d2"},
+        {"type": "exists_file", "path": "/d1/d2/f0.txt"},
+        {"type": "cwd_is", "value": "/d1"},
+        {"type": "last_cmd_is", "value": "touch"},
+        {"type": "has_flag", "value": "-p"},
+    ])
+
+    def go() -> None:
+        for _ in range(1000):
+            check_asserts(asserts, cwd="/d1", vfs=vfs, last_cmd="touch", last_args=["-p", "x"])
+    return go
+
+
+# ---------- команды ----------
+# аргументы для замера каждой команды (cwd = HOME, см. _home_vfs);
+# у новой команды должен появиться пример здесь или свой случай exec.<имя>
+COMMAND_ARGS: dict[str, list[str]] = {
+    "pwd": [],
+    "ls": ["-l"],
+    "cd": ["projects"],
+    "mkdir": ["-p", "projects/a/b"],
+    "touch": ["readme.txt"],
+    "find": [".", "-name", "*.txt"],
+    "echo": ["hello", "world"],
+    "cat": ["notes.txt"],
+    "less": ["notes.txt"],
+    "more": ["notes.txt"],
+    "grep": ["ERROR", "notes.txt"],
+    "head": ["-n", "5", "notes.txt"],
+    "tail": ["-n", "5", "notes.txt"],
+    "wc": ["notes.txt"],
+}
+
+
+def _exec_case(cmd: str, args: list[str]) -> Callable[[], Callable[[], object]]:
+    def setup():
+        vfs = _home_vfs()
+
+        def go() -> None:
+            for _ in range(100):
+                _drain(exec_command(cmd=cmd, args=list(args), cwd=HOME, home=HOME, vfs=vfs).stdout_lines)
+        return go
+    return setup
+
+
+for _cmd, _args in COMMAND_ARGS.items():
+    case(f"exec.{_cmd}", ops=100)(_exec_case(_cmd, _args))
+
+
+@case("exec.rm", ops=200)
+def _exec_rm():
+    vfs = _home_vfs()
+    for i in range(200):
+        vfs.ensure_file(f"{HOME}/tmp/f{i}")
+
+    def go() -> None:
+        for i in range(200):
+            exec_command(cmd="rm", args=[f"tmp/f{i}"], cwd=HOME, home=HOME, vfs=vfs)
+    return go
+
+
+# ---------- VFS ----------
+def _size_label(n: int) -> str:
+    return f"{n // 1000}k"
+
+
+def _tree_vfs(size: int) -> tuple[VFS, list[str]]:
+    tree, paths = synthetic_tree(size)
+    vfs = VFS(indexed=True)
+    vfs.from_dict(tree)
+    return vfs, paths
+
+
+def _vfs_cases(size: int) -> None:
+    label = _size_label(size)
+    fresh = itertools.count()
+
+    @case(f"vfs.stat[{label}]", ops=10_000)
+    def _stat():
+        vfs, paths = _tree_vfs(size)
+        probe = sample_paths(paths, 10_000)
+
+        def go() -> None:
+            for p in probe:
+                vfs.stat(p)
+        return go
+
+    @case(f"vfs.ensure_dir[{label}]", ops=1000)
+    def _mkdir():
+        vfs, paths = _tree_vfs(size)
+        k = next(fresh)
+        targets = [f"{p}/new{k}" for p in sample_paths(paths, 1000, missing_ratio=0)]
+
+        def go() -> None:
+            for t in targets:
+                try:
+                    vfs.ensure_dir(t)
+                except ValueError:  # путь через файл
+                    pass
+        return go
+
+    @case(f"vfs.touch[{label}]", ops=1000)
+    def _touch():
+        vfs, _ = _tree_vfs(size)
+        k = next(fresh)
+
+        def go() -> None:
+            for i in range(1000):
+                vfs.touch(f"/d{i % 8}/touched{k}_{i}.txt")
+        return go
+
+    @case(f"vfs.list_dir[{label}]", ops=1000)
+    def _list_dir():
+        vfs, paths = _tree_vfs(size)
+        dirs = [p for p in paths if vfs.stat(p) == "dir"][:1000] or ["/"]
+
+        def go() -> None:
+            for i in range(1000):
+                vfs.list_dir(dirs[i % len(dirs)])
+        return go
+
+    @case(f"vfs.to_dict[{label}]")
+    def _to_dict():
+        vfs, _ = _tree_vfs(size)
+        return vfs.to_dict
+
+    @case(f"vfs.from_dict[{label}]")
+    def _from_dict():
+        tree, _ = synthetic_tree(size)
+        return lambda: VFS(indexed=True).from_dict(tree)
+
+
+for _size in SIZES:
+    _vfs_cases(_size)
+
+
+# ---------- сохранения ----------
+def _save_cases(size: int) -> None:
+    from app.storage import save
+
+    label = _size_label(size)
+
+    def session_data(binary: bool) -> dict:
+        s = Session("01_paths")
+        tree, _ = synthetic_tree(size)
+        s.vfs.from_dict(tree)
+        return s.to_dict(binary_vfs=binary)
+
+    @case(f"save.write_save[{label}]")
+    def _write():
+        data = session_data(True)
+        return lambda: save.write_save("bench", data)
+
+    @case(f"save.load_save[{label}]")
+    def _load():
+        save.write_save("bench", session_data(True))
+        return lambda: Session("01_paths").from_dict(save.load_save("bench"))
+
+
+for _size in SIZES:
+    _save_cases(_size)
+
+
+def _sqlite_store():
+    """База сохранений в SAVE_DIR прогона (в обход save.BACKEND)."""
+    from app.storage import save
+    from app.storage.sqlite_store import SqliteStore
+
+    return SqliteStore(save.SAVE_DIR / save.SQLITE_NAME, compact_every=save.JOURNAL_COMPACT_EVERY)
+
+
+def _sqlite_save_cases(size: int) -> None:
+    label = _size_label(size)
+
+    def session_data() -> dict:
+        s = Session("01_paths")
+        tree, _ = synthetic_tree(size)
+        s.vfs.from_dict(tree)
+        return s.to_dict(binary_vfs=True)
+
+    @case(f"save.sqlite.write_save[{label}]")
+    def _write():
+        data = session_data()
+        db = _sqlite_store()
+        return lambda: db.write("", "bench", data)
+
+    @case(f"save.sqlite.load_save[{label}]")
+    def _load():
+        db = _sqlite_store()
+        db.write("", "bench", session_data())
+        return lambda: Session("01_paths").from_dict(db.load("", "bench"))
+
+
+for _size in SIZES:
+    _sqlite_save_cases(_size)
+
+# запись журнала на submit: дельта и счётчики
+APPENDS = 100
+
+
+def _append_delta(i: int) -> dict:
+    return {"task_index": 0, "attempts": i, "correct": 0, "cwd": f"/home/student/d{i}",
+            "vfs": [["mkdir", f"/home/student/d{i}"]], "history": [f"mkdir d{i}"]}
+
+
+@case("save.append_save", ops=APPENDS)
+def _append_files():
+    from app.storage import save
+
+    save.write_save("bench", Session("01_paths").to_dict(binary_vfs=True))
+
+    def go() -> None:
+        for i in range(APPENDS):
+            save.append_save("bench", _append_delta(i), dict)
+    return go
+
+
+@case("save.sqlite.append_save", ops=APPENDS)
+def _append_sqlite():
+    db = _sqlite_store()
+    db.write("", "bench", Session("01_paths").to_dict(binary_vfs=True))
+
+    def go() -> None:
+        for i in range(APPENDS):
+            db.append("", "bench", _append_delta(i), dict)
+    return go
+
+
+# прогресс ученика по всем урокам среди сохранений всего класса
+CLASS_USERS = 300
+
+
+def _fill_class(write: Callable[[str, str, dict], None]) -> None:
+    data = Session("01_paths").to_dict(binary_vfs=True)
+    for u in range(CLASS_USERS):
+        for lesson_id in ("01_paths", "02_files"):
+            write(f"u{u}", lesson_id, data)
+
+
+@case("save.progress[class]")
+def _progress_files():
+    from app.storage import save
+
+    if not (save.SAVE_DIR / "save_u0__01_paths.bin").exists():
+        _fill_class(lambda user, lesson_id, data: save.write_save(f"{user}__{lesson_id}", data))
+    return lambda: save.saved_progress("u7")
+
+
+@case("save.sqlite.progress[class]")
+def _progress_sqlite():
+    db = _sqlite_store()
+    if not db.has("u0", "01_paths"):
+        _fill_class(db.write)
+    return lambda: db.progress("u7")
+
+
+# ---------- Tab-дополнение ----------
+BIG_DIR = 50_000
+
+
+@lru_cache(maxsize=None)
+def _big_base() -> FrozenNode:
+    """Общее дерево урока с директорией /data/big на BIG_DIR файлов и домом."""
+    vfs = VFS()
+    vfs.seed_basic_home(HOME)
+    for i in range(BIG_DIR):
+        vfs.touch(f"/data/big/file{i:05d}.txt")
+    vfs.ensure_dir("/data/big/file_dir")
+    return freeze(vfs.root)
+
+
+_fresh_names = itertools.count()
+
+# список, общий префикс, единственный вариант, ~ и .., нет вариантов
+COMPLETE_LINES = ["ls /data/big/", "cat /data/big/file1", "cat /data/big/file12345",
+                  "cd ~/../../data/big/file_", "wc -l ../../data/big/x"]
+
+
+@case(f"complete.path[{_size_label(BIG_DIR)}]", ops=100 * len(COMPLETE_LINES), budget_us=2000)
+def _complete_path():
+    # свежая сессия на общем дереве: первый Tab тоже в замере
+    vfs = VFS(indexed=True, base=_big_base())
+
+    def go() -> None:
+        for _ in range(100):
+            for line in COMPLETE_LINES:
+                complete(line, len(line), commands=("cat", "cd", "ls", "wc"), vfs=vfs, cwd=HOME, home=HOME)
+    return go
+
+
+@case(f"complete.after_touch[{_size_label(BIG_DIR)}]", ops=200, budget_us=2000)
+def _complete_after_touch():
+    # файл в большой директории и сразу Tab: индекс имён не пересортировывается
+    vfs = VFS(indexed=True, base=_big_base())
+    k = next(_fresh_names)
+
+    def go() -> None:
+        for i in range(200):
+            vfs.touch(f"/data/big/new{k}_{i}")
+            complete("ls /data/big/new", 16, commands=("ls",), vfs=vfs, cwd=HOME, home=HOME)
+    return go
+
+
+@case("complete.command", ops=1000, budget_us=2000)
+def _complete_command():
+    session = Session("01_paths")
+
+    def go() -> None:
+        for _ in range(1000):
+            session.complete("ls | p", 6)
+    return go
+
+
+# ---------- история команд ----------
+@lru_cache(maxsize=None)
+def _full_history() -> CommandHistory:
+    """Полный буфер истории (MAX_HISTORY команд) с уже построенным индексом."""
+    h = CommandHistory()
+    verbs = ["ls -l", "cd ..", "cat notes.txt", "grep ERROR logs/app.log", "mkdir -p a/b", "find . -name '*.txt'"]
+    for i in range(MAX_HISTORY):
+        h.append(f"{verbs[i % len(verbs)]} # {i}")
+    h.search("warm")
+    return h
+
+
+# набор запроса по буквам, как в Ctrl-R: каждая буква — новый поиск
+HISTORY_QUERIES = ["g", "gr", "gre", "grep", "grep ", "grep E", "# 1234", "# 12345", "nothing here"]
+
+
+@case(f"history.search[{_size_label(MAX_HISTORY)}]", ops=100 * len(HISTORY_QUERIES), budget_us=2000)
+def _history_search():
+    h = _full_history()
+
+    def go() -> None:
+        for _ in range(100):
+            for q in HISTORY_QUERIES:
+                h.search(q)
+    return go
+
+
+# ---------- прогон ----------
+# быстрые случаи повторяются, пока замеры не наберут MIN_TIME секунд:
+# лучший из многих коротких прогонов заметно стабильнее лучшего из пяти;
+# MAX_WALL ограничивает время на случай вместе с setup (деревья на 100k)
+MIN_TIME = 0.3
+MAX_WALL = 3.0
+
+
+def run_case(c: Case, repeat: int) -> float:
+    """Лучшее время на операцию, в микросекундах."""
+    best = float("inf")
+    total = 0.0
+    n = 0
+    deadline = time.perf_counter() + MAX_WALL
+    while n < repeat or (total < MIN_TIME and time.perf_counter() < deadline):
+        fn = c.setup()
+        gc.collect()
+        gc.disable()  # как timeit: сборка мусора не попадает в замер
+        try:
+            t0 = time.perf_counter()
+            fn()
+            dt = time.perf_counter() - t0
+        finally:
+            gc.enable()
+        best = min(best, dt)
+        total += dt
+        n += 1
+    return best / c.ops * 1e6
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--filter", default="", help="только случаи, в имени которых есть подстрока")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--threshold", type=float, default=0.20, help="допуск замедления (доля)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="записать результаты как baseline")
+    ns = ap.parse_args()
+
+    missing = [c for c in COMMANDS if c not in COMMAND_ARGS and not any(x.name == f"exec.{c}" for x in CASES)]
+    if missing:
+        print(f"no benchmark for commands: {', '.join(missing)}", file=sys.stderr)
+        return 2
+
+    baseline: dict[str, float] = {}
+    if ns.baseline.exists() and not ns.save_baseline:
+        baseline = json.loads(ns.baseline.read_text(encoding="utf-8"))["results"]
+
+    from app.storage import save
+    results: dict[str, float] = {}
+    regressions: list[str] = []
+    over_budget: list[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        save.SAVE_DIR = Path(tmp)
+        print(f"{'case':<28}{'µs/op':>12}{'baseline':>12}{'change':>10}")
+        for c in CASES:
+            if ns.filter not in c.name:
+                continue
+            us = results[c.name] = run_case(c, ns.repeat)
+            budget = ""
+            if c.budget_us is not None and us > c.budget_us:
+                budget = f"  OVER BUDGET ({c.budget_us:g} µs)"
+                over_budget.append(c.name)
+            base = baseline.get(c.name)
+            if base is None:
+                print(f"{c.name:<28}{us:>12.2f}{'-':>12}{budget}")
+                continue
+            change = us / base - 1
+            flag = ""
+            if change > ns.threshold:
+                flag = "  REGRESSION"
+                regressions.append(c.name)
+            elif change < -ns.threshold:
+                flag = "  faster"
+            print(f"{c.name:<28}{us:>12.2f}{base:>12.2f}{change * 100:>+9.0f}%{flag}{budget}")
+        save.delete_save("bench")
+
+    if ns.save_baseline:
+        prev = json.loads(ns.baseline.read_text(encoding="utf-8"))["results"] if ns.baseline.exists() else {}
+        ns.baseline.write_text(json.dumps({
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "system": platform.system(),
+                "cpus": os.cpu_count(),
+                "date": time.strftime("%Y-%m-%d"),
+            },
+            # при --filter остальные случаи сохраняются как были
+            "results": {**prev, **{k: round(v, 3) for k, v in results.items()}},
+        }, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"\nbaseline written: {ns.baseline}")
+
+    if over_budget:
+        print(f"\n{len(over_budget)} case(s) over budget: {', '.join(over_budget)}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {ns.threshold:.0%}: {', '.join(regressions)}")
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
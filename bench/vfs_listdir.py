@@ -0,0 +1,71 @@
+"""
+Бенчмарк листинга больших директорий: ls -l "как было" (sorted + is_dir
+на каждого ребёнка от корня) против VFS.scandir с поддерживаемым индексом имён.
+
+Запуск из корня репозитория:
+    python -m bench.vfs_listdir
+    python -m bench.vfs_listdir --entries 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import posixpath
+
+from app.engine.shell import exec_command
+from app.engine.vfs import VFS
+from bench.common import best_of, fmt_us
+
+DIR = "/usr/share/lib/bin"
+
+
+def build(entries: int) -> VFS:
+    vfs = VFS(indexed=False)
+    vfs.ensure_dir(DIR)
+    for i in range(entries):
+        if i % 10 == 0:
+            vfs.ensure_dir(f"{DIR}/sub{i:06d}")
+        else:
+            vfs.ensure_file(f"{DIR}/tool{i:06d}")
+    return vfs
+
+
+def old_ls_l(vfs: VFS) -> list[str]:
+    n = vfs._walk(DIR)
+    names = sorted(n.children.keys())
+    return [("drwxr-xr-x  " if vfs.is_dir(posixpath.join(DIR, x)) else "-rw-r--r--  ") + x for x in names]
+
+
+def run(entries: int) -> None:
+    vfs = build(entries)
+    vfs.list_dir(DIR)  # первый листинг строит индекс имён
+
+    def new_ls_l() -> None:
+        list(exec_command(cmd="ls", args=["-l"], cwd=DIR, home="/home/student", vfs=vfs).stdout_lines)
+
+    rounds = itertools.count()
+
+    def insert_100() -> None:
+        k = next(rounds)
+        for i in range(100):
+            vfs.ensure_file(f"{DIR}/zz_new_{k}_{i}")
+
+    assert old_ls_l(vfs) == list(exec_command(cmd="ls", args=["-l"], cwd=DIR, home="/", vfs=vfs).stdout_lines)
+
+    print(f"\n{entries} entries in {DIR}:")
+    print(f"  {'old ls -l':<26}{fmt_us(best_of(lambda: old_ls_l(vfs)))}")
+    print(f"  {'ls -l via scandir':<26}{fmt_us(best_of(new_ls_l))}")
+    print(f"  {'touch into sorted dir':<26}{fmt_us(best_of(insert_100), 100)} per file")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--entries", type=int, nargs="+", default=[10_000, 100_000])
+    ns = ap.parse_args()
+    for entries in ns.entries:
+        run(entries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Бенчмарк поиска путей в VFS: обход от корня против плоского индекса (indexed=True).
+
+Запуск из корня репозитория:
+    python -m bench.vfs_lookup
+    python -m bench.vfs_lookup --sizes 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from app.engine.vfs import VFS
+from bench.common import best_of, fmt_us, sample_paths, synthetic_tree
+
+
+def run(size: int, lookups: int) -> None:
+    tree, paths = synthetic_tree(size)
+    probe = sample_paths(paths, lookups)
+
+    walker = VFS()
+    walker.from_dict(tree)
+    indexed = VFS(indexed=True)
+    indexed.from_dict(tree)
+
+    def exists_is_dir(vfs: VFS) -> None:
+        # как было в cd / exists_dir: два обхода подряд
+        for p in probe:
+            vfs.exists(p) and vfs.is_dir(p)
+
+    def stat(vfs: VFS) -> None:
+        for p in probe:
+            vfs.stat(p)
+
+    rows = [
+        ("walk  exists+is_dir", best_of(lambda: exists_is_dir(walker))),
+        ("walk  stat", best_of(lambda: stat(walker))),
+        ("index exists+is_dir", best_of(lambda: exists_is_dir(indexed))),
+        ("index stat", best_of(lambda: stat(indexed))),
+    ]
+    print(f"\n{size} nodes, {lookups} lookups (per lookup):")
+    for name, t in rows:
+        print(f"  {name:<22}{fmt_us(t, lookups)}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--lookups", type=int, default=20_000)
+    ns = ap.parse_args()
+    for size in ns.sizes:
+        run(size, ns.lookups)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Бенчмарк ленивых точек монтирования (app/engine/mounts.py): большое
+дерево урока, построенное целиком, против смонтированного генератором —
+время старта, первое обращение вглубь и размер сохранения после
+небольшой прогулки по дереву.
+
+Запуск из корня репозитория:
+    python -m bench.vfs_mounts
+    python -m bench.vfs_mounts --depths 3 4 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.engine import vfs_binary
+from app.engine.mounts import GeneratorSource
+from app.engine.vfs import VFS
+from bench.common import best_of
+
+FANOUT = 10
+FILES = 4
+
+
+def eager(depth: int) -> VFS:
+    # то, что пришлось бы делать без mount: все узлы сразу
+    src = GeneratorSource("synthetic", {"fanout": FANOUT, "files": FILES, "depth": depth})
+    vfs = VFS(indexed=True)
+    stack = [("/data", "")]
+    vfs.ensure_dir("/data")
+    while stack:
+        path, rel = stack.pop()
+        for name, kind, _ in src.entries(rel):
+            if kind == "dir":
+                vfs.ensure_dir(f"{path}/{name}")
+                stack.append((f"{path}/{name}", f"{rel}/{name}" if rel else name))
+            else:
+                vfs.ensure_file(f"{path}/{name}")
+    return vfs
+
+
+def mounted(depth: int) -> VFS:
+    vfs = VFS(indexed=True)
+    vfs.mount("/data", GeneratorSource("synthetic", {"fanout": FANOUT, "files": FILES, "depth": depth}))
+    return vfs
+
+
+def explore(vfs: VFS, depth: int) -> None:
+    # "студент заглянул" в пару директорий и создал файл
+    deep = "/data/" + "/".join(["d1"] * depth)
+    vfs.list_dir(deep)
+    vfs.list_dir("/data/d2")
+    vfs.ensure_file(deep + "/notes.txt")
+
+
+def run(depth: int) -> None:
+    n_nodes = sum(FANOUT ** level * (FILES + (FANOUT if level < depth else 0)) for level in range(depth + 1))
+    deep = "/data/" + "/".join(["d3"] * depth) + "/f2.txt"
+    print(f"\ndepth {depth}, ~{n_nodes} nodes:")
+
+    for label, build in (("eager", eager), ("mount", mounted)):
+        t_build = best_of(lambda: build(depth), repeat=3)
+        vfs = build(depth)
+        t_first = best_of(lambda: vfs.is_file(deep), repeat=1)
+        explore(vfs, depth)
+        size_json = len(json.dumps(vfs.to_dict(), separators=(",", ":")))
+        size_bin = len(vfs_binary.dump(vfs))
+        print(f"  {label:<6} start {t_build * 1e3:>9.2f} ms   first deep stat {t_first * 1e6:>8.1f} µs"
+              f"   save json {size_json / 1024:>8.1f} KiB   bin {size_bin / 1024:>8.1f} KiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--depths", type=int, nargs="+", default=[3, 4])
+    ns = ap.parse_args()
+    for depth in ns.depths:
+        run(depth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Бенчмарк общего дерева урока (VFS(base=...), vfs.FrozenNode): память
+и время старта на сессию, когда каждая сессия строит своё дерево,
+против копии-при-записи одного замороженного дерева на всех.
+
+Каждая сессия делает то же, что ученик за урок: пару директорий,
+файл, запись в файл урока и удаление.
+
+Запуск из корня репозитория:
+    python -m bench.vfs_overlay
+    python -m bench.vfs_overlay --sessions 200 --nodes 1000 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from app.engine import vfs_binary
+from app.engine.filedata import FileData
+from app.engine.vfs import VFS, freeze
+from bench.common import best_of
+
+FANOUT = 10
+
+
+def build(vfs: VFS, nodes: int) -> None:
+    # стартовое дерево урока: директории по FANOUT файлов с текстом
+    for i in range(nodes // (FANOUT + 1)):
+        d = f"/lesson/d{i // FANOUT}/s{i % FANOUT}"
+        vfs.ensure_dir(d)
+        for j in range(FANOUT):
+            vfs.write_file(f"{d}/f{j}.txt", FileData.from_text(f"line {i} {j}\n"))
+
+
+def student(vfs: VFS) -> None:
+    vfs.ensure_dir("/lesson/d0/s1/new/deep")
+    vfs.touch("/lesson/d0/s1/new/deep/notes.txt")
+    vfs.write_file("/lesson/d1/s2/f3.txt", FileData.from_text("edited\n"), append=True)
+    vfs.remove("/lesson/d2/s0")
+
+
+def sessions_mem(make, n: int) -> float:
+    """Байт на сессию (tracemalloc), общее дерево уже построено."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    keep = [make() for _ in range(n)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del keep
+    return (after - before) / n
+
+
+def run(nodes: int, sessions: int) -> None:
+    shared = VFS()
+    build(shared, nodes)
+    base = freeze(shared.root)
+
+    def own() -> VFS:
+        v = VFS(indexed=True)
+        build(v, nodes)
+        student(v)
+        return v
+
+    def overlay() -> VFS:
+        v = VFS(indexed=True, base=base)
+        student(v)
+        return v
+
+    print(f"\n~{nodes} nodes, {sessions} sessions:")
+    for label, make in (("own", own), ("base", overlay)):
+        t = best_of(make, repeat=3)
+        mem = sessions_mem(make, sessions)
+        v = make()
+        size_json = len(json.dumps(v.to_dict(), separators=(",", ":")))
+        size_bin = len(vfs_binary.dump(v))
+        print(f"  {label:<5} start {t * 1e3:>9.3f} ms   {mem / 1024:>9.1f} KiB/session"
+              f"   save json {size_json / 1024:>8.1f} KiB   bin {size_bin / 1024:>8.1f} KiB")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--nodes", type=int, nargs="+", default=[1000, 10000])
+    ap.add_argument("--sessions", type=int, default=50)
+    ns = ap.parse_args()
+    for nodes in ns.nodes:
+        run(nodes, ns.sessions)
+
+
+if __name__ == "__main__":
+    main()
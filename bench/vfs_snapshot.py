@@ -0,0 +1,69 @@
+"""
+Бенчмарк снапшотов VFS: JSON (to_dict/from_dict) против бинарного формата
+(app/engine/vfs_binary.py) — размер, запись, загрузка и первое обращение.
+
+Запуск из корня репозитория:
+    python -m bench.vfs_snapshot
+    python -m bench.vfs_snapshot --sizes 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+from app.engine import vfs_binary
+from app.engine.vfs import VFS
+from bench.common import best_of, synthetic_tree
+
+
+def run(size: int) -> None:
+    tree, paths = synthetic_tree(size)
+    vfs = VFS(indexed=True)
+    vfs.from_dict(tree)
+    deep = paths[-1]
+
+    text_old = json.dumps(vfs.to_dict(), ensure_ascii=False, indent=2)
+    text = json.dumps(vfs.to_dict(), ensure_ascii=False, separators=(",", ":"))
+    blob = vfs_binary.dump(vfs)
+
+    def json_load() -> None:
+        v = VFS(indexed=True)
+        v.from_dict(json.loads(text))
+        v.stat(deep)
+
+    def bin_load() -> None:
+        v = VFS(indexed=True)
+        vfs_binary.load_into(v, memoryview(blob))
+        v.stat(deep)
+
+    def bin_load_full() -> None:
+        v = VFS(indexed=True)
+        vfs_binary.load_into(v, memoryview(blob))
+        v.to_dict()
+
+    print(f"\n{size} nodes:")
+    print(f"  size   json indent=2 {len(text_old.encode()):>12,} B")
+    print(f"  size   json compact  {len(text.encode()):>12,} B")
+    print(f"  size   binary        {len(blob):>12,} B")
+    rows = [
+        ("dump   json", lambda: json.dumps(vfs.to_dict(), ensure_ascii=False, separators=(",", ":"))),
+        ("dump   binary", lambda: vfs_binary.dump(vfs)),
+        ("load   json + stat", json_load),
+        ("load   binary + stat", bin_load),
+        ("load   binary+to_dict", bin_load_full),
+    ]
+    for name, fn in rows:
+        print(f"  {name:<22}{best_of(fn, repeat=3) * 1e3:10.2f} ms")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ns = ap.parse_args()
+    for size in ns.sizes:
+        run(size)
+
+
+if __name__ == "__main__":
+    main()
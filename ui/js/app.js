@@ -36,6 +36,9 @@ const btnContinue = document.getElementById("btnContinue");
 const btnNew = document.getElementById("btnNew");
 const taskTitle = document.getElementById("taskTitle");
 const resetBtn = document.getElementById("resetBtn");
+const undoBtn = document.getElementById("undoBtn");
+const redoBtn = document.getElementById("redoBtn");
+const restartTaskBtn = document.getElementById("restartTaskBtn");
 const taskPrompt = document.getElementById("taskPrompt");
 const cwdChip = document.getElementById("cwdChip");
 const taskChip = document.getElementById("taskChip");
@@ -70,13 +73,20 @@ let buffer = "";
 let cursor = 0; // 0..buffer.length
 
 // ===== history =====
-const history = [];
+// хранится в Python (Session.history) вместе с сохранением; здесь —
+// подгруженный хвост: history[0] имеет номер historyStart, более старые
+// страницы догружаются стрелкой вверх (loadOlderHistory)
+let history = [];
+let historyStart = 0;
+let historyFirst = 0; // номер самой старой команды на стороне Python
 let historyIndex = -1;
 let savedLineBeforeHistory = "";
 btnContinue.addEventListener("click", async () => {
   const lessonId = selectedLessonId || "01_paths";
+  await flushReports();
   const payload = await window.pywebview.api.continue_game(lessonId);
   setTaskUI(payload);
+  await loadHistory();
   term.writeln("");
   printPrompt(payload.cwd);
   showOverlay(false);
@@ -85,7 +95,9 @@ btnContinue.addEventListener("click", async () => {
 
 btnNew.addEventListener("click", async () => {
   const lessonId = selectedLessonId || "01_paths";
+  await flushReports();
   const payload = await window.pywebview.api.start_new(lessonId);
+  await loadHistory();
 
   term.clear();
   term.writeln("Linux Trainer — локальная обучающая игра.");
@@ -128,14 +140,17 @@ function renderLessons() {
     item.innerHTML = `
       <div>${l.title}</div>
     `;
+    // сохранённый прогресс — из того же list_lessons, без вызова на урок
+    if (l.progress && l.task_count) {
+      const badge = document.createElement("div");
+      badge.className = "lesson-dd__badge";
+      badge.textContent = `${Math.min(l.progress.task_index + 1, l.task_count)} / ${l.task_count}`;
+      item.appendChild(badge);
+    }
 
-    item.addEventListener("click", async () => {
+    item.addEventListener("click", () => {
   selectedLessonId = l.id;
-
-  if (window.pywebview?.api?.has_save) {
-    const s = await window.pywebview.api.has_save(selectedLessonId);
-    btnContinue.disabled = !s.has_save;
-  }
+  btnContinue.disabled = !l.has_save;
 
   lessonText.textContent = l.title;
   renderLessons();
@@ -168,14 +183,14 @@ async function boot() {
 
   selectedLessonId = lessons[0].id;
   lessonText.textContent = lessons[0].title;
+  btnContinue.disabled = !lessons[0].has_save;
   renderLessons();
 } catch (e) {
   console.log("list_lessons failed:", e);
 }
 
-
-  const s = await window.pywebview.api.has_save(selectedLessonId);
-  btnContinue.disabled = !s.has_save;
+  // какие аргументы команд — пути (для подсветки)
+  highlighter.specs = (await window.pywebview.api.shell_info()).commands;
 
 
   showOverlay(true);
@@ -195,34 +210,79 @@ function clearToEnd() {
   term.write("\x1b[K");
 }
 
-// redraw tail from cursor to end
-function redrawFromCursor() {
-  const tail = buffer.slice(cursor);
+// ===== подсветка строки ввода (highlight.js) =====
+const highlighter = new window.LineHighlighter();
+const KINDS_DELAY = 120; // мс: пути спрашиваем, когда набор затих
+let kindsTimer = null;
+let kindsEpoch = 0; // ответ, пришедший после resetPathKinds, не кэшируем
+
+// Экран: prompt + buffer, курсор терминала стоит на позиции at строки
+// (до правки). Перерисовать раскраску с места, где она могла измениться.
+function refreshInput(at) {
+  const from = Math.min(highlighter.update(buffer), at);
+  moveCursorLeft(at - from);
+  term.write(highlighter.render(from));
   clearToEnd();
-  term.write(tail);
-  moveCursorLeft(tail.length);
+  moveCursorLeft(buffer.length - cursor);
+  scheduleKinds();
+}
+
+// строка ввода целиком — сразу после prompt
+function writeInput() {
+  highlighter.update(buffer);
+  term.write(highlighter.render());
+  moveCursorLeft(buffer.length - cursor);
+  scheduleKinds();
+}
+
+// существуют ли набранные пути — спрашиваем Python пачкой и перекрашиваем
+function scheduleKinds() {
+  clearTimeout(kindsTimer);
+  if (highlighter.pendingPaths().length === 0) return;
+  kindsTimer = setTimeout(async () => {
+    const paths = highlighter.pendingPaths();
+    if (paths.length === 0) return;
+    const line = buffer;
+    const epoch = kindsEpoch;
+    const res = await window.pywebview.api.path_kinds(paths);
+    if (epoch !== kindsEpoch) return;
+    for (const p of paths) highlighter.kinds.set(p, res.kinds[p] ?? null);
+    // пока ждали, строку отправили или начали поиск — перерисует следующая правка
+    if (buffer !== line || search || activeOutput || pager) return;
+    const at = cursor;
+    moveCursorLeft(at);
+    term.write(highlighter.render());
+    moveCursorLeft(buffer.length - at);
+  }, KINDS_DELAY);
+}
+
+// после команды (и отката) VFS и cwd другие — ответы path_kinds устарели
+function resetPathKinds() {
+  clearTimeout(kindsTimer);
+  kindsEpoch += 1;
+  highlighter.kinds.clear();
 }
 
 function insertText(text) {
   if (!text) return;
+  const at = cursor;
   buffer = buffer.slice(0, cursor) + text + buffer.slice(cursor);
   cursor += text.length;
-  term.write(text);
-  redrawFromCursor();
+  refreshInput(at);
 }
 
 function backspace() {
   if (cursor === 0) return;
+  const at = cursor;
   buffer = buffer.slice(0, cursor - 1) + buffer.slice(cursor);
   cursor -= 1;
-  moveCursorLeft(1);
-  redrawFromCursor();
+  refreshInput(at);
 }
 
 function del() {
   if (cursor >= buffer.length) return;
   buffer = buffer.slice(0, cursor) + buffer.slice(cursor + 1);
-  redrawFromCursor();
+  refreshInput(cursor);
 }
 
 function cursorLeft() {
@@ -250,12 +310,10 @@ function cursorEnd() {
 }
 
 function setBuffer(text) {
-  // стереть текущую строку ввода на экране: в начало и clear-to-end
-  cursorHome();
-  clearToEnd();
+  const at = cursor;
   buffer = text;
   cursor = buffer.length;
-  term.write(buffer);
+  refreshInput(at);
 }
 
 // ===== clipboard =====
@@ -270,52 +328,382 @@ async function pasteFromClipboard() {
 }
 
 // ===== UI render =====
+let taskCheck = null; // task.check — проверки без Python (precheck.js)
+let progress = null;
+
+function renderProgress(p) {
+  progressText.textContent = `Задание ${p.index} / ${p.total} • Верно: ${p.correct} • Попыток: ${p.attempts}`;
+  const percent = Math.round(((p.index - 1) / p.total) * 100);
+  progressFill.style.width = `${percent}%`;
+
+  undoBtn.disabled = !p.undo;
+  redoBtn.disabled = !p.redo;
+}
+
 function setTaskUI(payload) {
   const t = payload.task;
   taskTitle.textContent = t.title;
   taskPrompt.textContent = t.prompt;
+  taskCheck = t.check || null;
+  highlighter.allowed = taskCheck ? taskCheck.allowed : null;
+  resetPathKinds();
 
   cwdChip.textContent = `cwd: ${payload.cwd}`;
   taskChip.textContent = `task: ${t.id}`;
 
-  const p = payload.progress;
-  progressText.textContent = `Задание ${p.index} / ${p.total} • Верно: ${p.correct} • Попыток: ${p.attempts}`;
-  const percent = Math.round(((p.index - 1) / p.total) * 100);
-  progressFill.style.width = `${percent}%`;
+  progress = payload.progress;
+  renderProgress(progress);
 
   hintBox.classList.add("hidden");
   hintBox.textContent = "";
 }
 
+// ===== попытки, отклонённые без Python =====
+// учитываются в Python пачкой: с ближайшим submit_command
+// или через REPORT_DELAY мс отдельным report_attempts
+const REPORT_DELAY = 2000;
+let pendingReports = [];
+let reportTimer = null;
+let reporting = Promise.resolve();
+
+function queueAttempt(command, code) {
+  pendingReports.push({ command, code });
+  if (!reportTimer) reportTimer = setTimeout(flushReports, REPORT_DELAY);
+}
+
+function takeReports() {
+  clearTimeout(reportTimer);
+  reportTimer = null;
+  const batch = pendingReports;
+  pendingReports = [];
+  return batch;
+}
+
+// и перед каждым вызовом, который откатывает или заменяет сессию
+async function flushReports() {
+  const batch = takeReports();
+  if (batch.length) {
+    reporting = reporting
+      .then(() => window.pywebview.api.report_attempts(batch))
+      .catch((e) => console.log("report_attempts failed:", e));
+  }
+  await reporting;
+}
+
+window.addEventListener("beforeunload", () => {
+  const batch = takeReports();
+  if (batch.length) window.pywebview.api.report_attempts(batch);
+});
+
 function appendTerminalLines(lines) {
   lines.forEach((line) => term.writeln(line));
 }
 
+// ===== вывод команды: кусками, с backpressure =====
+// Python отдаёт первый кусок сразу, остальные — по read_output(handle).
+// Следующий кусок запрашиваем только когда xterm разобрал предыдущий
+// (callback term.write), и пишем не чаще одного term.write на кадр.
+// chunk.partial — последняя строка куска не кончилась (длинная строка
+// приходит частями): после неё нет "\r\n", продолжение — в следующем куске.
+let activeOutput = null; // {handle, cancelled} пока идёт вывод или пейджер
+
+function writeAsync(text) {
+  return new Promise((resolve) => term.write(text, resolve));
+}
+
+function nextFrame() {
+  return new Promise((resolve) => requestAnimationFrame(resolve));
+}
+
+function cancelOutput() {
+  if (!activeOutput || activeOutput.cancelled) return;
+  activeOutput.cancelled = true;
+  window.pywebview.api.close_output(activeOutput.handle);
+}
+
+async function streamOutput(out) {
+  activeOutput = { handle: out.handle, cancelled: false };
+  let chunk = out;
+  try {
+    while (!activeOutput.cancelled) {
+      if (chunk.lines.length) {
+        await nextFrame();
+        await writeAsync(chunk.lines.join("\r\n") + (chunk.partial ? "" : "\r\n"));
+      }
+      if (chunk.done || activeOutput.cancelled) break;
+      chunk = await window.pywebview.api.read_output(out.handle);
+    }
+    if (activeOutput.cancelled) term.writeln("^C");
+  } finally {
+    activeOutput = null;
+  }
+}
+
+// ===== пейджер (less / more) =====
+// Буфер строк на пару экранов; недостающее дочитывается из Python.
+// Части длинной строки (chunk.partial) склеиваются в одну строку буфера.
+let pager = null; // {handle, buf, done, partial, resolve}
+
+async function pagerFill(n) {
+  // незаконченная последняя строка буфера ещё не считается
+  while (pager.buf.length < n + (pager.partial ? 1 : 0) && !pager.done) {
+    const chunk = await window.pywebview.api.read_output(pager.handle);
+    const lines = chunk.lines;
+    if (pager.partial && lines.length) pager.buf[pager.buf.length - 1] += lines.shift();
+    pager.buf.push(...lines);
+    pager.done = chunk.done;
+    pager.partial = !!chunk.partial;
+  }
+}
+
+async function pagerShow(n) {
+  await pagerFill(n);
+  const lines = pager.buf.splice(0, n);
+  let text = "\r\x1b[K"; // стереть строку статуса
+  if (lines.length) text += lines.join("\r\n") + "\r\n";
+  const end = pager.done && pager.buf.length === 0;
+  text += end ? "\x1b[7m(END)\x1b[0m" : "\x1b[7m:\x1b[0m";
+  await writeAsync(text);
+}
+
+function pagerQuit() {
+  const p = pager;
+  pager = null;
+  if (!(p.done && p.buf.length === 0)) window.pywebview.api.close_output(p.handle);
+  term.write("\r\x1b[K");
+  p.resolve();
+}
+
+async function pagerKey(ev) {
+  const key = ev.key;
+  ev.preventDefault();
+  if (pager.busy) return; // прошлая страница ещё рисуется
+  if (key === "q" || key === "Escape" || (ev.ctrlKey && key.toLowerCase() === "c")) {
+    pagerQuit();
+    return;
+  }
+  const n = key === " " || key === "PageDown" || key === "f" ? term.rows - 1
+          : key === "Enter" || key === "ArrowDown" || key === "j" ? 1 : 0;
+  if (!n) return;
+  pager.busy = true;
+  try {
+    await pagerShow(n);
+  } finally {
+    if (pager) pager.busy = false;
+  }
+}
+
+async function pageOutput(out) {
+  const finished = new Promise((resolve) => {
+    pager = { handle: out.handle, buf: [...out.lines], done: out.done, partial: !!out.partial, resolve, busy: true };
+  });
+  // вывод влез в экран — пейджер не нужен (как less -F)
+  await pagerFill(term.rows);
+  if (pager.done && pager.buf.length < term.rows) {
+    const lines = pager.buf;
+    pager = null;
+    if (lines.length) await writeAsync(lines.join("\r\n") + "\r\n");
+    return;
+  }
+  await pagerShow(term.rows - 1);
+  pager.busy = false;
+  return finished;
+}
+
+const HISTORY_PAGE = 200;
+
+async function loadHistory() {
+  const page = await window.pywebview.api.history_page(null, HISTORY_PAGE);
+  history = page.items;
+  historyStart = page.start;
+  historyFirst = page.first;
+  historyIndex = -1;
+}
+
+// false — старее уже ничего нет
+async function loadOlderHistory() {
+  if (historyStart <= historyFirst) return false;
+  const page = await window.pywebview.api.history_page(historyStart, HISTORY_PAGE);
+  if (page.items.length === 0) return false;
+  history = page.items.concat(history);
+  historyIndex += page.items.length;
+  historyStart = page.start;
+  historyFirst = page.first;
+  return true;
+}
+
 function pushHistory(cmd) {
   const c = cmd.trim();
   if (!c) return;
   if (history.length > 0 && history[history.length - 1] === c) return;
   history.push(c);
 }
+let promptCwd = "~"; // cwd последнего prompt: Tab перерисовывает его под вариантами
 function printPrompt(cwd) {
+  promptCwd = cwd;
   term.write(`student@trainer:${cwd}$ `); // важно: write, НЕ writeln
 }
 
+// ===== Tab completion =====
+// варианты ищет Python (engine/complete.py); здесь — вставка или список
+async function completeAtCursor() {
+  const line = buffer;
+  const pos = cursor;
+  const res = await window.pywebview.api.complete(line, pos);
+  // пока ждали ответа, строку успели изменить — ответ устарел
+  if (buffer !== line || cursor !== pos) return;
+  if (res.insert) {
+    insertText(res.insert);
+    return;
+  }
+  if (res.candidates.length < 2) return;
+  term.writeln("");
+  term.writeln(res.candidates.join("  "));
+  if (res.total > res.candidates.length) {
+    term.writeln(`... и ещё ${res.total - res.candidates.length}`);
+  }
+  printPrompt(promptCwd);
+  writeInput();
+}
+
 
 // ===== start / init =====
 async function loadInitialTask() {
   const payload = await window.pywebview.api.get_task();
   setTaskUI(payload);
+  await loadHistory();
 
   term.writeln("");
   printPrompt(payload.cwd);
 }
 
+async function submitLine() {
+  const cmd = buffer.trimEnd();
+  pushHistory(cmd);
+  historyIndex = -1;
+  savedLineBeforeHistory = "";
+
+  // как в терминале: Enter завершает строку ввода
+  term.writeln("");
+
+  // reset editor
+  buffer = "";
+  cursor = 0;
+  highlighter.update("");
+
+  // ошибка разбора, запрещённая или не та команда — ответ без Python
+  const local = taskCheck && window.precheck(cmd, taskCheck);
+  if (local) {
+    queueAttempt(cmd, local.code);
+    progress.attempts += 1;
+    renderProgress(progress);
+    appendTerminalLines([`❌ ${local.message}`]);
+    term.writeln("");
+    printPrompt(promptCwd);
+    return;
+  }
+
+  await reporting;
+  const res = await window.pywebview.api.submit_command(cmd, takeReports());
+
+  // сначала вывод команды (кусками или постранично), потом фидбек
+  if (res.output.pager) await pageOutput(res.output);
+  else await streamOutput(res.output);
+  appendTerminalLines(res.terminal_lines);
+  setTaskUI({ task: res.task, cwd: res.cwd, progress: res.progress });
+
+  // новый prompt
+  term.writeln("");
+  printPrompt(res.cwd);
+}
+
+// ===== Ctrl-R: reverse-i-search =====
+// поиск по всей истории делает Python (engine/history.py): каждая
+// клавиша — один вызов, продолжение — с номера найденной команды
+let search = null; // {query, match: {seq, command} | null, failed, saved}
+
+function drawSearch() {
+  const label = search.failed ? "failed reverse-i-search" : "reverse-i-search";
+  term.write(`\r\x1b[K(${label})\`${search.query}': ${search.match ? search.match.command : ""}`);
+}
+
+function startSearch() {
+  search = { query: "", match: null, failed: false, saved: buffer };
+  drawSearch();
+}
+
+async function searchHistory(before) {
+  const query = search.query;
+  const res = await window.pywebview.api.history_search(query, before);
+  // пока ждали, запрос изменили или поиск закрыли
+  if (!search || search.query !== query) return;
+  if (res.match) search.match = res.match;
+  search.failed = !res.match;
+  drawSearch();
+}
+
+// accept: найденная команда становится строкой ввода, иначе — прежняя строка
+function endSearch(accept) {
+  const text = accept && search.match ? search.match.command : search.saved;
+  search = null;
+  term.write("\r\x1b[K");
+  printPrompt(promptCwd);
+  buffer = text;
+  cursor = buffer.length;
+  writeInput();
+  historyIndex = -1;
+}
+
+async function searchKey(ev) {
+  const key = ev.key;
+  ev.preventDefault();
+  if (ev.ctrlKey && key.toLowerCase() === "r") {
+    // следующее совпадение — старше текущего
+    await searchHistory(search.match ? search.match.seq : null);
+  } else if (ev.ctrlKey && (key.toLowerCase() === "g" || key.toLowerCase() === "c")) {
+    endSearch(false);
+  } else if (key === "Backspace") {
+    search.query = search.query.slice(0, -1);
+    search.match = null;
+    await searchHistory(null);
+  } else if (key === "Enter") {
+    endSearch(true);
+    await submitLine();
+  } else if (key.length === 1 && !ev.ctrlKey && !ev.metaKey && !ev.altKey) {
+    search.query += key;
+    // текущее совпадение может подходить и под удлинённый запрос
+    await searchHistory(search.match ? search.match.seq + 1 : null);
+  } else if (!["Shift", "Control", "Alt", "Meta"].includes(key)) {
+    // Esc, стрелки и т.п.: как в bash — оставить найденное для правки
+    endSearch(true);
+  }
+}
+
 // ===== input handling =====
 term.onKey(async (e) => {
   const ev = e.domEvent;
   const key = ev.key;
 
+  // пока идёт вывод команды: клавиши — пейджеру, Ctrl+C прерывает
+  if (pager) {
+    await pagerKey(ev);
+    return;
+  }
+  if (activeOutput) {
+    ev.preventDefault();
+    if (ev.ctrlKey && key.toLowerCase() === "c") cancelOutput();
+    return;
+  }
+  if (search) {
+    await searchKey(ev);
+    return;
+  }
+  if (ev.ctrlKey && key.toLowerCase() === "r") {
+    ev.preventDefault(); // и не перезагружать страницу
+    startSearch();
+    return;
+  }
+
   // paste
   if ((ev.ctrlKey && key.toLowerCase() === "v") || (ev.shiftKey && key === "Insert")) {
     ev.preventDefault();
@@ -359,7 +747,8 @@ term.onKey(async (e) => {
       savedLineBeforeHistory = buffer;
       historyIndex = history.length - 1;
     } else {
-      historyIndex = Math.max(0, historyIndex - 1);
+      if (historyIndex === 0 && !(await loadOlderHistory())) return;
+      historyIndex -= 1;
     }
     setBuffer(history[historyIndex]);
     return;
@@ -380,6 +769,12 @@ term.onKey(async (e) => {
     return;
   }
 
+  if (key === "Tab") {
+    ev.preventDefault();
+    await completeAtCursor();
+    return;
+  }
+
   // backspace/delete
   if (key === "Backspace") {
     ev.preventDefault();
@@ -394,31 +789,10 @@ term.onKey(async (e) => {
 
   // enter
   if (key === "Enter") {
-  ev.preventDefault();
-
-  const cmd = buffer.trimEnd();
-  pushHistory(cmd);
-  historyIndex = -1;
-  savedLineBeforeHistory = "";
-
-  // как в терминале: Enter завершает строку ввода
-  term.writeln("");
-
-  // reset editor
-  buffer = "";
-  cursor = 0;
-
-  const res = await window.pywebview.api.submit_command(cmd);
-
-  // Python теперь возвращает ТОЛЬКО вывод (без prompt+command)
-  appendTerminalLines(res.terminal_lines);
-  setTaskUI({ task: res.task, cwd: res.cwd, progress: res.progress });
-
-  // новый prompt
-  term.writeln("");
-  printPrompt(res.cwd);
-  return;
-}
+    ev.preventDefault();
+    await submitLine();
+    return;
+  }
 
   // printable character
   if (key.length === 1 && !ev.ctrlKey && !ev.metaKey && !ev.altKey) {
@@ -435,10 +809,31 @@ hintBtn.addEventListener("click", async () => {
 });
 resetBtn.addEventListener("click", async () => {
   const lessonId = selectedLessonId || "01_paths";
+  await flushReports();
   const payload = await window.pywebview.api.reset_progress(lessonId);
   setTaskUI(payload);
+  await loadHistory();
   term.writeln("\r\n--- прогресс сброшен ---\r\n");
   printPrompt(payload.cwd);
 });
 
+// ===== undo / redo / restart task =====
+// состояние (VFS, cwd, задание) откатывает Python; здесь — только строка в терминале
+async function rewind(call, note) {
+  if (activeOutput || pager) return;
+  await flushReports();
+  const payload = await call();
+  if (!payload.ok) return;
+  setTaskUI(payload);
+  // недописанная строка ввода остаётся в буфере — печатаем её после prompt
+  term.writeln(`\r\n--- ${note} ---`);
+  printPrompt(payload.cwd);
+  cursor = buffer.length;
+  writeInput();
+}
+undoBtn.addEventListener("click", () => rewind(() => window.pywebview.api.undo(), "команда отменена"));
+redoBtn.addEventListener("click", () => rewind(() => window.pywebview.api.redo(), "команда повторена"));
+restartTaskBtn.addEventListener("click", () =>
+  rewind(() => window.pywebview.api.restart_task(), "задание начато заново"));
+
 boot();
\ No newline at end of file
@@ -0,0 +1,206 @@
+// Подсветка строки ввода на каждое нажатие: команды (разрешённые в задании
+// или нет), флаги, пути (несуществующие в VFS — красным), операторы и место
+// ошибки разбора.
+// Лексер (precheck.js) перезапускается с конца последнего токена перед
+// местом правки и останавливается, как только новый токен начался там же,
+// где старый в неизменённом хвосте строки: дальше — прежние токены со
+// сдвигом. Разметка типов и поиск ошибки разбора — один проход по токенам.
+// Существование путей знает только Python: highlighter копит неизвестные
+// (pendingPaths), app.js спрашивает их пачкой (path_kinds) и кладёт в kinds.
+(function () {
+  const { lexToken, parseTokens, ParseError } = window.shellSyntax;
+
+  const COLOR = {
+    command: "\x1b[1;32m",
+    badCommand: "\x1b[1;31m",
+    flag: "\x1b[36m",
+    op: "\x1b[33m",
+    dir: "\x1b[1;34m",
+    missing: "\x1b[4;31m",
+    error: "\x1b[41;97m",
+  };
+  const RESET = "\x1b[0m";
+
+  // индекс последнего токена с end < pos, или -1
+  function lastEndingBefore(tokens, pos) {
+    let lo = 0;
+    let hi = tokens.length;
+    while (lo < hi) {
+      const mid = (lo + hi) >> 1;
+      if (tokens[mid].end < pos) lo = mid + 1;
+      else hi = mid;
+    }
+    return lo - 1;
+  }
+
+  class LineHighlighter {
+    constructor() {
+      this.line = "";
+      this.tokens = [];
+      this.lexError = null; // {message, pos, end}
+      this.parseError = null; // {pos, end}
+      // shell_info: имя команды -> {reads, value_flags}
+      this.specs = {};
+      // task.check.allowed; null — все команды считаются разрешёнными
+      this.allowed = null;
+      // путь как набран -> "dir" | "file" | null (нет); сбрасывать после каждой команды
+      this.kinds = new Map();
+    }
+
+    // Новая строка. Возвращает позицию, с которой раскраска могла измениться.
+    update(line) {
+      const old = this.line;
+      const oldTokens = this.tokens;
+      const m = Math.min(old.length, line.length);
+      let p = 0;
+      while (p < m && old.charCodeAt(p) === line.charCodeAt(p)) p += 1;
+      let s = 0;
+      while (s < m - p && old.charCodeAt(old.length - 1 - s) === line.charCodeAt(line.length - 1 - s)) s += 1;
+      const delta = line.length - old.length;
+      const tail = line.length - s; // с этой позиции новая строка совпадает со старой
+
+      const k = lastEndingBefore(oldTokens, p);
+      let i = k >= 0 ? oldTokens[k].end : 0;
+      const restart = i;
+      const tokens = oldTokens.slice(0, k + 1);
+      let lexError = null;
+      let j = k + 1;
+      for (;;) {
+        const r = lexToken(line, i);
+        if (!r) break;
+        if (r.error) {
+          lexError = r.error;
+          break;
+        }
+        const t = r.token;
+        if (t.start >= tail) {
+          // тот же start в неизменённом хвосте — дальше всё как было
+          const oldStart = t.start - delta;
+          while (j < oldTokens.length && oldTokens[j].start < oldStart) j += 1;
+          if (j < oldTokens.length && oldTokens[j].start === oldStart) {
+            for (let q = j; q < oldTokens.length; q += 1) {
+              const o = oldTokens[q];
+              o.start += delta;
+              o.end += delta;
+              tokens.push(o);
+            }
+            const e = this.lexError;
+            lexError = e && { message: e.message, pos: e.pos + delta, end: e.end + delta };
+            break;
+          }
+        }
+        tokens.push(t);
+        i = r.next;
+      }
+
+      const oldParseError = this.parseError;
+      this.line = line;
+      this.tokens = tokens;
+      this.lexError = lexError;
+      this.classify();
+      let dirty = Math.min(p, restart);
+      // ошибка разбора могла появиться или пропасть левее правки (ls | → ls | wc)
+      for (const e of [oldParseError, this.parseError]) {
+        if (e) dirty = Math.min(dirty, e.pos);
+      }
+      return dirty;
+    }
+
+    // типы токенов: command, badCommand, flag, path, arg, target, op
+    classify() {
+      const tokens = this.tokens;
+      let expectCmd = true;
+      let redirect = false;
+      let spec = null;
+      let positional = 0;
+      let valueNext = false;
+      for (const t of tokens) {
+        if (t.kind === "op") {
+          t.type = "op";
+          if (t.text === ">" || t.text === ">>") redirect = true;
+          else expectCmd = true;
+          continue;
+        }
+        if (redirect) {
+          t.type = "target";
+          redirect = false;
+        } else if (expectCmd) {
+          const name = t.text.toLowerCase();
+          t.type = this.allowed === null || this.allowed.includes(name) ? "command" : "badCommand";
+          spec = this.specs[name] || null;
+          positional = 0;
+          valueNext = false;
+          expectCmd = false;
+        } else if (valueNext) {
+          t.type = "arg";
+          valueNext = false;
+        } else if (t.text.length > 1 && t.text[0] === "-") {
+          // как normalize.split_flags
+          t.type = "flag";
+          valueNext = !!spec && spec.value_flags.includes(t.text);
+        } else {
+          t.type = spec && spec.reads !== null && positional >= spec.reads && !t.magic ? "path" : "arg";
+          positional += 1;
+        }
+      }
+
+      this.parseError = null;
+      if (this.lexError) return;
+      try {
+        parseTokens(tokens);
+      } catch (e) {
+        if (!(e instanceof ParseError)) throw e;
+        const at = tokens.find((t) => t.start === e.pos);
+        this.parseError = { pos: e.pos, end: at ? at.end : e.pos + 1 };
+      }
+    }
+
+    // пути, существование которых ещё не спрашивали
+    pendingPaths() {
+      const out = new Set();
+      for (const t of this.tokens) {
+        if (t.type === "path" && t.text && !this.kinds.has(t.text)) out.add(t.text);
+      }
+      return [...out];
+    }
+
+    color(t) {
+      if (t.type === "path") {
+        const kind = this.kinds.get(t.text);
+        if (kind === "dir") return COLOR.dir;
+        return kind === null ? COLOR.missing : "";
+      }
+      return COLOR[t.type] || "";
+    }
+
+    // строка с позиции from с ANSI-цветами
+    render(from = 0) {
+      const line = this.line;
+      const err = this.lexError || this.parseError;
+      const parts = [];
+      let at = from;
+
+      const emit = (end, color) => {
+        if (end <= at) return;
+        const text = line.slice(at, end);
+        parts.push(color ? color + text + RESET : text);
+        at = end;
+      };
+
+      for (let q = lastEndingBefore(this.tokens, from + 1) + 1; q < this.tokens.length; q += 1) {
+        const t = this.tokens[q];
+        if (err && t.start >= err.pos) break;
+        emit(t.start, "");
+        emit(err ? Math.min(t.end, err.pos) : t.end, this.color(t));
+      }
+      if (err) {
+        emit(err.pos, "");
+        emit(err.end, COLOR.error);
+      }
+      emit(line.length, "");
+      return parts.join("");
+    }
+  }
+
+  window.LineHighlighter = LineHighlighter;
+})();
@@ -0,0 +1,174 @@
+// Разбор строки как в engine/parser.py и проверки, которые не зависят от VFS
+// (начало checker.check_command): ошибка разбора, пустая строка, запрещённая
+// и не та команда. Такие ответы UI даёт сам, без submit_command; попытка
+// уходит в Python пачкой (report_attempts). Разбор повторяет parser.py —
+// при правке одного правьте и другой (тексты и позиции ParseError тоже
+// отсюда); тексты проверок rule приходят из Python (CompiledRule.to_client
+// → task.check). Лексер отдаёт по одному токену со span — на нём же
+// инкрементальная подсветка (highlight.js).
+(function () {
+  // как parser.OPERATORS: длинные раньше коротких
+  const OPERATORS = ["&&", ">>", "|", ">", ";"];
+  const GLOB = "*?[{";
+
+  // пробельные символы str.strip() в Python (у String.trim набор другой)
+  const PY_WS = "[\\t\\n\\v\\f\\r\\x1c-\\x20\\x85\\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000]";
+  const PY_STRIP = new RegExp(`^${PY_WS}+|${PY_WS}+$`, "g");
+  const PY_LSTRIP = new RegExp(`^${PY_WS}+`);
+
+  class ParseError extends Error {
+    constructor(message, pos) {
+      super(message);
+      this.pos = pos;
+    }
+  }
+
+  function isSpace(c) {
+    return c === " " || c === "\t" || c === "\r" || c === "\n";
+  }
+
+  // Токен, начиная с позиции i (пробелы перед ним пропускаются):
+  // {token, next} | {error: {message, pos, end}} | null (строка кончилась).
+  // token = {kind: "word" | "op", text, start, end, quoted, magic};
+  // magic — в слове есть незакавыченные *?[{ (его раскроет expand.py).
+  function lexToken(line, i) {
+    const n = line.length;
+    while (i < n && isSpace(line[i])) i += 1;
+    if (i >= n) return null;
+    const start = i;
+
+    if ("|&;<>".includes(line[i])) {
+      if (line.startsWith("||", i)) {
+        return { error: { message: "Оператор '||' пока не поддерживается.", pos: i, end: i + 2 } };
+      }
+      const op = OPERATORS.find((o) => line.startsWith(o, i));
+      if (!op) return { error: { message: `Оператор '${line[i]}' пока не поддерживается.`, pos: i, end: i + 1 } };
+      return { token: { kind: "op", text: op, start, end: i + op.length, quoted: false, magic: false }, next: i + op.length };
+    }
+
+    let buf = "";
+    let quoted = false;
+    let magic = false;
+    while (i < n) {
+      let c = line[i];
+      if (isSpace(c) || "|&;<>".includes(c)) break;
+      if (c === "'") {
+        const j = line.indexOf("'", i + 1);
+        if (j < 0) return { error: { message: "Незакрытая кавычка '.", pos: i, end: n } };
+        buf += line.slice(i + 1, j);
+        quoted = true;
+        i = j + 1;
+      } else if (c === '"') {
+        const q = i;
+        i += 1;
+        for (;;) {
+          if (i >= n) return { error: { message: 'Незакрытая кавычка ".', pos: q, end: n } };
+          c = line[i];
+          if (c === '"') break;
+          if (c === "\\" && i + 1 < n && '\\"$`'.includes(line[i + 1])) {
+            i += 1;
+            c = line[i];
+          }
+          buf += c;
+          i += 1;
+        }
+        quoted = true;
+        i += 1;
+      } else if (c === "\\") {
+        if (i + 1 >= n) return { error: { message: "Команда заканчивается на \\.", pos: i, end: n } };
+        buf += line[i + 1];
+        quoted = true;
+        i += 2;
+      } else {
+        if (GLOB.includes(c)) magic = true;
+        buf += c;
+        i += 1;
+      }
+    }
+    return { token: { kind: "word", text: buf, start, end: i, quoted, magic }, next: i };
+  }
+
+  function tokenize(line) {
+    const tokens = [];
+    let i = 0;
+    for (let r; (r = lexToken(line, i)); i = r.next) {
+      if (r.error) throw new ParseError(r.error.message, r.error.pos);
+      tokens.push(r.token);
+    }
+    return tokens;
+  }
+
+  // как parser.parse, но нужны только границы команд:
+  // [{argv: [токены слов], redirects: [токены целей]}] | throw ParseError
+  function parseTokens(tokens) {
+    const commands = [];
+    const n = tokens.length;
+    let i = 0;
+
+    while (i < n) {
+      for (;;) {
+        const argv = [];
+        const redirects = [];
+        while (i < n && !(tokens[i].kind === "op" && ["|", "&&", ";"].includes(tokens[i].text))) {
+          const t = tokens[i];
+          if (t.kind === "op") { // > или >>
+            if (i + 1 >= n || tokens[i + 1].kind !== "word") {
+              throw new ParseError(`После '${t.text}' нужно указать файл.`, t.start);
+            }
+            redirects.push(tokens[i + 1]);
+            i += 2;
+            continue;
+          }
+          argv.push(t);
+          i += 1;
+        }
+        if (argv.length === 0) {
+          const at = i < n ? tokens[i] : (i ? tokens[i - 1] : null);
+          throw new ParseError(`Нет команды рядом с '${at ? at.text : ""}'.`, at ? at.start : 0);
+        }
+        commands.push({ argv, redirects });
+        if (i < n && tokens[i].text === "|") {
+          i += 1;
+          if (i >= n) throw new ParseError("Нет команды после '|'.", tokens[i - 1].start);
+          continue;
+        }
+        break;
+      }
+
+      if (i < n) {
+        const connector = tokens[i].text; // ";" или "&&"
+        i += 1;
+        if (connector === "&&" && i >= n) throw new ParseError("Нет команды после '&&'.", tokens[i - 1].start);
+      }
+    }
+    return commands;
+  }
+
+  // {code, message[, pos]}, если ответ известен без VFS; null — решает Python
+  function precheck(input, check) {
+    const msg = check.messages;
+    let commands;
+    try {
+      commands = parseTokens(tokenize(input.replace(PY_STRIP, "")));
+    } catch (e) {
+      if (!(e instanceof ParseError)) throw e;
+      const lead = input.length - input.replace(PY_LSTRIP, "").length;
+      return { code: "ERR_PARSE", message: msg.parse.replace("{error}", () => e.message), pos: e.pos + lead };
+    }
+    if (commands.length === 0) return { code: "ERR_EMPTY", message: msg.empty };
+
+    const cmds = commands.map((c) => c.argv[0].text.toLowerCase());
+    for (const cmd of cmds) {
+      if (!check.allowed.includes(cmd)) {
+        return { code: "ERR_CMD_NOT_ALLOWED", message: msg.not_allowed.replace("{cmd}", () => cmd) };
+      }
+    }
+    if (check.expected !== null && !cmds.includes(check.expected)) {
+      return { code: "ERR_WRONG_CMD", message: msg.wrong_cmd };
+    }
+    return null;
+  }
+
+  window.precheck = precheck;
+  window.shellSyntax = { lexToken, parseTokens, ParseError };
+})();
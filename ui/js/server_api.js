@@ -0,0 +1,56 @@
+// Серверный режим (python -m app.server): window.pywebview.api поверх WebSocket.
+// Подключается сервером перед app.js; в окне pywebview не используется.
+(function () {
+  const params = new URLSearchParams(location.search);
+  let user = params.get("user") || localStorage.getItem("trainerUser");
+  if (!user) user = "u" + Math.random().toString(36).slice(2, 10);
+  localStorage.setItem("trainerUser", user);
+
+  const scheme = location.protocol === "https:" ? "wss" : "ws";
+  const url = `${scheme}://${location.host}/ws?user=${encodeURIComponent(user)}`;
+
+  const pending = new Map();
+  let nextId = 1;
+  let ws = null;
+  let ready = null;
+  let markReady = null;
+
+  function resetReady() {
+    ready = new Promise((resolve) => { markReady = resolve; });
+  }
+
+  function connect() {
+    ws = new WebSocket(url);
+    ws.addEventListener("open", () => markReady());
+    ws.addEventListener("message", (ev) => {
+      const msg = JSON.parse(ev.data);
+      const p = pending.get(msg.id);
+      if (!p) return;
+      pending.delete(msg.id);
+      if ("error" in msg) p.reject(new Error(msg.error));
+      else p.resolve(msg.result);
+    });
+    ws.addEventListener("close", () => {
+      for (const p of pending.values()) p.reject(new Error("connection closed"));
+      pending.clear();
+      // сессия на сервере переживает переподключение (в памяти или в сохранении)
+      resetReady();
+      setTimeout(connect, 1000);
+    });
+  }
+
+  async function call(method, args) {
+    await ready;
+    const id = nextId++;
+    return new Promise((resolve, reject) => {
+      pending.set(id, { resolve, reject });
+      ws.send(JSON.stringify({ id, method, args }));
+    });
+  }
+
+  resetReady();
+  connect();
+  window.pywebview = {
+    api: new Proxy({}, { get: (_, name) => (...args) => call(name, args) }),
+  };
+})();